@@ -1,6 +1,8 @@
 
 import os, cv2, numpy, base64, subprocess, random,threading,time
-from lxml import html
+from device_inventory import get_inventory
+from ui_hierarchy import HierarchyService, create_hierarchy_service
+from device_state_cache import DeviceStateCache
 class ADB:
     KEYCODE_0 = 0
     KEYCODE_SOFT_LEFT = 1
@@ -87,13 +89,11 @@ class ADB:
     KEYCODE_MENU = 82
     KEYCODE_NOTIFICATION = 83
     KEYCODE_APP_SWITCH = 187
+    def __init__(self):
+        self.hierarchy_services = {}
     def GetDevices(self):
-        listdevice = []
-        devices = str(subprocess.check_output("adb devices", shell=True)).replace("b'List of devices attached\\r\\n", '').replace("'", '').replace('bList of devices attached ', '').split('\\r\\n')
-        for device in devices:
-            if device != '':
-                listdevice.append(device.split('\\tdevice')[0])
-        return listdevice
+        # adb devices dari cache inventory, bukan shell-out tiap panggilan
+        return get_inventory().adb_devices()
     def OpenApp(self, emulator, package):
         subprocess.check_call(f"adb -s {emulator} shell monkey -p {package} -c android.intent.category.LAUNCHER 1", shell=True)
     def PushFile(self, emulator, pathpc, pathphone):
@@ -174,25 +174,22 @@ class ADB:
         subprocess.check_call(f'adb -s {emulator} shell am broadcast -a clipper.set -e text "{text}"', shell=True)
     def Paste(self, emulator):
         subprocess.check_call(f"adb -s {emulator} shell input keyevent 279", shell=True)
+    def Hierarchy(self, emulator):
+        if emulator not in self.hierarchy_services:
+            self.hierarchy_services[emulator] = create_hierarchy_service(emulator, adb_path="adb")
+        return self.hierarchy_services[emulator]
     def DumXml(self, emulator):
         name = emulator
         if ":" in emulator:
             name = emulator.replace(":", "").replace(".", "")
-        subprocess.check_call(f"adb -s {emulator} shell uiautomator dump", shell=True)
-        subprocess.check_call(f"adb -s {emulator} pull /sdcard/window_dump.xml {name}.xml", shell=True)
+        with open(f'{name}.xml', 'w', encoding='utf-8') as f:
+            f.write(self.Hierarchy(emulator).dump(fresh=True).xml)
         return f'{name}.xml'
     def GetPosXml(self, emulator, element):
-        pos = []
         try:
-            path = self.DumXml(emulator)
-            if not os.path.exists(path): return pos
-            tree = html.parse(path)
-            for bound in tree.xpath(element):
-                gg = bound.attrib['bounds'].split('][')[0].replace('[', '').split(',')
-                pos.append(tuple([int(gg[0]), int(gg[1])]))
-            return pos
+            return self.Hierarchy(emulator).positions(element)
         except:
-            return pos
+            return []
     def TapXml(self, emulator, xpath):
         pos = self.GetPosXml(emulator, xpath)
         if pos != []:
@@ -202,6 +199,8 @@ class ADB:
 class LDPlayer:
     def __init__(self):
         self.pathLD = "C:\\LDPlayer\\LDPlayer9"
+        self.hierarchy_services = {}
+        self.state_caches = {}
     def Info(self, param, NameOrId):
         self.param, self.NameOrId = param, NameOrId
     def ExecuteLD(self, shell):
@@ -210,19 +209,30 @@ class LDPlayer:
         self.AdbLd(f"shell settings put global http_proxy {proxy}")
     def RemoveProxy(self):
         self.ChangeProxy(":0")
+    def AdbLdRaw(self, args, check=False):
+        cmd = " ".join(args)
+        return subprocess.run(f'ldconsole adb --{self.param} {self.NameOrId} --command "{cmd}"', capture_output=True,
+                              creationflags=subprocess.CREATE_NO_WINDOW, shell=True, cwd=self.pathLD,
+                              check=check).stdout
+    def AdbLdChecked(self, args):
+        # Runner DeviceStateCache: exit code != 0 -> CalledProcessError supaya hasil gagal tidak di-cache
+        return self.AdbLdRaw(args, check=True)
+    def Hierarchy(self):
+        key = (self.param, self.NameOrId)
+        if key not in self.hierarchy_services:
+            self.hierarchy_services[key] = HierarchyService(str(self.NameOrId), command=self.AdbLdRaw)
+        return self.hierarchy_services[key]
+    def State(self):
+        key = (self.param, self.NameOrId)
+        if key not in self.state_caches:
+            self.state_caches[key] = DeviceStateCache(str(self.NameOrId), runner=self.AdbLdChecked)
+        return self.state_caches[key]
     def DumXml(self):
-        self.AdbLd('shell uiautomator dump')
-        path = "\"\"%s\"\""%os.path.join(os.getcwd(), f"window_dump_{self.NameOrId}.xml")
-        self.AdbLd(f"pull /sdcard/window_dump.xml {path}")
+        with open(f'window_dump_{self.NameOrId}.xml', 'w', encoding='utf-8') as f:
+            f.write(self.Hierarchy().dump(fresh=True).xml)
         return f'window_dump_{self.NameOrId}.xml'
     def GetPosXml(self, element):
-        name = self.DumXml()
-        tree = html.parse(name)
-        pos = []
-        for bound in tree.xpath(element):
-            gg = bound.attrib['bounds'].split('][')[0].replace('[', '').split(',')
-            pos.append(tuple([int(gg[0]), int(gg[1])]))
-        return pos
+        return self.Hierarchy().positions(element)
     def Click(self, x, y):
         return self.AdbLd(f'shell input tap {x} {y}')
     def SendText(self, text, VN=True):
@@ -296,41 +306,63 @@ class LDPlayer:
             string += char[random.randint(0, len(char)-1)]
         self.Rename(string)
         return self.GetDevices()[int(self.NameOrId)]
+    def Inventory(self):
+        return get_inventory(self.pathLD)
     def Start(self):
         self.ExecuteLD(f"launch --{self.param} {self.NameOrId}")
+        self.State().notify("reboot")
+        self.Inventory().invalidate()
     def OpenApp(self, Package_Name):
        self.ExecuteLD(f"launchex --{self.param} {self.NameOrId} --packagename {Package_Name}")
+       self.State().notify("launch")
     def StopApp(self, Package_Name):
        self.ExecuteLD(f"killapp --{self.param} {self.NameOrId} --packagename {Package_Name}")
+       self.State().notify("stop")
     def Close(self):
         self.ExecuteLD(f"quit --{self.param} {self.NameOrId}")
+        self.State().notify("reboot")
+        self.Inventory().invalidate()
     def CloseAll(self):
         self.ExecuteLD(f"quitall")
+        for cache in self.state_caches.values():
+            cache.notify("reboot")
+        self.Inventory().invalidate()
     def Reboot(self):
         self.ExecuteLD(f"reboot --{self.param} {self.NameOrId}")
+        self.State().notify("reboot")
+        self.Inventory().invalidate()
     def Create(self, Name):
         print(self.ExecuteLD(f"add --name {Name}"))
+        self.Inventory().invalidate()
     def Copy(self, Name, From_NameOrId):
         self.ExecuteLD(f"copy --name {Name} --from {From_NameOrId}")
+        self.Inventory().invalidate()
     def Remove(self):
         self.ExecuteLD(f"remove --{self.param} {self.NameOrId}")
+        self.Inventory().invalidate()
     def Rename(self, title_new):
         self.ExecuteLD(f"rename --{self.param} {self.NameOrId} --title {title_new}")
+        self.Inventory().invalidate()
     def InstallAppFile(self, path):
         self.AdbLd(f'-e install {path}')
+        self.State().notify("install")
         # self.ExecuteLD(f'installapp --{self.param} {self.NameOrId} --filename "{path}"')
     def CheckInstalled(self, package):
-        if package in str(self.AdbLd("shell pm list packages")): return True
-        return False
+        # pm list packages di-cache; install / uninstall meng-invalidasi
+        return self.State().is_installed(package)
     def InstallAppPackage(self, Package_Name):
         
         self.ExecuteLD(f"installapp --{self.param} {self.NameOrId} --packagename {Package_Name}")
+        self.State().notify("install")
     def UnInstallApp(self, Package_Name):
         self.ExecuteLD(f"uninstallapp --{self.param} {self.NameOrId} --packagename {Package_Name}")
+        self.State().notify("install")
     def RunApp(self, Package_Name):
         self.ExecuteLD(f"runapp --{self.param} {self.NameOrId} --packagename {Package_Name}")
+        self.State().notify("launch")
     def KillApp(self, Package_Name):
         self.ExecuteLD(f"killapp --{self.param} {self.NameOrId} --packagename {Package_Name}")
+        self.State().notify("stop")
     def Locate(self, Lng, Lat):
         self.ExecuteLD(f"locate --{self.param} {self.NameOrId} --LLI {Lng},{Lat}")
     def ChangeProperty(self, cmd):
@@ -344,24 +376,17 @@ class LDPlayer:
     def DownCPU(self, rate):
         self.ExecuteLD(f"downcpu --{self.param} {self.NameOrId} --rate {rate}")
     def IsDevice_Running(self):
-        a = self.ExecuteLD(f"isrunning --{self.param} {self.NameOrId}")
-        if "running"  in str(a):
-            return True
-        else:
-            return False
+        # Dipanggil di loop: thread yang bertanya bersamaan berbagi satu ldconsole isrunning
+        return self.State().get("running", lambda: "running" in str(self.ExecuteLD(f"isrunning --{self.param} {self.NameOrId}")))
     def DownCPU(self, audio, fast_play, clean_mode):
         self.ExecuteLD(f"globalsetting --{self.param} {self.NameOrId} --audio {audio} --fastplay {fast_play} --cleanmode {clean_mode}")
     def GetDevices(self):
-        list = str(self.ExecuteLD(f"list")).replace("b'","").replace("'","").replace('\n', '').split("\\r\\n")
-        return list
+        # Nama instance urut index, dari cache inventory (ldconsole list2 hanya kalau sudah basi)
+        return [item["name"] for item in self.Inventory().all()]
     def GetDevices2(self):
-        list2 = str(self.ExecuteLD(f"list2")).replace("b'","").replace("'","").replace('\n', '').split("\\r\\n")
         Info_Devices = []
-        for i in list2:
-            if i == "":
-                continue
-            item = i.split(",")
-            Info_Devices.append({"name":item[1],"index":item[0],"id":"-1"})
+        for item in self.Inventory().all():
+            Info_Devices.append({"name":item["name"],"index":str(item["index"]),"id":str(item["pid"]),"serial":item["serial"]})
         return Info_Devices
     def kk(index):
         l = LDPlayer()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+AI Context Builder - Halaman AI yang ringkas
+1. Thumbnail JPEG kecil dengan batas byte (bukan PNG penuh base64)
+2. Crop ROI dari kandidat tombol
+3. Daftar elemen terstruktur (JSON)
+4. HTML dari template yang sudah di-parse sekali
+"""
+import cv2
+import base64
+import json
+import os
+import time
+from string import Template
+from datetime import datetime
+
+PAGE_TEMPLATE = Template("""<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>$title</title>
+    <script src="https://js.puter.com/v2/"></script>
+    <style>
+        body { font-family: Arial, sans-serif; margin: 20px; background: #f0f8ff; }
+        .container { max-width: 900px; margin: 0 auto; background: white; padding: 20px; border-radius: 15px; }
+        .screenshot { max-width: 100%; border: 2px solid #333; border-radius: 8px; }
+        .roi { height: 64px; margin: 4px; border: 1px solid #999; }
+        .screen-type { background: #f8d7da; padding: 10px; border-radius: 5px; color: #721c24; font-weight: bold; }
+        .ai-response { background: #e8f5e8; padding: 15px; border-radius: 8px; border-left: 5px solid #4caf50; }
+        .button-target { background: #fff3cd; padding: 10px; border-radius: 5px; margin-top: 10px; }
+        table { border-collapse: collapse; font-size: 13px; }
+        td, th { border: 1px solid #ccc; padding: 3px 8px; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h2>$title</h2>
+        <div class="screen-type">Screen Type: $screen_type | $timestamp | $resolution</div>
+        <h3>Thumbnail ($thumb_size):</h3>
+        <img src="data:image/jpeg;base64,$thumbnail" class="screenshot">
+        <h3>Kandidat tombol:</h3>
+        <div>$rois</div>
+        <table>
+            <tr><th>#</th><th>pos</th><th>size</th><th>area</th></tr>
+            $element_rows
+        </table>
+        <h3>AI Decision:</h3>
+        <div id="ai-output">Analyzing...</div>
+    </div>
+    <script type="application/json" id="ai-context">$context_json</script>
+    <script>
+        const context = JSON.parse(document.getElementById('ai-context').textContent);
+        puter.ai.chat(context.prompt, {
+            model: "$model",
+            max_tokens: $max_tokens,
+            temperature: $temperature
+        }).then(response => {
+            const output = document.getElementById('ai-output');
+            output.innerHTML = '<div class="ai-response">' + response.replace(/\\n/g, '<br>') + '</div>';
+            window.aiDecision = response;
+            const coordMatch = response.match(/(\\d+),\\s*(\\d+)/);
+            if (coordMatch) {
+                const x = parseInt(coordMatch[1]);
+                const y = parseInt(coordMatch[2]);
+                output.innerHTML += '<div class="button-target"><strong>Target: (' + x + ', ' + y + ')</strong></div>';
+                window.$target_var = {x: x, y: y};
+            }
+        }).catch(error => {
+            document.getElementById('ai-output').innerHTML = '<div style="color: red;">Error: ' + error + '</div>';
+        });
+    </script>
+</body>
+</html>
+""")
+
+def encode_jpeg(img, quality):
+    ok, buf = cv2.imencode(".jpg", img, [int(cv2.IMWRITE_JPEG_QUALITY), int(quality)])
+    return buf.tobytes() if ok else b""
+
+def get_buttons(analysis):
+    """Ambil list tombol dari format analysis mana pun (buttons/elements/top_buttons)"""
+    buttons = analysis.get("buttons") or analysis.get("elements") or analysis.get("top_buttons") or []
+    result = []
+    for button in buttons:
+        pos = button.get("pos") or button.get("position")
+        if pos is None:
+            continue
+        result.append({
+            "pos": [int(pos[0]), int(pos[1])],
+            "size": [int(v) for v in button.get("size", [0, 0])],
+            "area": int(button.get("area", 0))
+        })
+    return result
+
+class AIContextBuilder:
+    """Bangun halaman AI kecil dari screenshot + analysis"""
+
+    def __init__(self, max_thumb_bytes=30000, max_thumb_width=480, max_rois=4,
+                 roi_height=64, model="gpt-5-nano"):
+        self.max_thumb_bytes = max_thumb_bytes
+        self.max_thumb_width = max_thumb_width
+        self.max_rois = max_rois
+        self.roi_height = roi_height
+        self.model = model
+        self.stats = {"pages": 0, "total_ms": 0.0, "last_ms": 0.0, "last_bytes": 0, "last_source_bytes": 0}
+
+    def build_thumbnail(self, img):
+        """Downscale + JPEG, turunkan quality/ukuran sampai di bawah max_thumb_bytes"""
+        height, width = img.shape[:2]
+        scale = min(1.0, self.max_thumb_width / float(width))
+        data = b""
+        while True:
+            thumb = img if scale >= 1.0 else cv2.resize(
+                img, (max(1, int(width * scale)), max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+            for quality in (80, 65, 50, 35):
+                data = encode_jpeg(thumb, quality)
+                if len(data) <= self.max_thumb_bytes:
+                    return data, thumb.shape[1], thumb.shape[0]
+            if thumb.shape[1] <= 64:
+                return data, thumb.shape[1], thumb.shape[0]
+            scale *= 0.75
+
+    def crop_rois(self, img, buttons):
+        """Crop kandidat tombol (terbesar dulu), resize ke tinggi roi_height"""
+        height, width = img.shape[:2]
+        rois = []
+        for button in sorted(buttons, key=lambda b: b["area"], reverse=True)[:self.max_rois]:
+            (cx, cy), (w, h) = button["pos"], button["size"]
+            w, h = max(w, 16), max(h, 16)
+            x1, y1 = max(0, cx - w // 2), max(0, cy - h // 2)
+            x2, y2 = min(width, cx + w // 2), min(height, cy + h // 2)
+            if x2 <= x1 or y2 <= y1:
+                continue
+            crop = img[y1:y2, x1:x2]
+            scale = self.roi_height / float(crop.shape[0])
+            crop = cv2.resize(crop, (max(1, int(crop.shape[1] * scale)), self.roi_height), interpolation=cv2.INTER_AREA)
+            rois.append({"pos": button["pos"], "jpeg": encode_jpeg(crop, 60)})
+        return rois
+
+    def element_list(self, analysis, limit=8):
+        """Daftar elemen terstruktur untuk prompt + tabel"""
+        elements = []
+        for i, button in enumerate(get_buttons(analysis)[:limit]):
+            elements.append(dict(button, id=i))
+        return elements
+
+    def render(self, img, analysis, screen_type, prompt, title="Line Ranger AI",
+               max_tokens=100, temperature=0.1, target_var="aiTarget"):
+        """Render HTML lengkap, return string; target_var = nama global window untuk koordinat dari AI"""
+        started = time.perf_counter()
+        thumbnail, thumb_w, thumb_h = self.build_thumbnail(img)
+        elements = self.element_list(analysis)
+        rois = self.crop_rois(img, elements)
+
+        roi_html = "".join(
+            f'<img src="data:image/jpeg;base64,{base64.b64encode(r["jpeg"]).decode()}" class="roi" title="{r["pos"]}">'
+            for r in rois
+        )
+        rows = "".join(
+            f"<tr><td>{e['id']}</td><td>{e['pos']}</td><td>{e['size']}</td><td>{e['area']}</td></tr>"
+            for e in elements
+        )
+        context = {
+            "prompt": prompt,
+            "screen_type": screen_type,
+            "resolution": f"{img.shape[1]}x{img.shape[0]}",
+            "elements": elements,
+            "colors": [c["color"] for c in analysis.get("colors", [])]
+        }
+        html_content = PAGE_TEMPLATE.substitute(
+            title=title,
+            screen_type=screen_type.upper(),
+            timestamp=analysis.get("timestamp", datetime.now().strftime("%H:%M:%S")),
+            resolution=context["resolution"],
+            thumb_size=f"{thumb_w}x{thumb_h}, {len(thumbnail) // 1024} KB",
+            thumbnail=base64.b64encode(thumbnail).decode(),
+            rois=roi_html,
+            element_rows=rows,
+            context_json=json.dumps(context, ensure_ascii=False).replace("</", "<\\/"),
+            model=self.model,
+            max_tokens=int(max_tokens),
+            temperature=float(temperature),
+            target_var=target_var
+        )
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.stats["pages"] += 1
+        self.stats["total_ms"] += elapsed_ms
+        self.stats["last_ms"] = round(elapsed_ms, 2)
+        self.stats["last_bytes"] = len(html_content.encode("utf-8"))
+        return html_content
+
+    def write_page(self, path, img, analysis, screen_type, prompt, source_path=None, **kwargs):
+        """Render + tulis ke disk, catat ukuran dibanding PNG asli"""
+        html_content = self.render(img, analysis, screen_type, prompt, **kwargs)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(html_content)
+        if source_path and os.path.exists(source_path):
+            self.stats["last_source_bytes"] = os.path.getsize(source_path)
+        return self.get_stats()
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats["avg_ms"] = round(stats["total_ms"] / stats["pages"], 2) if stats["pages"] else 0.0
+        if stats["last_bytes"] and stats["last_source_bytes"]:
+            # PNG base64 ~ 4/3 dari ukuran file
+            stats["reduction"] = round(stats["last_source_bytes"] * 4 / 3 / stats["last_bytes"], 1)
+        return stats
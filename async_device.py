@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Async Device - Facade asyncio untuk satu emulator: capture, shell, input, UI hierarchy, wait_for
+1. Semua I/O lewat asyncio subprocess (tanpa thread per device yang cuma menunggu adb)
+2. Semaphore per device membatasi perintah adb paralel; semaphore global opsional untuk seluruh fleet
+3. Input lewat satu `adb shell` persisten (stdin), baris di-encode oleh touch_injector (sama dengan backend input)
+4. Kerja CPU (decode PNG, parse XML, vision) dilempar ke executor supaya event loop tidak tertahan
+Satu event loop bisa menjalankan I/O puluhan emulator:
+    async with AsyncDevice("emulator-5554") as dev:
+        frame = await dev.capture()
+        nodes = await dev.wait_for(text="OK", timeout=10)
+"""
+import asyncio
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import cv2
+import numpy as np
+from device_state_cache import get_cache
+from touch_injector import encode_key, encode_stroke
+from ui_hierarchy import DUMP_ATTEMPTS, Hierarchy, HierarchyError, extract_xml, percentile
+
+ADB_PATH = "C:\\LDPlayer\\LDPlayer9\\adb.exe"
+# Executor bersama untuk decode / vision; ukuran = jumlah core
+VISION_EXECUTOR = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix="vision")
+
+def print_step(step, message):
+    timestamp = datetime.now().strftime("%H:%M:%S")
+    print(f"[{timestamp}] [{step}] {message}")
+
+class AsyncDevice:
+    """Satu device; max_concurrent = perintah adb paralel per device, fleet_semaphore = batas global"""
+
+    def __init__(self, serial="emulator-5554", adb_path=ADB_PATH, max_concurrent=2, timeout=20,
+                 fleet_semaphore=None, executor=None):
+        self.serial = serial
+        self.adb_path = adb_path
+        self.timeout = timeout
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.fleet_semaphore = fleet_semaphore
+        self.executor = executor or VISION_EXECUTOR
+        self.input_process = None
+        self.input_lock = asyncio.Lock()
+        self.last = None  # Hierarchy terakhir (dump identik tidak di-parse ulang)
+        self.latency = {"command": deque(maxlen=500), "capture": deque(maxlen=500), "hierarchy": deque(maxlen=500)}
+        self.stats = {"commands": 0, "timeouts": 0, "failures": 0, "inputs": 0, "unchanged": 0}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    # --- subprocess ---
+    async def run(self, *args, timeout=None):
+        """stdout bytes dari `adb -s serial <args>`; timeout -> proses dibunuh, asyncio.TimeoutError"""
+        async with self.semaphore:
+            if self.fleet_semaphore:
+                async with self.fleet_semaphore:
+                    return await self._exec(args, timeout)
+            return await self._exec(args, timeout)
+
+    async def _exec(self, args, timeout):
+        started = time.perf_counter()
+        process = await asyncio.create_subprocess_exec(self.adb_path, "-s", self.serial, *args,
+                                                       stdout=asyncio.subprocess.PIPE,
+                                                       stderr=asyncio.subprocess.DEVNULL)
+        try:
+            stdout, _ = await asyncio.wait_for(process.communicate(), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            self.stats["timeouts"] += 1
+            raise
+        self.stats["commands"] += 1
+        self.latency["command"].append((time.perf_counter() - started) * 1000)
+        return stdout
+
+    async def offload(self, func, *args):
+        """Jalankan fungsi CPU-heavy (vision, parse) di executor"""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def shell(self, command, timeout=None):
+        output = await self.run("shell", command, timeout=timeout)
+        return output.decode("utf-8", errors="replace").strip()
+
+    # --- capture ---
+    async def capture(self, flags=cv2.IMREAD_COLOR):
+        """Frame terbaru sebagai ndarray (BGR default) lewat exec-out screencap -p; decode di executor"""
+        started = time.perf_counter()
+        data = await self.run("exec-out", "screencap", "-p")
+        frame = await self.offload(_decode_png, data, flags) if data else None
+        if frame is None:
+            self.stats["failures"] += 1
+            raise OSError(f"screencap gagal di {self.serial}")
+        self.latency["capture"].append((time.perf_counter() - started) * 1000)
+        return frame
+
+    # --- input ---
+    async def _input(self, line):
+        async with self.input_lock:
+            if self.input_process is None or self.input_process.returncode is not None:
+                self.input_process = await asyncio.create_subprocess_exec(
+                    self.adb_path, "-s", self.serial, "shell", stdin=asyncio.subprocess.PIPE,
+                    stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL)
+            self.input_process.stdin.write(line.encode("utf-8"))
+            await self.input_process.stdin.drain()
+        self.stats["inputs"] += 1
+        get_cache(self.serial, self.adb_path).notify("tap")
+
+    async def tap(self, x, y):
+        await self._input(encode_stroke([(0, x, y), (0, x, y)]))
+
+    async def swipe(self, x1, y1, x2, y2, delay=0):
+        """delay = durasi ms; 0 -> 300 ms seperti TouchInjector.swipe"""
+        await self._input(encode_stroke([(0, x1, y1), (int(delay) or 300, x2, y2)]))
+
+    async def key(self, code):
+        await self._input(encode_key(code))
+
+    # --- UI hierarchy ---
+    async def hierarchy(self):
+        """Dump uiautomator ke memory (exec-out /dev/tty, fallback sdcard) lalu parse di executor"""
+        started = time.perf_counter()
+        xml = None
+        for commands in DUMP_ATTEMPTS:
+            for args in commands:
+                output = await self.run(*args)
+            xml = extract_xml(output)
+            if xml is not None:
+                break
+        if xml is None:
+            self.stats["failures"] += 1
+            raise HierarchyError(f"uiautomator dump gagal di {self.serial}")
+        if self.last is not None and xml == self.last.xml:
+            self.stats["unchanged"] += 1
+            self.last.timestamp = time.time()
+        else:
+            self.last = await self.offload(Hierarchy, xml)
+        self.latency["hierarchy"].append((time.perf_counter() - started) * 1000)
+        return self.last
+
+    async def wait_for(self, condition=None, timeout=30, interval=0.5, **selector):
+        """Tunggu sampai condition(dev) (boleh coroutine) truthy, atau node selector uiautomator2 muncul.
+        Return nilai truthy pertama; timeout -> None."""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                if condition is not None:
+                    result = condition(self)
+                    if asyncio.iscoroutine(result):
+                        result = await result
+                else:
+                    result = (await self.hierarchy()).select(**selector)
+            except (HierarchyError, OSError, asyncio.TimeoutError):
+                result = None
+            if result:
+                return result
+            if time.monotonic() + interval > deadline:
+                return None
+            await asyncio.sleep(interval)
+
+    async def close(self):
+        process, self.input_process = self.input_process, None
+        if process and process.returncode is None:
+            try:
+                process.stdin.write(b"exit\n")
+                await process.stdin.drain()
+                process.stdin.close()
+                await asyncio.wait_for(process.wait(), 5)
+            except (OSError, asyncio.TimeoutError):
+                process.kill()
+
+    def get_stats(self):
+        return dict(self.stats, serial=self.serial,
+                    latency={name: {"count": len(values), "p50_ms": percentile(values, 0.50),
+                                    "p95_ms": percentile(values, 0.95)} for name, values in self.latency.items()})
+
+def _decode_png(data, flags):
+    return cv2.imdecode(np.frombuffer(data, np.uint8), flags)
+
+async def run_fleet(serials, job, adb_path=ADB_PATH, max_processes=16, **kwargs):
+    """Jalankan job(dev) untuk semua serial di satu event loop; total proses adb dibatasi max_processes.
+    Return {serial: hasil atau exception}"""
+    fleet_semaphore = asyncio.Semaphore(max_processes)
+    devices = [AsyncDevice(serial, adb_path, fleet_semaphore=fleet_semaphore, **kwargs) for serial in serials]
+    try:
+        results = await asyncio.gather(*(job(dev) for dev in devices), return_exceptions=True)
+    finally:
+        await asyncio.gather(*(dev.close() for dev in devices))
+    return dict(zip(serials, results))
+
+def main():
+    import argparse
+    import json
+    parser = argparse.ArgumentParser(description="Benchmark I/O async untuk banyak emulator")
+    parser.add_argument("--device", action="append", help="Serial (boleh berulang)")
+    parser.add_argument("--adb", default=ADB_PATH)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--max-processes", type=int, default=16)
+    args = parser.parse_args()
+
+    async def job(dev):
+        for _ in range(args.rounds):
+            frame, hierarchy = await asyncio.gather(dev.capture(), dev.hierarchy())
+        return {"frame": list(frame.shape), "nodes": len(hierarchy), **dev.get_stats()}
+
+    started = time.perf_counter()
+    results = asyncio.run(run_fleet(args.device or ["emulator-5554"], job, args.adb, args.max_processes))
+    elapsed = time.perf_counter() - started
+    for serial, result in results.items():
+        print(json.dumps({serial: result if isinstance(result, dict) else repr(result)}, indent=2))
+    print_step("ASYNC", f"{len(results)} device x {args.rounds} round dalam {elapsed:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,540 @@
+#!/usr/bin/env python3
+"""
+Automation Daemon - Service headless untuk semua emulator (tanpa Qt)
+1. Satu proses long-running memegang DeviceInventory, FleetSupervisor, BootScheduler
+2. API lokal HTTP + JSON-RPC 2.0: start/stop flow per device, status, metrics
+3. Event stream (NDJSON) dari supervisor, inventory dan boot
+4. Client tipis ada di daemon_cli.py
+"""
+import inspect
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from boot_scheduler import BootScheduler, host_load
+from decision_service import DEFAULT_BACKEND, FLEET_BACKENDS, create_backend, start_service_thread, stop_service_thread
+from device_inventory import DeviceInventory, adb_serial
+from fleet_supervisor import FleetSupervisor, FLOWS
+from provisioning import LDConsole, ProvisioningPipeline
+from resource_autotuner import ResourceAutotuner
+
+LDPLAYER_PATH = "C:\\LDPlayer\\LDPlayer9"
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8766
+# Batas tunggu worker berhenti (selesai cycle) sebelum instance di-restart; lewat -> terminate
+RESTART_STOP_TIMEOUT = 120
+
+def print_step(step, message):
+    timestamp = datetime.now().strftime("%H:%M:%S")
+    print(f"[{timestamp}] [{step}] {message}")
+
+class RPCError(Exception):
+    """Error JSON-RPC dengan kode standar"""
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+class EventBus:
+    """Ring buffer event bernomor urut; subscriber long-poll dengan `since`"""
+
+    def __init__(self, history=1000):
+        self.events = deque(maxlen=history)
+        self.seq = 0
+        self.condition = threading.Condition()
+
+    def publish(self, event):
+        with self.condition:
+            self.seq += 1
+            event = dict(event, seq=self.seq)
+            event.setdefault("time", time.time())
+            self.events.append(event)
+            self.condition.notify_all()
+        return event
+
+    def since(self, seq=0, timeout=0, limit=500):
+        """Event dengan seq > `seq`, tunggu sampai `timeout` detik kalau belum ada"""
+        deadline = time.time() + timeout
+        with self.condition:
+            while self.seq <= seq:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return []
+                self.condition.wait(remaining)
+            return [e for e in self.events if e["seq"] > seq][:limit]
+
+class AutomationDaemon:
+    """Pemilik state fleet; semua akses supervisor lewat self.lock"""
+
+    def __init__(self, ldplayer_path=LDPLAYER_PATH, host=DEFAULT_HOST, port=DEFAULT_PORT, max_workers=None,
+                 flow="ultimate", flow_kwargs=None, max_concurrent_boots=2, poll_interval=1.0,
+                 track_adb=True, event_history=1000, autotune=False):
+        self.host = host
+        self.port = port
+        self.poll_interval = poll_interval
+        self.bus = EventBus(event_history)
+        self.lock = threading.RLock()
+        self.stop_event = threading.Event()
+        self.inventory = DeviceInventory(ldplayer_path, track_adb=track_adb)
+        self.inventory.add_listener(self._on_inventory)
+        self.supervisor = FleetSupervisor(max_workers=max_workers, flow=flow, flow_kwargs=flow_kwargs,
+                                          on_event=self._on_worker_event)
+        self.boot = BootScheduler(ldplayer_path, max_concurrent=max_concurrent_boots)
+        self.boot_states = {}  # index -> status terakhir, untuk event perubahan
+        self.pending_starts = {}  # serial -> (index, name, flow, flow_kwargs), start setelah boot siap
+        self.restarting = {}  # index -> serial, restart dari autotuner yang menunggu boot ulang
+        # serial -> {"index", "start", "since"}: restart yang menunggu worker berhenti sebelum quit instance;
+        # start = (index, name, flow, flow_kwargs) yang dipindah ke pending_starts saat boot ulang dimulai
+        self.restart_stops = {}
+        self.autotuner = ResourceAutotuner(self._tuner_instances, self._scale_to, self._restart_instance,
+                                           console=LDConsole(ldplayer_path)) if autotune else None
+        self.ldplayer_path = ldplayer_path
+        self.provisioning = None  # ProvisioningPipeline yang sedang / terakhir jalan
+        self.provision_thread = None
+        self.server = None
+        self.started = None
+        self.rpc_stats = {}  # method -> {"calls", "errors", "total_ms"}
+        self.methods = {
+            "status": self.status,
+            "devices": self.devices,
+            "flows": self.flows,
+            "start_flow": self.start_flow,
+            "stop_flow": self.stop_flow,
+            "boot": self.boot_devices,
+            "drain": self.drain,
+            "provision": self.provision,
+            "events": self.events,
+            "metrics": self.metrics,
+            "tuner": self.tuner
+        }
+
+    def _on_inventory(self, event, instance):
+        self.bus.publish({"type": "inventory", "event": event, "serial": instance["serial"],
+                          "index": instance["index"], "name": instance["name"],
+                          "running": instance["running"], "adb_state": instance.get("adb_state")})
+
+    def _on_worker_event(self, event):
+        # Heartbeat terlalu sering untuk stream, cukup di status()
+        if event.get("type") != "heartbeat":
+            self.bus.publish(dict(event, type="worker"))
+
+    def _check_boots(self):
+        records = {r["index"]: r for r in self.boot.get_status()}
+        for index, record in records.items():
+            if self.boot_states.get(index) != record["status"]:
+                self.boot_states[index] = record["status"]
+                self.bus.publish({"type": "boot", "index": index, "serial": record["serial"],
+                                  "status": record["status"], "boot_seconds": record["boot_seconds"]})
+        restarted = []
+        for index, serial in list(self.restarting.items()):
+            status = records.get(index, {}).get("status")
+            if status in ("ready", "timeout"):
+                del self.restarting[index]
+                if status == "ready":
+                    restarted.append(serial)
+        for serial, (index, name, flow, flow_kwargs) in list(self.pending_starts.items()):
+            status = records.get(index, {}).get("status")
+            if status == "ready":
+                # Worker lama belum selesai: add_device menolak, coba lagi di poll berikutnya
+                if self.supervisor.add_device(serial, name=name, flow=flow, flow_kwargs=flow_kwargs):
+                    del self.pending_starts[serial]
+            elif status == "timeout":
+                del self.pending_starts[serial]
+                self.bus.publish({"type": "worker", "serial": serial, "name": name, "status": "failed",
+                                  "detail": "boot timeout"})
+        return restarted
+
+    def _stopped_for_restart(self):
+        """Restart yang worker-nya sudah berhenti (atau dipaksa berhenti setelah RESTART_STOP_TIMEOUT)"""
+        ready = []
+        for serial, restart in list(self.restart_stops.items()):
+            if not self.supervisor.is_stopped(serial):
+                if time.time() - restart["since"] < RESTART_STOP_TIMEOUT:
+                    continue
+                self.supervisor.terminate_device(serial)
+            del self.restart_stops[serial]
+            ready.append((serial, restart))
+        return ready
+
+    def _poll_loop(self):
+        while not self.stop_event.wait(self.poll_interval):
+            try:
+                with self.lock:
+                    restarted = self._check_boots()
+                    self.supervisor.poll()
+                    stopped = self._stopped_for_restart()
+                # Di luar self.lock: quit bisa lama, autotuner memanggil daemon sambil memegang lock-nya sendiri
+                for serial, restart in stopped:
+                    self._reboot_instance(serial, restart)
+                for serial in restarted:
+                    self.autotuner.mark_restarted(serial)
+            except Exception as e:
+                print_step("DAEMON", f"⚠️ Poll error: {e}")
+
+    def _active_serials(self):
+        active = [w["serial"] for w in self.supervisor.get_status() if w["status"] not in ("completed", "failed", "stopped")]
+        waiting = list(self.pending_starts) + [s for s, r in self.restart_stops.items() if r["start"]]
+        return active + [s for s in dict.fromkeys(waiting) if s not in active]
+
+    def _tuner_instances(self):
+        with self.lock:
+            return [{"serial": w["serial"], "clears_per_hour": w["metrics"].get("clears_per_hour", 0.0),
+                     "fps": w["metrics"].get("fps", 0.0)}
+                    for w in self.supervisor.get_status() if w["status"] == "running"]
+
+    def _scale_to(self, target):
+        """Autotuner: tambah instance (boot + flow) atau stop worker terakhir sampai jumlah aktif = target"""
+        with self.lock:
+            active = self._active_serials()
+            if len(active) < target:
+                idle = [d for d in self.inventory.all() if d["serial"] not in active]
+                idle.sort(key=lambda d: (not d.get("ready"), not d["running"], d["index"]))
+                for device in idle[:target - len(active)]:
+                    self.start_flow(device["index"], boot=not device["running"])
+            for serial in reversed(active[target:]):
+                self.stop_flow(serial)
+        self.bus.publish({"type": "tuner", "instance_count": target})
+
+    def _restart_instance(self, serial):
+        """Autotuner: minta flow berhenti; instance baru di-quit setelah worker (dan health monitor-nya) keluar,
+        lalu boot ulang lewat BootScheduler dan flow yang sama di-start lagi (lihat _poll_loop)"""
+        index, serial, name = self._resolve_device(serial)
+        with self.lock:
+            if serial in self.restart_stops:
+                return
+            worker = self.supervisor.workers.get(serial)
+            start = None
+            if worker is not None and worker.status not in ("completed", "failed", "stopped"):
+                start = (index, name, worker.flow, worker.flow_kwargs)
+            self.supervisor.stop_device(serial)
+            self.restart_stops[serial] = {"index": index, "start": start, "since": time.time()}
+        self.bus.publish({"type": "tuner", "serial": serial, "restart": True})
+
+    def _reboot_instance(self, serial, restart):
+        """Quit instance (blocking, di luar self.lock) lalu antre boot ulang"""
+        index = restart["index"]
+        self.boot.run_cmd([self.boot.ldconsole, "quit", "--index", str(index)])
+        with self.lock:
+            self.restarting[index] = serial
+            if restart["start"] is not None:
+                self.pending_starts[serial] = restart["start"]
+            self.boot.start([index])
+
+    def _resolve_device(self, device):
+        """Index, nama instance, atau serial -> (index, serial, name)"""
+        instance = None
+        if isinstance(device, int) or (isinstance(device, str) and device.isdigit()):
+            instance = self.inventory.get(device)
+            if instance is None:
+                return int(device), adb_serial(device), f"index-{device}"
+        elif isinstance(device, str):
+            instance = self.inventory.by_serial(device) or self.inventory.by_name(device)
+            if instance is None and device.startswith("emulator-"):
+                index = (int(device.rsplit("-", 1)[1]) - 5554) // 2
+                return index, device, device
+        if instance is None:
+            raise RPCError(-32602, f"Unknown device: {device!r}")
+        return instance["index"], instance["serial"], instance["name"]
+
+    def status(self):
+        with self.lock:
+            workers = self.supervisor.get_status()
+            pending = [{"serial": s, "index": v[0], "name": v[1], "flow": v[2]} for s, v in self.pending_starts.items()]
+        return {"workers": workers, "pending_starts": pending, "boot": self.boot.get_status(),
+                "draining": self.supervisor.draining}
+
+    def devices(self):
+        with self.lock:
+            workers = {w["serial"]: w for w in self.supervisor.get_status()}
+        devices = self.inventory.all()
+        for device in devices:
+            worker = workers.get(device["serial"])
+            device["worker"] = worker["status"] if worker else None
+        return devices
+
+    def flows(self):
+        return sorted(FLOWS)
+
+    def start_flow(self, device, flow=None, cycles=None, boot=False, flow_kwargs=None):
+        """Start flow di satu device; boot=True -> lewat BootScheduler dulu"""
+        if flow is not None and flow not in FLOWS:
+            # "module:function" hanya untuk pemanggil lokal, bukan lewat RPC
+            raise RPCError(-32602, f"Unknown flow: {flow!r} (available: {sorted(FLOWS)})")
+        index, serial, name = self._resolve_device(device)
+        flow_kwargs = dict(self.supervisor.flow_kwargs if flow_kwargs is None else flow_kwargs)
+        if cycles is not None:
+            flow_kwargs["cycles"] = int(cycles)
+        with self.lock:
+            if boot:
+                if serial in self.pending_starts:
+                    return {"serial": serial, "accepted": False, "reason": "already waiting for boot"}
+                self.pending_starts[serial] = (index, name, flow, flow_kwargs)
+                self.boot.start([index])
+                return {"serial": serial, "accepted": True, "status": "booting"}
+            accepted = self.supervisor.add_device(serial, name=name, flow=flow, flow_kwargs=flow_kwargs)
+        return {"serial": serial, "accepted": accepted,
+                "reason": None if accepted else "worker already active"}
+
+    def stop_flow(self, device):
+        _, serial, _ = self._resolve_device(device)
+        with self.lock:
+            waiting = self.pending_starts.pop(serial, None) is not None
+            if serial in self.restart_stops:
+                # Instance tetap di-restart, flow-nya tidak di-start lagi
+                waiting = waiting or self.restart_stops[serial]["start"] is not None
+                self.restart_stops[serial]["start"] = None
+            known = self.supervisor.stop_device(serial)
+        return {"serial": serial, "stopping": known or waiting}
+
+    def boot_devices(self, devices):
+        indexes = [self._resolve_device(d)[0] for d in devices]
+        self.boot.start(indexes)
+        return {"submitted": indexes}
+
+    def provision(self, template, count, prefix="ranger-", apk=None, copy_parallel=2, boot_parallel=2):
+        """Clone + prewarm di background; instance selesai ditandai ready di inventory daemon"""
+        with self.lock:
+            if self.provision_thread is not None and self.provision_thread.is_alive():
+                raise RPCError(-32002, "Provisioning already running")
+            pipeline = ProvisioningPipeline(template, console=LDConsole(self.ldplayer_path), apk_path=apk,
+                                            inventory=self.inventory, max_copy_parallel=int(copy_parallel),
+                                            max_boot_parallel=int(boot_parallel))
+            self.provisioning = pipeline
+            names = [f"{prefix}{i + 1}" for i in range(int(count))]
+
+            def run():
+                summary = pipeline.run(names)
+                self.inventory.invalidate()
+                self.bus.publish({"type": "provision", "template": template, "ready": summary["ready"],
+                                  "failed": summary["failed"], "wall_seconds": summary["wall_seconds"]})
+            self.provision_thread = threading.Thread(target=run, name="provision", daemon=True)
+            self.provision_thread.start()
+        return {"template": template, "names": names}
+
+    def drain(self, timeout=120):
+        """Minta semua worker berhenti; menunggu di luar lock supaya status / metrics tetap bisa dilayani"""
+        with self.lock:
+            self.pending_starts.clear()
+            for restart in self.restart_stops.values():
+                restart["start"] = None
+            self.supervisor.begin_drain()
+        deadline = time.time() + float(timeout)
+        while time.time() < deadline:
+            with self.lock:
+                if not self.supervisor.running():
+                    break
+                self.supervisor.poll()
+            time.sleep(0.5)
+        with self.lock:
+            self.supervisor.terminate_running()
+            return self.supervisor.get_status()
+
+    def events(self, since=0, timeout=0, limit=500):
+        events = self.bus.since(int(since), min(float(timeout), 60), int(limit))
+        return {"events": events, "last": events[-1]["seq"] if events else int(since)}
+
+    def tuner(self, decisions=50):
+        if self.autotuner is None:
+            raise RPCError(-32001, "Autotuner not enabled (start daemon with --autotune)")
+        return {"setpoints": self.autotuner.get_setpoints(), "decisions": self.autotuner.get_decisions(int(decisions))}
+
+    def metrics(self):
+        with self.lock:
+            workers = self.supervisor.get_status()
+        by_status = {}
+        for worker in workers:
+            by_status[worker["status"]] = by_status.get(worker["status"], 0) + 1
+        boots = [r["boot_seconds"] for r in self.boot.get_status() if r["boot_seconds"] is not None]
+        rpc = {}
+        for method, stats in self.rpc_stats.items():
+            rpc[method] = dict(stats, avg_ms=round(stats["total_ms"] / stats["calls"], 2) if stats["calls"] else 0.0)
+        return {
+            "uptime": round(time.time() - self.started, 1) if self.started else 0.0,
+            "host_load": host_load(),
+            "workers": by_status,
+            "restarts": sum(w["restarts"] for w in workers),
+            "devices": {"total": len(self.inventory.all()), "running": len(self.inventory.running()),
+                        "online": len(self.inventory.online()), "ready": len(self.inventory.ready())},
+            "boot": {"count": len(boots), "avg_seconds": round(sum(boots) / len(boots), 1) if boots else None},
+            "events": self.bus.seq,
+            "rpc": rpc
+        }
+
+    def call(self, method, params=None):
+        """Panggil method RPC; params dict (keyword) atau list (positional)"""
+        handler = self.methods.get(method)
+        if handler is None:
+            raise RPCError(-32601, f"Method not found: {method}")
+        stats = self.rpc_stats.setdefault(method, {"calls": 0, "errors": 0, "total_ms": 0.0})
+        started = time.perf_counter()
+        try:
+            # Cek params terhadap signature dulu: TypeError dari dalam handler tetap error internal
+            args, kwargs = ((), params) if isinstance(params, dict) else (tuple(params or ()), {})
+            try:
+                inspect.signature(handler).bind(*args, **kwargs)
+            except TypeError as e:
+                raise RPCError(-32602, f"Invalid params: {e}")
+            return handler(*args, **kwargs)
+        except Exception:
+            stats["errors"] += 1
+            raise
+        finally:
+            stats["calls"] += 1
+            stats["total_ms"] += (time.perf_counter() - started) * 1000
+
+    def handle_rpc(self, request):
+        """Satu request JSON-RPC 2.0 -> response dict (None untuk notification)"""
+        if not isinstance(request, dict) or not isinstance(request.get("method"), str):
+            return {"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "Invalid Request"}}
+        request_id = request.get("id")
+        try:
+            response = {"jsonrpc": "2.0", "id": request_id, "result": self.call(request["method"], request.get("params"))}
+        except RPCError as e:
+            response = {"jsonrpc": "2.0", "id": request_id, "error": {"code": e.code, "message": e.message}}
+        except Exception as e:
+            response = {"jsonrpc": "2.0", "id": request_id, "error": {"code": -32000, "message": str(e)}}
+        return response if "id" in request else None
+
+    def start(self):
+        """Start inventory + poll loop + HTTP server (server jalan di background thread)"""
+        self.started = time.time()
+        self.stop_event.clear()
+        self.inventory.start()
+        if self.autotuner is not None:
+            self.autotuner.start()
+        threading.Thread(target=self._poll_loop, daemon=True).start()
+        self.server = ThreadingHTTPServer((self.host, self.port), DaemonRequestHandler)
+        self.server.daemon_threads = True
+        self.server.automation = self
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        print_step("DAEMON", f"Automation daemon di http://{self.host}:{self.port}")
+        self.bus.publish({"type": "daemon", "status": "started", "port": self.port})
+        return self
+
+    def stop(self, drain_timeout=120):
+        print_step("DAEMON", "Stopping: drain worker...")
+        self.bus.publish({"type": "daemon", "status": "stopping"})
+        self.stop_event.set()
+        self.drain(timeout=drain_timeout)
+        if self.autotuner is not None:
+            self.autotuner.stop()
+        self.inventory.stop()
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def serve_forever(self):
+        self.start()
+        try:
+            while not self.stop_event.wait(1):
+                pass
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if self.server:
+                self.stop()
+
+class DaemonRequestHandler(BaseHTTPRequestHandler):
+    """POST /rpc (JSON-RPC), GET /status /devices /metrics /flows, GET /events (NDJSON stream)"""
+
+    protocol_version = "HTTP/1.1"
+    GET_ROUTES = {"/status": "status", "/devices": "devices", "/metrics": "metrics", "/flows": "flows"}
+
+    def log_message(self, format, *args):
+        pass  # Jangan spam stdout per request
+
+    def _send_json(self, payload, code=200):
+        body = json.dumps(payload).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        daemon = self.server.automation
+        url = urlparse(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if url.path == "/events":
+            return self._stream_events(daemon, int(query.get("since", daemon.bus.seq)))
+        method = self.GET_ROUTES.get(url.path)
+        if method is None:
+            return self._send_json({"error": "not found"}, 404)
+        try:
+            self._send_json(daemon.call(method))
+        except Exception as e:
+            self._send_json({"error": str(e)}, 500)
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/rpc":
+            return self._send_json({"error": "not found"}, 404)
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length) or b"null")
+        except ValueError:
+            return self._send_json({"jsonrpc": "2.0", "id": None, "error": {"code": -32700, "message": "Parse error"}})
+        daemon = self.server.automation
+        if isinstance(request, list):
+            responses = [r for r in (daemon.handle_rpc(item) for item in request) if r is not None]
+            return self._send_json(responses)
+        response = daemon.handle_rpc(request)
+        self._send_json(response if response is not None else {})
+
+    def _stream_events(self, daemon, since):
+        """Chunked NDJSON sampai client putus / daemon berhenti; baris kosong = keepalive"""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            while not daemon.stop_event.is_set():
+                events = daemon.bus.since(since, timeout=15)
+                lines = "".join(json.dumps(e) + "\n" for e in events) if events else "\n"
+                if events:
+                    since = events[-1]["seq"]
+                chunk = lines.encode()
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+        except (ConnectionError, OSError):
+            pass
+        self.close_connection = True
+
+def main():
+    import argparse
+    import signal
+    parser = argparse.ArgumentParser(description="Headless Line Ranger automation daemon")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--ldplayer", default=LDPLAYER_PATH)
+    parser.add_argument("--max-workers", type=int, default=None)
+    parser.add_argument("--max-boots", type=int, default=2)
+    parser.add_argument("--cycles", type=int, default=15)
+    parser.add_argument("--no-track", action="store_true", help="Jangan pakai adb track-devices")
+    parser.add_argument("--autotune", action="store_true", help="Aktifkan resource autotuner")
+    parser.add_argument("--decisions", choices=FLEET_BACKENDS, nargs="?", const=DEFAULT_BACKEND, default=None,
+                        help="Jalankan decision service bersama untuk semua worker (backend model)")
+    args = parser.parse_args()
+
+    service = start_service_thread(create_backend(args.decisions)) if args.decisions else None
+
+    daemon = AutomationDaemon(args.ldplayer, host=args.host, port=args.port, max_workers=args.max_workers,
+                              flow_kwargs={"cycles": args.cycles}, max_concurrent_boots=args.max_boots,
+                              track_adb=not args.no_track, autotune=args.autotune)
+
+    def handle_term(signum, frame):
+        daemon.stop_event.set()
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, handle_term)
+    daemon.serve_forever()
+    if service is not None:
+        stop_service_thread(service)
+
+if __name__ == "__main__":
+    main()
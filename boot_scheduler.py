@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Boot Scheduler - Start banyak LDPlayer bertahap
+1. Batas jumlah instance yang boot bersamaan
+2. Instance berikutnya masuk kalau boot sebelumnya selesai (sys.boot_completed)
+   atau load host sudah di bawah threshold
+3. Catat waktu boot per instance
+"""
+import ctypes
+import os
+import subprocess
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from device_inventory import adb_serial
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+LDPLAYER_PATH = "C:\\LDPlayer\\LDPlayer9"
+_system_times = None  # (idle, kernel, user) GetSystemTimes terakhir, untuk load Windows tanpa psutil
+
+def print_step(step, message):
+    timestamp = datetime.now().strftime("%H:%M:%S")
+    print(f"[{timestamp}] [{step}] {message}")
+
+def _windows_cpu_load():
+    """CPU busy 0.0-1.0 sejak panggilan sebelumnya lewat GetSystemTimes (panggilan pertama 0.0, seperti psutil)"""
+    global _system_times
+    times = [ctypes.c_ulonglong() for _ in range(3)]  # FILETIME = 64-bit, satuan 100ns
+    if not ctypes.windll.kernel32.GetSystemTimes(*(ctypes.byref(t) for t in times)):
+        return None
+    current = tuple(t.value for t in times)
+    previous, _system_times = _system_times, current
+    if previous is None:
+        return 0.0
+    idle = current[0] - previous[0]
+    # Waktu kernel sudah termasuk idle
+    total = (current[1] - previous[1]) + (current[2] - previous[2])
+    return max(0.0, 1.0 - idle / total) if total else 0.0
+
+def host_load():
+    """Load host 0.0-1.0 (psutil, loadavg, atau GetSystemTimes di Windows), None kalau tidak bisa diukur"""
+    if psutil is not None:
+        return psutil.cpu_percent(interval=None) / 100.0
+    if hasattr(os, "getloadavg"):
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    if os.name == "nt":
+        return _windows_cpu_load()
+    return None
+
+class BootScheduler:
+    """Admission control untuk boot LDPlayer"""
+
+    def __init__(self, ldplayer_path=LDPLAYER_PATH, max_concurrent=2, load_threshold=0.7,
+                 boot_timeout=300, poll_interval=3):
+        self.ldplayer_path = ldplayer_path
+        self.ldconsole = os.path.join(ldplayer_path, "ldconsole.exe")
+        self.adb = os.path.join(ldplayer_path, "adb.exe")
+        self.max_concurrent = max_concurrent
+        self.load_threshold = load_threshold
+        self.boot_timeout = boot_timeout
+        self.poll_interval = poll_interval
+        self.pending = deque()
+        self.booting = {}  # index -> record
+        self.records = {}  # index -> {"status", "queued", "launched", "ready", "boot_seconds"}
+        self.lock = threading.Lock()
+        self.active = False  # True selama ada thread run()
+        self.load_warned = False
+        # psutil.cpu_percent(interval=None) pertama selalu 0.0: panggil sekarang sebagai titik awal
+        host_load()
+
+    def run_cmd(self, args, timeout=30):
+        try:
+            result = subprocess.run(args, capture_output=True, text=True, timeout=timeout)
+            return result.stdout.strip(), result.returncode == 0
+        except Exception:
+            return "", False
+
+    def is_running(self, index):
+        output, _ = self.run_cmd([self.ldconsole, "isrunning", "--index", str(index)])
+        return "running" in output
+
+    def is_boot_completed(self, index):
+        output, success = self.run_cmd([self.adb, "-s", adb_serial(index), "shell", "getprop", "sys.boot_completed"], timeout=5)
+        return success and output.strip() == "1"
+
+    def submit(self, indexes):
+        """Masukkan instance ke antrian boot"""
+        now = time.time()
+        with self.lock:
+            for index in indexes:
+                index = int(index)
+                record = self.records.get(index)
+                if record and record["status"] in ("queued", "booting"):
+                    continue
+                self.records[index] = {"index": index, "serial": adb_serial(index), "status": "queued",
+                                       "queued": now, "launched": None, "ready": None, "boot_seconds": None}
+                self.pending.append(index)
+
+    def _can_admit(self):
+        if not self.pending or len(self.booting) >= self.max_concurrent:
+            return False
+        if not self.booting:
+            return True
+        # Sudah ada yang boot: tambah lagi hanya kalau host masih longgar
+        load = host_load()
+        if load is None:
+            # Tanpa ukuran load jangan diam-diam jadi boot serial: batasnya tinggal max_concurrent
+            if not self.load_warned:
+                self.load_warned = True
+                print_step("BOOT", f"⚠️ Load host tidak bisa diukur (pasang psutil); admission hanya dibatasi "
+                                   f"max_concurrent={self.max_concurrent}")
+            return True
+        return load < self.load_threshold
+
+    def _launch(self, index):
+        record = self.records[index]
+        if self.is_running(index) and self.is_boot_completed(index):
+            record.update(status="ready", launched=time.time(), ready=time.time(), boot_seconds=0.0)
+            print_step("BOOT", f"Instance {index} sudah jalan")
+            return
+        self.run_cmd([self.ldconsole, "launch", "--index", str(index)])
+        record.update(status="booting", launched=time.time())
+        self.booting[index] = record
+        print_step("BOOT", f"🚀 Launch instance {index} ({len(self.booting)}/{self.max_concurrent} booting)")
+
+    def step(self):
+        """Satu putaran: cek yang sedang boot, lalu admit instance berikutnya"""
+        now = time.time()
+        for index, record in list(self.booting.items()):
+            if self.is_boot_completed(index):
+                record.update(status="ready", ready=now, boot_seconds=round(now - record["launched"], 1))
+                del self.booting[index]
+                print_step("BOOT", f"✅ Instance {index} siap dalam {record['boot_seconds']}s")
+            elif now - record["launched"] > self.boot_timeout:
+                record.update(status="timeout")
+                del self.booting[index]
+                print_step("BOOT", f"❌ Instance {index} timeout setelah {self.boot_timeout}s")
+
+        while True:
+            with self.lock:
+                if not self._can_admit():
+                    break
+                index = self.pending.popleft()
+            self._launch(index)
+
+    def run(self, indexes=None, should_stop=None):
+        """Blocking sampai semua instance di antrian siap/timeout (atau should_stop()). Return records."""
+        started = time.time()
+        if indexes is not None:
+            self.submit(indexes)
+        while True:
+            if should_stop and should_stop():
+                with self.lock:
+                    self.active = False
+                break
+            self.step()
+            with self.lock:
+                if not self.pending and not self.booting:
+                    self.active = False
+                    break
+            time.sleep(self.poll_interval)
+        total = round(time.time() - started, 1)
+        print_step("BOOT", f"Fleet cold start selesai dalam {total}s")
+        return self.get_status()
+
+    def start(self, indexes):
+        """Jalankan run() di background thread (dipakai GUI)"""
+        self.submit(indexes)
+        with self.lock:
+            if self.active:
+                return
+            self.active = True
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def get_status(self):
+        with self.lock:
+            return [dict(record) for record in self.records.values()]
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Staggered LDPlayer boot")
+    parser.add_argument("indexes", nargs="+", type=int)
+    parser.add_argument("--max-concurrent", type=int, default=2)
+    parser.add_argument("--load-threshold", type=float, default=0.7)
+    args = parser.parse_args()
+
+    scheduler = BootScheduler(max_concurrent=args.max_concurrent, load_threshold=args.load_threshold)
+    for record in scheduler.run(args.indexes):
+        print_step("BOOT", f"Instance {record['index']}: {record['status']} ({record['boot_seconds']}s)")
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,20 @@ Check if bypass worked - detect LIAPP ALERT or normal lobby
 """
 import subprocess
 import time
+from ui_hierarchy import create_hierarchy_service
+from keyword_scanner import KeywordScanner
+
+hierarchy = create_hierarchy_service("emulator-5554", "C:\\LDPlayer\\LDPlayer9\\adb.exe")
+# Teks alert dicocokkan persis (case-sensitive), keyword status tanpa membedakan huruf
+ALERT_SCANNER = KeywordScanner({
+    "liapp": ["LIAPP ALERT"],
+    "memory_attack": ["Memory Attack"],
+    "loader_attack": ["Mattack-ldr"]
+}, ignore_case=False)
+STATUS_SCANNER = KeywordScanner({
+    "lobby": ["lobby", "main"],
+    "loading": ["loading"]
+})
 
 def run_adb(cmd):
     try:
@@ -18,34 +32,28 @@ def check_current_status():
     
     # Get UI dump
     print("📱 Capturing UI state...")
-    run_adb("shell uiautomator dump /sdcard/ui_check.xml")
-    subprocess.run([
-        "C:\\LDPlayer\\LDPlayer9\\adb.exe", "-s", "emulator-5554", 
-        "pull", "/sdcard/ui_check.xml", "ui_check.xml"
-    ], capture_output=True)
-    
     try:
-        with open("ui_check.xml", "r", encoding="utf-8") as f:
-            ui_content = f.read()
+        ui_content = hierarchy.dump(fresh=True).xml
+        found = ALERT_SCANNER.found(ui_content) | STATUS_SCANNER.found(ui_content)
         
         # Check for LIAPP ALERT
-        if "LIAPP ALERT" in ui_content:
+        if "liapp" in found:
             print("❌ BYPASS FAILED - LIAPP ALERT still detected!")
             print("🚨 Memory Attack detection still active")
             
             # Check for specific error messages
-            if "Memory Attack" in ui_content:
+            if "memory_attack" in found:
                 print("   - Memory Attack detected")
-            if "Mattack-ldr" in ui_content:
+            if "loader_attack" in found:
                 print("   - Loader attack detected")
             
             return False
             
-        elif "lobby" in ui_content.lower() or "main" in ui_content.lower():
+        elif "lobby" in found:
             print("✅ BYPASS SUCCESS - In lobby/main menu!")
             return True
             
-        elif "loading" in ui_content.lower():
+        elif "loading" in found:
             print("⏳ App is loading...")
             return None
             
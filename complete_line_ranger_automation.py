@@ -11,16 +11,25 @@ import numpy as np
 import subprocess
 import time
 import os
-import json
-import base64
 from datetime import datetime
+from ai_context_builder import AIContextBuilder
+from rule_engine import RuleEngine, Facts, STEP6_RULES
+from ui_hierarchy import create_hierarchy_service
+from keyword_scanner import KeywordScanner
+
+GAME_KEYWORDS = ["stage", "battle", "main", "lobby", "play", "start"]
+LIAPP_SCANNER = KeywordScanner({"liapp": ["LIAPP ALERT"]}, ignore_case=False)
+GAME_READY_SCANNER = KeywordScanner({kw: [kw] for kw in GAME_KEYWORDS})
 
 class CompleteLineRangerBot:
     def __init__(self):
         self.adb_path = "C:\\LDPlayer\\LDPlayer9\\adb.exe"
         self.device = "emulator-5554"
+        self.hierarchy = create_hierarchy_service(self.device, self.adb_path)
         self.package = "com.linecorp.LGRGS"
         self.screenshot_path = "game_screen.png"
+        self.context_builder = AIContextBuilder()
+        self.rule_engine = RuleEngine(STEP6_RULES)
         
     def run_adb(self, cmd):
         try:
@@ -99,20 +108,16 @@ class CompleteLineRangerBot:
             
             try:
                 # Check UI dump for game elements
-                self.run_adb("shell uiautomator dump /sdcard/ui.xml")
-                subprocess.run([self.adb_path, "-s", self.device, "pull", "/sdcard/ui.xml", "ui.xml"], capture_output=True)
-                
-                with open("ui.xml", "r", encoding="utf-8") as f:
-                    ui_content = f.read()
+                ui_content = self.hierarchy.dump(fresh=True).xml
                 
                 # Check for LIAPP ALERT
-                if "LIAPP ALERT" in ui_content:
+                if LIAPP_SCANNER.found(ui_content):
                     print("❌ LIAPP ALERT detected - need bypass!")
                     return False
                 
                 # Check for game UI elements (stage, battle, etc.)
-                game_keywords = ["stage", "battle", "main", "lobby", "play", "start"]
-                found_keywords = [kw for kw in game_keywords if kw.lower() in ui_content.lower()]
+                found = GAME_READY_SCANNER.found(ui_content)
+                found_keywords = [kw for kw in GAME_KEYWORDS if kw in found]
                 
                 if found_keywords:
                     print(f"✅ Game ready! Found: {found_keywords}")
@@ -202,78 +207,20 @@ Suggest next action:
 Top 3 button positions: {[btn['position'] for btn in analysis['top_buttons'][:3]]}
         """.strip()
         
-        # Create AI interface
-        with open(self.screenshot_path, "rb") as f:
-            screenshot_base64 = base64.b64encode(f.read()).decode()
-        
-        html_content = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <title>Line Ranger AI Decision</title>
-    <script src="https://js.puter.com/v2/"></script>
-</head>
-<body>
-    <h2>🎮 Line Ranger AI Decision</h2>
-    <img src="data:image/png;base64,{screenshot_base64}" style="max-width: 600px; border: 1px solid #ccc;">
-    
-    <h3>🔍 Analysis:</h3>
-    <pre>{json.dumps(analysis, indent=2)}</pre>
-    
-    <h3>🤖 AI Decision:</h3>
-    <div id="ai-output">Getting AI decision...</div>
-    
-    <script>
-        const context = `{context}`;
-        
-        puter.ai.chat(context, {{
-            model: "gpt-5-nano",
-            max_tokens: 100,
-            temperature: 0.3
-        }}).then(response => {{
-            document.getElementById('ai-output').innerHTML = 
-                '<div style="background: #e8f5e8; padding: 15px; border-radius: 8px; border-left: 4px solid #4caf50;">' + 
-                '<strong>🤖 AI Suggestion:</strong><br>' +
-                response.replace(/\\n/g, '<br>') + 
-                '</div>';
-            
-            // Extract coordinates if mentioned
-            const coordMatch = response.match(/(\\d+),\\s*(\\d+)/);
-            if (coordMatch) {{
-                const x = parseInt(coordMatch[1]);
-                const y = parseInt(coordMatch[2]);
-                document.getElementById('ai-output').innerHTML += 
-                    '<br><div style="background: #fff3cd; padding: 10px; border-radius: 5px; margin-top: 10px;">' +
-                    '<strong>🎯 Suggested Click: (' + x + ', ' + y + ')</strong></div>';
-            }}
-        }}).catch(error => {{
-            document.getElementById('ai-output').innerHTML = 
-                '<div style="color: red; background: #ffebee; padding: 10px; border-radius: 5px;">Error: ' + error + '</div>';
-        }});
-    </script>
-</body>
-</html>
-        """
-        
-        with open("ai_decision.html", "w", encoding="utf-8") as f:
-            f.write(html_content)
+        # Create AI interface (thumbnail + element list, not the full PNG)
+        img = cv2.imread(self.screenshot_path)
+        if img is not None:
+            self.context_builder.write_page(
+                "ai_decision.html", img, analysis, "screen", context,
+                source_path=self.screenshot_path, title="Line Ranger AI Decision", temperature=0.3
+            )
         
         print("✅ AI decision interface created: ai_decision.html")
         
-        # Fallback decision based on button analysis
-        if analysis["top_buttons"]:
-            largest_button = analysis["top_buttons"][0]
-            decision = {
-                "action": "click",
-                "coordinates": largest_button["position"],
-                "reason": f"Click largest button (area: {largest_button['area']})"
-            }
-        else:
-            decision = {
-                "action": "wait",
-                "coordinates": None,
-                "reason": "No clear buttons detected"
-            }
+        # Fallback decision based on button analysis (compiled rule table)
+        decision = self.rule_engine.decide(Facts.from_analysis("screen", analysis))
+        if "area" in decision:
+            decision["reason"] = f"{decision['reason']} (area: {decision['area']})"
         
         return decision
     
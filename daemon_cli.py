@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Daemon CLI - Client tipis untuk automation_daemon
+Contoh:
+  python daemon_cli.py status
+  python daemon_cli.py start 0 --cycles 20 --boot
+  python daemon_cli.py stop emulator-5554
+  python daemon_cli.py events
+"""
+import json
+import sys
+import urllib.request
+
+# Sama dengan automation_daemon; tidak di-import supaya CLI tidak ikut memuat cv2 / numpy / provisioning
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8766
+
+class DaemonError(Exception):
+    """Error yang dikembalikan daemon (JSON-RPC error object)"""
+
+    def __init__(self, error):
+        super().__init__(f"[{error.get('code')}] {error.get('message')}")
+        self.code = error.get("code")
+
+class DaemonClient:
+    """JSON-RPC lewat HTTP ke daemon lokal"""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=150):
+        self.base_url = f"http://{host}:{port}"
+        self.timeout = timeout
+        self.counter = 0
+
+    def call(self, method, **params):
+        self.counter += 1
+        body = json.dumps({"jsonrpc": "2.0", "method": method, "params": params, "id": self.counter}).encode()
+        request = urllib.request.Request(self.base_url + "/rpc", data=body,
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            payload = json.loads(response.read())
+        if "error" in payload:
+            raise DaemonError(payload["error"])
+        return payload["result"]
+
+    def stream_events(self, since=None):
+        """Generator event dari GET /events (NDJSON), keepalive dilewati"""
+        url = self.base_url + "/events" + (f"?since={since}" if since is not None else "")
+        with urllib.request.urlopen(url, timeout=self.timeout) as response:
+            for line in response:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+def _device(value):
+    return int(value) if value.isdigit() else value
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Client untuk automation daemon")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("status")
+    commands.add_parser("devices")
+    commands.add_parser("metrics")
+    commands.add_parser("flows")
+    commands.add_parser("tuner", help="Setpoint + keputusan autotuner")
+    start = commands.add_parser("start", help="Start flow di device (index, nama, atau serial)")
+    start.add_argument("devices", nargs="+")
+    start.add_argument("--flow", default=None)
+    start.add_argument("--cycles", type=int, default=None)
+    start.add_argument("--boot", action="store_true", help="Boot instance dulu lewat BootScheduler")
+    stop = commands.add_parser("stop")
+    stop.add_argument("devices", nargs="+")
+    boot = commands.add_parser("boot")
+    boot.add_argument("devices", nargs="+")
+    provision = commands.add_parser("provision", help="Clone + prewarm instance dari golden template")
+    provision.add_argument("template")
+    provision.add_argument("count", type=int)
+    provision.add_argument("--prefix", default="ranger-")
+    provision.add_argument("--apk", default=None)
+    drain = commands.add_parser("drain")
+    drain.add_argument("--timeout", type=float, default=120)
+    events = commands.add_parser("events", help="Ikuti event stream (Ctrl+C untuk keluar)")
+    events.add_argument("--since", type=int, default=None)
+    args = parser.parse_args()
+
+    client = DaemonClient(args.host, args.port)
+    try:
+        if args.command == "events":
+            for event in client.stream_events(args.since):
+                print(json.dumps(event))
+            return
+        if args.command == "start":
+            result = [client.call("start_flow", device=_device(d), flow=args.flow, cycles=args.cycles, boot=args.boot)
+                      for d in args.devices]
+        elif args.command == "stop":
+            result = [client.call("stop_flow", device=_device(d)) for d in args.devices]
+        elif args.command == "boot":
+            result = client.call("boot", devices=[_device(d) for d in args.devices])
+        elif args.command == "provision":
+            result = client.call("provision", template=args.template, count=args.count, prefix=args.prefix,
+                                 apk=args.apk)
+        elif args.command == "drain":
+            result = client.call("drain", timeout=args.timeout)
+        else:
+            result = client.call(args.command)
+        print(json.dumps(result, indent=2))
+    except DaemonError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    except OSError as e:
+        print(f"Daemon tidak bisa dihubungi di {client.base_url}: {e}", file=sys.stderr)
+        sys.exit(2)
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
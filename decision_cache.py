@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Decision Cache - Simpan keputusan AI per layar
+1. Fingerprint layar (dHash) + signature elemen yang terdeteksi
+2. LRU + TTL eviction
+3. Persist ke disk (decision_cache.json)
+4. Statistik hit/miss
+"""
+import cv2
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+def print_step(step, message):
+    timestamp = datetime.now().strftime("%H:%M:%S")
+    print(f"[{timestamp}] [{step}] {message}")
+
+def screen_fingerprint(img, hash_size=8):
+    """Difference hash (dHash) dari screenshot, hasil hex string 64-bit"""
+    if img is None:
+        return ""
+    gray = img if len(img.shape) == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    diff = small[:, 1:] > small[:, :-1]
+    value = 0
+    for bit in diff.flatten():
+        value = (value << 1) | int(bit)
+    return f"{value:0{hash_size * hash_size // 4}x}"
+
+def hamming_distance(hash_a, hash_b):
+    """Jumlah bit berbeda antara dua fingerprint hex"""
+    if not hash_a or not hash_b or len(hash_a) != len(hash_b):
+        return 1 << 16
+    return bin(int(hash_a, 16) ^ int(hash_b, 16)).count("1")
+
+def element_signature(analysis, grid=40):
+    """Signature elemen: posisi tombol dibulatkan ke grid + warna dominan"""
+    if not analysis:
+        return ""
+    buttons = analysis.get("buttons") or analysis.get("elements") or analysis.get("top_buttons") or []
+    positions = []
+    for button in buttons[:8]:
+        x, y = button.get("pos") or button.get("position") or (0, 0)
+        positions.append((int(x) // grid, int(y) // grid))
+    colors = sorted(c["color"] for c in analysis.get("colors", []))
+    raw = json.dumps({"buttons": sorted(positions), "colors": colors})
+    return hashlib.sha1(raw.encode()).hexdigest()[:12]
+
+class DecisionCache:
+    """Cache keputusan per (screen_type, fingerprint, signature) dengan LRU + TTL"""
+
+    def __init__(self, cache_file="decision_cache.json", max_entries=512, ttl=6 * 3600,
+                 max_distance=4, autosave_every=10):
+        self.cache_file = cache_file
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_distance = max_distance  # Toleransi hamming untuk fingerprint mirip
+        self.autosave_every = autosave_every
+        self.entries = OrderedDict()  # key -> {"decision", "created", "hits", ...}
+        self.buckets = {}  # (screen_type, signature) -> set(key)
+        self.stats = {"hits": 0, "near_hits": 0, "misses": 0, "expired": 0, "evicted": 0}
+        self.lock = threading.RLock()
+        self.dirty = 0
+        self.load()
+
+    def make_key(self, screen_type, fingerprint, signature):
+        return f"{screen_type}|{fingerprint}|{signature}"
+
+    def _index(self, key):
+        screen_type, _, signature = key.split("|")
+        self.buckets.setdefault((screen_type, signature), set()).add(key)
+
+    def _unindex(self, key):
+        screen_type, _, signature = key.split("|")
+        bucket = self.buckets.get((screen_type, signature))
+        if bucket:
+            bucket.discard(key)
+            if not bucket:
+                del self.buckets[(screen_type, signature)]
+
+    def _drop(self, key):
+        self.entries.pop(key, None)
+        self._unindex(key)
+
+    def _is_expired(self, entry, now):
+        return self.ttl and now - entry["created"] > self.ttl
+
+    def get(self, screen_type, fingerprint, signature):
+        """Ambil keputusan cache, None kalau layar baru"""
+        key = self.make_key(screen_type, fingerprint, signature)
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and self._is_expired(entry, now):
+                self._drop(key)
+                self.stats["expired"] += 1
+                entry = None
+
+            if entry is None and self.max_distance:
+                # Cari fingerprint yang mirip di bucket yang sama
+                best_key, best_distance = None, self.max_distance + 1
+                for other in self.buckets.get((screen_type, signature), ()):
+                    distance = hamming_distance(fingerprint, other.split("|")[1])
+                    if distance < best_distance:
+                        best_key, best_distance = other, distance
+                if best_key is not None and not self._is_expired(self.entries[best_key], now):
+                    key, entry = best_key, self.entries[best_key]
+                    self.stats["near_hits"] += 1
+
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+
+            self.entries.move_to_end(key)
+            entry["hits"] += 1
+            entry["last_hit"] = now
+            self.stats["hits"] += 1
+            return dict(entry["decision"])
+
+    def put(self, screen_type, fingerprint, signature, decision):
+        """Simpan keputusan untuk layar ini"""
+        if not fingerprint or not decision:
+            return
+        key = self.make_key(screen_type, fingerprint, signature)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+            self.entries[key] = {
+                "decision": dict(decision),
+                "created": time.time(),
+                "last_hit": None,
+                "hits": 0
+            }
+            self._index(key)
+            while len(self.entries) > self.max_entries:
+                old_key, _ = self.entries.popitem(last=False)
+                self._unindex(old_key)
+                self.stats["evicted"] += 1
+
+            self.dirty += 1
+            if self.autosave_every and self.dirty >= self.autosave_every:
+                self.save()
+
+    def evict(self, screen_type, fingerprint, signature):
+        """Buang keputusan untuk layar ini (termasuk fingerprint mirip), mis. tap-nya tidak mengubah layar"""
+        with self.lock:
+            removed = [key for key in self.buckets.get((screen_type, signature), ())
+                       if hamming_distance(fingerprint, key.split("|")[1]) <= self.max_distance]
+            for key in removed:
+                self._drop(key)
+            if removed:
+                self.stats["evicted"] += len(removed)
+                self.dirty += 1
+            return len(removed)
+
+    def lookup(self, screen_type, img, analysis):
+        """Helper: hitung fingerprint + signature lalu get()"""
+        fingerprint = screen_fingerprint(img)
+        signature = element_signature(analysis)
+        return self.get(screen_type, fingerprint, signature), (fingerprint, signature)
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+            total = stats["hits"] + stats["misses"]
+            stats["entries"] = len(self.entries)
+            stats["hit_rate"] = round(stats["hits"] / total, 3) if total else 0.0
+            return stats
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.buckets.clear()
+            self.dirty += 1
+
+    def load(self):
+        """Load cache dari disk, buang entry yang sudah expired"""
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            now = time.time()
+            with self.lock:
+                for key, entry in data.get("entries", []):
+                    if self._is_expired(entry, now):
+                        continue
+                    self.entries[key] = entry
+                    self._index(key)
+            print_step("CACHE", f"Loaded {len(self.entries)} cached decisions")
+        except Exception as e:
+            print_step("CACHE", f"⚠️ Gagal load cache: {e}")
+
+    def save(self):
+        """Tulis cache ke disk (atomic replace)"""
+        if not self.cache_file:
+            return
+        try:
+            with self.lock:
+                data = {"saved": time.time(), "entries": list(self.entries.items())}
+                self.dirty = 0
+            tmp_file = self.cache_file + ".tmp"
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_file, self.cache_file)
+        except Exception as e:
+            print_step("CACHE", f"⚠️ Gagal simpan cache: {e}")
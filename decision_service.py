@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+"""
+Decision Service - Daemon keputusan lokal untuk semua emulator
+1. Device worker kirim request lewat socket lokal (JSON per baris)
+2. Context yang identik di-coalesce jadi satu request
+3. Batch sampai N request per panggilan backend
+4. Limit concurrency per backend (semaphore di tiap backend)
+5. Backend pluggable: stub, rule engine, cached policy, external model (HTTP chat endpoint)
+Worker menemukan service lewat env DECISION_SERVICE=host:port (di-set supervisor / daemon).
+Fleet menjalankan backend "model": worker hanya bertanya kalau ULTIMATE_RULES lokalnya jatuh ke fallback,
+jadi "rules" / "cached" (rule yang sama atas analysis yang sama) tidak pernah bisa mengubah keputusan.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+import urllib.request
+from datetime import datetime
+from decision_cache import DecisionCache, screen_fingerprint, element_signature
+from rule_engine import RuleEngine, Facts, ULTIMATE_RULES
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+SERVICE_ENV = "DECISION_SERVICE"
+# Endpoint chat-completions (format OpenAI) untuk ExternalModelBackend
+MODEL_URL = os.environ.get("DECISION_MODEL_URL", "http://127.0.0.1:11434/v1/chat/completions")
+MODEL_NAME = os.environ.get("DECISION_MODEL", "gpt-5-nano")
+BACKENDS = ("stub", "rules", "cached", "model")
+# Backend yang berguna untuk worker fleet (lihat docstring modul); default supervisor / daemon / CLI
+FLEET_BACKENDS = ("model",)
+DEFAULT_BACKEND = "model"
+
+def print_step(step, message):
+    timestamp = datetime.now().strftime("%H:%M:%S")
+    print(f"[{timestamp}] [{step}] {message}")
+
+def make_context(screen_type, img, analysis, device=None):
+    """Context kecil yang dikirim worker (tanpa gambar)"""
+    buttons = analysis.get("buttons") or analysis.get("elements") or analysis.get("top_buttons") or []
+    return {
+        "device": device,
+        "screen_type": screen_type,
+        "fingerprint": screen_fingerprint(img),
+        "signature": element_signature(analysis),
+        "resolution": analysis.get("resolution") or (f"{img.shape[1]}x{img.shape[0]}" if img is not None else None),
+        "buttons": [
+            {"pos": list(b.get("pos") or b.get("position")), "size": list(b.get("size", [0, 0])), "area": int(b.get("area", 0))}
+            for b in buttons[:8]
+        ],
+        "colors": analysis.get("colors", [])
+    }
+
+def context_key(context):
+    """Key untuk coalescing: fingerprint + signature, atau hash dari isi context"""
+    if context.get("fingerprint"):
+        return f"{context.get('screen_type')}|{context['fingerprint']}|{context.get('signature', '')}"
+    raw = json.dumps({k: v for k, v in context.items() if k != "device"}, sort_keys=True)
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+class DecisionBackend:
+    """Interface backend: decide_batch(contexts) -> list keputusan (urutan sama)"""
+    name = "base"
+
+    def __init__(self, max_batch=8, concurrency=1):
+        self.max_batch = max_batch
+        self.concurrency = concurrency
+        self.semaphore = None
+
+    async def decide_batch(self, contexts):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    async def run_batch(self, contexts):
+        """decide_batch() dengan limit concurrency milik backend ini"""
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.concurrency)
+        async with self.semaphore:
+            return await self.decide_batch(contexts)
+
+class StubBackend(DecisionBackend):
+    """Backend lokal untuk test: jawaban tetap (atau dari fungsi), catat semua batch"""
+    name = "stub"
+
+    def __init__(self, decision=None, decide_fn=None, delay=0.0, max_batch=8, concurrency=1):
+        super().__init__(max_batch, concurrency)
+        self.decision = decision or {"action": "wait", "coordinates": None, "reason": "stub"}
+        self.decide_fn = decide_fn
+        self.delay = delay
+        self.batches = []
+
+    async def decide_batch(self, contexts):
+        self.batches.append(len(contexts))
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.decide_fn:
+            return [self.decide_fn(c) for c in contexts]
+        return [dict(self.decision) for _ in contexts]
+
+class RuleEngineBackend(DecisionBackend):
+    """Rule engine lokal, cukup cepat untuk dijalankan langsung di event loop"""
+    name = "rules"
+
+    def __init__(self, engine=None, max_batch=64, concurrency=8):
+        super().__init__(max_batch, concurrency)
+        self.engine = engine or RuleEngine(ULTIMATE_RULES)
+
+    async def decide_batch(self, contexts):
+        return [self.engine.decide(Facts.from_analysis(c.get("screen_type", "unknown"), c)) for c in contexts]
+
+class CachedPolicyBackend(DecisionBackend):
+    """DecisionCache di depan backend lain, miss diteruskan lalu disimpan"""
+    name = "cached"
+
+    def __init__(self, fallback, cache=None, max_batch=32, concurrency=4, save_every=10):
+        super().__init__(max_batch, concurrency)
+        self.fallback = fallback
+        self.cache = cache or DecisionCache("service_decision_cache.json")
+        # Tulis ke disk lewat executor, bukan di dalam event loop
+        self.cache.autosave_every = 0
+        self.save_every = save_every
+
+    async def decide_batch(self, contexts):
+        results = [None] * len(contexts)
+        misses = []
+        for i, context in enumerate(contexts):
+            cached = self.cache.get(context.get("screen_type"), context.get("fingerprint", ""), context.get("signature", ""))
+            if cached:
+                results[i] = dict(cached, source="cache")
+            else:
+                misses.append(i)
+
+        for start in range(0, len(misses), self.fallback.max_batch):
+            chunk = misses[start:start + self.fallback.max_batch]
+            decisions = await self.fallback.run_batch([contexts[i] for i in chunk])
+            for i, decision in zip(chunk, decisions):
+                results[i] = decision
+                # Wait "no model answer" / tebakan fallback jangan ditahan selama TTL
+                if decision.get("action") != "click" or decision.get("fallback"):
+                    continue
+                context = contexts[i]
+                self.cache.put(context.get("screen_type"), context.get("fingerprint", ""), context.get("signature", ""), decision)
+        if self.save_every and self.cache.dirty >= self.save_every:
+            await asyncio.get_running_loop().run_in_executor(None, self.cache.save)
+        return results
+
+    def close(self):
+        self.cache.save()
+
+class ExternalModelBackend(DecisionBackend):
+    """Model eksternal: satu prompt gabungan per batch, subclass implement call_model()"""
+    name = "external"
+
+    def __init__(self, max_batch=4, concurrency=2, timeout=30):
+        super().__init__(max_batch, concurrency)
+        self.timeout = timeout
+
+    def build_prompt(self, contexts):
+        lines = ["Line Ranger automation. For each numbered screen reply with one line: <n>: x, y or <n>: wait"]
+        for i, context in enumerate(contexts):
+            positions = [b["pos"] for b in context.get("buttons", [])[:3]]
+            colors = [c["color"] for c in context.get("colors", [])]
+            lines.append(f"{i}: screen={context.get('screen_type')} buttons={positions} colors={colors}")
+        return "\n".join(lines)
+
+    def parse_response(self, text, count):
+        decisions = [{"action": "wait", "coordinates": None, "reason": "no model answer"} for _ in range(count)]
+        for line in (text or "").splitlines():
+            if ":" not in line:
+                continue
+            head, tail = line.split(":", 1)
+            if not head.strip().isdigit() or int(head) >= count:
+                continue
+            parts = [p.strip() for p in tail.split(",")]
+            if len(parts) >= 2 and parts[0].isdigit() and parts[1].isdigit():
+                decisions[int(head)] = {"action": "click", "coordinates": [int(parts[0]), int(parts[1])], "reason": "model"}
+        return decisions
+
+    async def call_model(self, prompt):
+        raise NotImplementedError
+
+    async def decide_batch(self, contexts):
+        text = await asyncio.wait_for(self.call_model(self.build_prompt(contexts)), self.timeout)
+        return self.parse_response(text, len(contexts))
+
+class HTTPModelBackend(ExternalModelBackend):
+    """Endpoint chat-completions kompatibel OpenAI; request blocking dijalankan di thread executor"""
+    name = "model"
+
+    def __init__(self, url=MODEL_URL, model=MODEL_NAME, api_key=None, max_batch=4, concurrency=2, timeout=30):
+        super().__init__(max_batch, concurrency, timeout)
+        self.url = url
+        self.model = model
+        self.api_key = os.environ.get("DECISION_MODEL_KEY", "") if api_key is None else api_key
+
+    def _post(self, prompt):
+        body = json.dumps({"model": self.model, "temperature": 0.1,
+                           "messages": [{"role": "user", "content": prompt}]}).encode()
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        request = urllib.request.Request(self.url, data=body, headers=headers)
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            data = json.loads(response.read())
+        return data["choices"][0]["message"]["content"]
+
+    async def call_model(self, prompt):
+        return await asyncio.get_running_loop().run_in_executor(None, self._post, prompt)
+
+def create_backend(name=DEFAULT_BACKEND):
+    """Nama backend (BACKENDS) -> instance; "model" = cache di depan model eksternal,
+    "cached" = cache di depan rule engine (untuk client selain worker ULTIMATE_RULES)"""
+    if name == "stub":
+        return StubBackend()
+    if name == "model":
+        return CachedPolicyBackend(HTTPModelBackend())
+    if name == "rules":
+        return RuleEngineBackend()
+    if name == "cached":
+        return CachedPolicyBackend(RuleEngineBackend())
+    raise ValueError(f"backend tidak dikenal: {name}")
+
+class DecisionService:
+    """Server asyncio: coalesce + batch + limit concurrency per backend"""
+
+    def __init__(self, backend, host=DEFAULT_HOST, port=DEFAULT_PORT, batch_window=0.02):
+        self.backend = backend
+        self.host = host
+        self.port = port
+        self.batch_window = batch_window
+        self.inflight = {}  # key -> Future
+        self.pending = None
+        self.server = None
+        self.batcher = None
+        self.tasks = set()  # batch yang sedang jalan (referensi supaya task tidak di-GC)
+        self.clients = set()  # writer koneksi worker yang masih terbuka
+        self.loop = None
+        self.stats = {"requests": 0, "coalesced": 0, "batches": 0, "batched_requests": 0, "errors": 0}
+
+    async def decide(self, context):
+        """Satu keputusan, context identik yang sedang diproses ikut menunggu future yang sama"""
+        self.stats["requests"] += 1
+        key = context_key(context)
+        future = self.inflight.get(key)
+        if future is not None:
+            self.stats["coalesced"] += 1
+            return dict(await asyncio.shield(future), coalesced=True)
+
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        await self.pending.put((key, context, future))
+        return dict(await asyncio.shield(future))
+
+    async def _run_batch(self, batch):
+        try:
+            decisions = await self.backend.run_batch([context for _, context, _ in batch])
+            for (key, _, future), decision in zip(batch, decisions):
+                if not future.done():
+                    future.set_result(dict(decision, backend=self.backend.name, batch_size=len(batch)))
+            if len(decisions) != len(batch):
+                raise ValueError(f"backend {self.backend.name} menjawab {len(decisions)} dari {len(batch)} context")
+        except Exception as e:
+            self.stats["errors"] += 1
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_result({"action": "wait", "coordinates": None, "reason": f"backend error: {e}"})
+        finally:
+            for key, _, _ in batch:
+                self.inflight.pop(key, None)
+
+    async def _batch_loop(self):
+        while True:
+            batch = [await self.pending.get()]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.backend.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.pending.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            self.stats["batches"] += 1
+            self.stats["batched_requests"] += len(batch)
+            task = asyncio.ensure_future(self._run_batch(batch))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def _handle_client(self, reader, writer):
+        self.clients.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    writer.write(b'{"error": "invalid json"}\n')
+                    await writer.drain()
+                    continue
+                if request.get("method") == "stats":
+                    response = {"id": request.get("id"), "stats": self.get_stats()}
+                else:
+                    decision = await self.decide(request.get("context", {}))
+                    response = {"id": request.get("id"), "decision": decision}
+                writer.write((json.dumps(response) + "\n").encode())
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.clients.discard(writer)
+            writer.close()
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.pending = asyncio.Queue()
+        self.batcher = asyncio.ensure_future(self._batch_loop())
+        self.server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        print_step("SERVICE", f"Decision service di {self.host}:{self.port} (backend: {self.backend.name})")
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            for writer in list(self.clients):
+                writer.close()
+            await self.server.wait_closed()
+        if self.batcher:
+            self.batcher.cancel()
+        if self.tasks:
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+        await asyncio.get_running_loop().run_in_executor(None, self.backend.close)
+
+    async def serve_forever(self):
+        await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats["avg_batch"] = round(stats["batched_requests"] / stats["batches"], 2) if stats["batches"] else 0.0
+        stats["inflight"] = len(self.inflight)
+        return stats
+
+def start_service_thread(backend, host=DEFAULT_HOST, port=0, timeout=10):
+    """Jalankan DecisionService di thread background (event loop sendiri), return setelah listen.
+    Alamatnya di-set ke env DECISION_SERVICE supaya proses worker (spawn) ikut memakainya."""
+    service = DecisionService(backend, host, port)
+    ready = threading.Event()
+    errors = []
+
+    def run():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(service.start())
+        except Exception as e:
+            errors.append(e)
+            ready.set()
+            loop.close()
+            return
+        ready.set()
+        loop.run_forever()
+        # Handler client selesai sendiri setelah koneksinya ditutup stop(); sisanya dibatalkan
+        tasks = asyncio.all_tasks(loop)
+        if tasks:
+            _, pending = loop.run_until_complete(asyncio.wait(tasks, timeout=2))
+            for task in pending:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        loop.close()
+
+    threading.Thread(target=run, name="decision-service", daemon=True).start()
+    if not ready.wait(timeout) or errors:
+        raise RuntimeError(f"decision service gagal start: {errors[0] if errors else 'timeout'}")
+    os.environ[SERVICE_ENV] = f"{service.host}:{service.port}"
+    return service
+
+def stop_service_thread(service, timeout=30):
+    """Stop service dari thread lain (drain batch + simpan cache backend)"""
+    if service.loop is None or not service.loop.is_running():
+        return
+    try:
+        asyncio.run_coroutine_threadsafe(service.stop(), service.loop).result(timeout)
+    finally:
+        service.loop.call_soon_threadsafe(service.loop.stop)
+
+class DecisionClient:
+    """Client sinkron untuk device worker, satu koneksi persistent"""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=30):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.sock = None
+        self.file = None
+        self.lock = threading.Lock()
+        self.counter = 0
+
+    def connect(self):
+        self.sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self.file = self.sock.makefile("rwb")
+
+    def _call(self, request):
+        with self.lock:
+            if self.sock is None:
+                self.connect()
+            self.counter += 1
+            request["id"] = self.counter
+            try:
+                self.file.write((json.dumps(request) + "\n").encode())
+                self.file.flush()
+                line = self.file.readline()
+            except OSError:
+                self.close()
+                raise
+            if not line:
+                self.close()
+                raise ConnectionError("decision service closed connection")
+            return json.loads(line)
+
+    def decide(self, context):
+        return self._call({"context": context})["decision"]
+
+    def get_stats(self):
+        return self._call({"method": "stats"})["stats"]
+
+    @classmethod
+    def from_env(cls):
+        """Client ke service di env DECISION_SERVICE (host:port), None kalau tidak di-set"""
+        address = os.environ.get(SERVICE_ENV)
+        if not address:
+            return None
+        host, _, port = address.rpartition(":")
+        return cls(host or DEFAULT_HOST, int(port))
+
+    def close(self):
+        try:
+            if self.file:
+                self.file.close()
+            if self.sock:
+                self.sock.close()
+        except OSError:
+            pass
+        self.sock = None
+        self.file = None
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Local decision service")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND)
+    args = parser.parse_args()
+
+    service = DecisionService(create_backend(args.backend), port=args.port)
+    try:
+        asyncio.run(service.serve_forever())
+    except KeyboardInterrupt:
+        service.backend.close()
+        print_step("SERVICE", f"Stopped: {service.get_stats()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Detector Benchmark - Akurasi, latency p50/p95/p99 dan peak memory per detektor
+Semua screen classifier dan button finder dijalankan di corpus screenshot berlabel
+(default: corpus beku di corpus/, bisa diganti lewat --corpus labels.json).
+Backend yang dibandingkan:
+  - hsv_*             : threshold warna HSV yang sudah dipakai automation
+  - fingerprint_index : nearest neighbour dHash (leave-one-out per gambar)
+  - template_pyramid  : template matching multi-skala dari crop corpus (sumber crop di-hold out)
+Hasil JSON bisa dibandingkan dengan baseline (--compare) untuk menangkap regresi.
+"""
+import contextlib
+import io
+import json
+import os
+import platform
+import time
+import tracemalloc
+from datetime import datetime
+from unittest import mock
+import cv2
+import numpy as np
+from decision_cache import screen_fingerprint, hamming_distance
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Label halus -> label kasar yang dipakai detektor HSV (lobby = layar menu yang bisa diklik)
+SCREEN_GROUPS = {
+    "loading": "loading",
+    "lobby": "lobby",
+    "stage_map": "lobby",
+    "stage_prepare": "lobby",
+    "dialog": "unknown"
+}
+
+# Corpus beku: gambar di corpus/frames (bukan screenshot kerja yang ditimpa script lain) + label di
+# corpus/labels.json. Koordinat dalam piksel gambar; button = rect [x1, y1, x2, y2], list rect, atau None
+# (tidak boleh ketemu). "templates": label -> crop sumber untuk template_pyramid.
+CORPUS_DIR = os.path.join(BASE_DIR, "corpus")
+LABELS_PATH = os.path.join(CORPUS_DIR, "labels.json")
+
+def print_step(step, message):
+    timestamp = datetime.now().strftime("%H:%M:%S")
+    print(f"[{timestamp}] [{step}] {message}")
+
+def load_labels(path=None):
+    """(frames, templates, base dir) dari file label; format lama (list entry saja) tetap diterima"""
+    path = path or LABELS_PATH
+    with open(path, encoding="utf-8") as f:
+        labels = json.load(f)
+    if isinstance(labels, list):
+        labels = {"frames": labels}
+    return labels["frames"], labels.get("templates"), os.path.dirname(os.path.abspath(path))
+
+def load_corpus(path=None):
+    """Corpus berlabel; path gambar relatif terhadap file label (default corpus/labels.json)"""
+    entries, _, base = load_labels(path)
+    corpus = []
+    for entry in entries:
+        path = os.path.join(base, entry["image"])
+        img = cv2.imread(path)
+        if img is None:
+            print_step("CORPUS", f"⚠️ Gambar tidak bisa dibaca: {entry['image']}")
+            continue
+        corpus.append(dict(entry, img=img, path=os.path.normcase(os.path.abspath(path))))
+    return corpus
+
+def load_templates(path=None):
+    """label -> (path gambar sumber, rect); file label tanpa "templates" pakai template corpus default"""
+    _, templates, base = load_labels(path)
+    if not templates:
+        _, templates, base = load_labels()
+    return {label: (os.path.join(base, t["image"]), t["rect"]) for label, t in templates.items()}
+
+def percentile(values, q):
+    return round(float(np.percentile(values, q)), 3) if values else None
+
+def point_of(result):
+    """Normalisasi output button finder -> (x, y) pertama atau None"""
+    if result is None:
+        return None
+    if isinstance(result, dict):
+        return point_of(result.get("pos"))
+    if isinstance(result, (list, tuple)) and result and isinstance(result[0], (list, tuple, dict)):
+        return point_of(result[0])
+    if isinstance(result, (list, tuple)) and len(result) >= 2:
+        return int(result[0]), int(result[1])
+    return None
+
+def in_rects(point, rects):
+    if point is None:
+        return False
+    rects = rects if isinstance(rects[0], (list, tuple)) else [rects]
+    return any(x1 <= point[0] <= x2 and y1 <= point[1] <= y2 for x1, y1, x2, y2 in rects)
+
+class FingerprintIndex:
+    """Klasifikasi layar dengan dHash terdekat di corpus; gambar yang sama dilewati (leave-one-out)"""
+
+    def __init__(self, corpus, max_distance=12):
+        self.max_distance = max_distance
+        self.entries = [(entry["image"], screen_fingerprint(entry["img"]), entry["screen"]) for entry in corpus]
+
+    def classify(self, img, exclude=None):
+        fingerprint = screen_fingerprint(img)
+        best = min(((hamming_distance(fingerprint, fp), label) for name, fp, label in self.entries if name != exclude),
+                   default=(None, "unknown"))
+        return best[1] if best[0] is not None and best[0] <= self.max_distance else "unknown"
+
+class TemplatePyramid:
+    """Template matching grayscale setengah resolusi di beberapa skala; skor terbaik di atas threshold menang.
+    Template yang di-crop dari gambar yang sedang dinilai dilewati (held out), sama seperti FingerprintIndex."""
+
+    def __init__(self, templates, scales=(0.8, 0.9, 1.0, 1.1, 1.25), threshold=0.6, work_scale=0.5):
+        self.threshold = threshold
+        self.work_scale = work_scale
+        self.templates = {}  # label -> (nama file sumber, pyramid)
+        for label, (path, (x1, y1, x2, y2)) in templates.items():
+            source = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+            if source is None:
+                continue
+            crop = source[y1:y2, x1:x2]
+            self.templates[label] = (os.path.normcase(os.path.abspath(path)),
+                                     [cv2.resize(crop, None, fx=work_scale * s, fy=work_scale * s,
+                                                 interpolation=cv2.INTER_AREA) for s in scales])
+
+    def classify(self, img, exclude=None):
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        # Normalisasi ke lebar 1600 supaya skala template konsisten antar resolusi emulator
+        factor = self.work_scale * 1600 / gray.shape[1]
+        gray = cv2.resize(gray, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA)
+        best_label, best_score = "unknown", self.threshold
+        for label, (source, pyramid) in self.templates.items():
+            if source == exclude:
+                continue
+            for template in pyramid:
+                if template.shape[0] > gray.shape[0] or template.shape[1] > gray.shape[1]:
+                    continue
+                score = float(cv2.minMaxLoc(cv2.matchTemplate(gray, template, cv2.TM_CCOEFF_NORMED))[1])
+                if score > best_score:
+                    best_label, best_score = label, score
+        return best_label
+
+def build_detectors(corpus, templates):
+    """name -> (kind, key, func(img, image_name)). kind: screen | button; key: label button di corpus"""
+    import enhanced_safe_line_ranger_ai
+    import simple_main_stage_ai
+    import smart_line_ranger_ai
+    import stage_number_clicker
+    import template_stage_clicker
+    import ultimate_line_ranger_ai
+
+    ultimate = ultimate_line_ranger_ai.UltimateGameplayAI()
+    enhanced = enhanced_safe_line_ranger_ai.EnhancedGameplayAI()
+    smart = smart_line_ranger_ai.SmartLineRangerAI()
+    fingerprints = FingerprintIndex(corpus)
+    pyramid = TemplatePyramid(templates)
+    sources = {entry["image"]: entry["path"] for entry in corpus}
+    return {
+        "hsv_ultimate": ("screen", None, lambda img, name: ultimate.detect_screen_type(img)[0]),
+        "hsv_enhanced": ("screen", None, lambda img, name: enhanced.detect_screen_type(img)[0]),
+        "hsv_smart": ("screen", None, lambda img, name: smart.detect_screen_type(img)["type"]),
+        "fingerprint_index": ("screen", None, fingerprints.classify),
+        "template_pyramid": ("screen", None, lambda img, name: pyramid.classify(img, sources.get(name))),
+        "ultimate.main_stage": ("button", "main_stage", lambda img, name: ultimate.find_main_stage_button(img)),
+        "simple.main_stage_precise": ("button", "main_stage",
+                                      lambda img, name: simple_main_stage_ai.find_main_stage_precise(img)),
+        "ultimate.start_button": ("button", "start_button", lambda img, name: ultimate.find_start_button(img)),
+        "clicker.start_button": ("button", "start_button",
+                                 lambda img, name: stage_number_clicker.find_start_button(img)),
+        "ultimate.yellow_stages": ("button", "stage_numbers",
+                                   lambda img, name: ultimate.find_yellow_stage_numbers(img)),
+        "clicker.stage_numbers": ("button", "stage_numbers",
+                                  lambda img, name: stage_number_clicker.find_stage_numbers(img)),
+        "template.yellow_circular": ("button", "stage_numbers",
+                                     lambda img, name: template_stage_clicker.find_yellow_circular_stages(img))
+    }
+
+@contextlib.contextmanager
+def quiet():
+    """Matikan print + log_action (tulis file JSON) selama benchmark supaya tidak ikut terukur/terekam"""
+    import enhanced_safe_line_ranger_ai
+    import ultimate_line_ranger_ai
+    with contextlib.redirect_stdout(io.StringIO()), \
+            mock.patch.object(ultimate_line_ranger_ai, "log_action"), \
+            mock.patch.object(enhanced_safe_line_ranger_ai, "log_action"):
+        yield
+
+def score(kind, key, entry, result):
+    """Return (correct, expected, got) atau None kalau gambar tidak berlabel untuk detektor ini"""
+    if kind == "screen":
+        expected, got = entry["screen"], result
+        # Label halus dinilai kasar juga supaya backend HSV (lobby/loading/unknown) bisa dibandingkan
+        fine = got == expected
+        return fine or SCREEN_GROUPS.get(got, got) == SCREEN_GROUPS[expected], expected, got
+    if key not in entry.get("buttons", {}):
+        return None
+    expected, point = entry["buttons"][key], point_of(result)
+    correct = point is None if expected is None else in_rects(point, expected)
+    return correct, expected, point
+
+def run_benchmark(corpus, templates, repeat=3, only=None):
+    detectors = build_detectors(corpus, templates)
+    if only:
+        detectors = {name: d for name, d in detectors.items() if any(o in name for o in only)}
+    results = {}
+    for name, (kind, key, func) in detectors.items():
+        print_step("BENCH", f"{name} ({kind}) x{repeat}")
+        latencies, correct, fine, labeled, errors, peaks = [], 0, 0, 0, [], []
+        for entry in corpus:
+            with quiet():
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    result = func(entry["img"], entry["image"])
+                    latencies.append((time.perf_counter() - started) * 1000)
+                # Pass terpisah untuk memory: tracemalloc memperlambat, jadi tidak ikut latency
+                tracemalloc.start()
+                func(entry["img"], entry["image"])
+                peaks.append(tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+            outcome = score(kind, key, entry, result)
+            if outcome is None:
+                continue
+            labeled += 1
+            correct += outcome[0]
+            fine += kind == "screen" and outcome[2] == outcome[1]
+            if not outcome[0]:
+                errors.append({"image": entry["image"], "expected": outcome[1], "got": outcome[2]})
+        results[name] = {
+            "kind": kind,
+            "key": key,
+            "labeled": labeled,
+            "accuracy": round(correct / labeled, 3) if labeled else None,
+            "fine_accuracy": round(fine / labeled, 3) if kind == "screen" and labeled else None,
+            "latency_ms": {"p50": percentile(latencies, 50), "p95": percentile(latencies, 95),
+                           "p99": percentile(latencies, 99), "mean": round(float(np.mean(latencies)), 3),
+                           "max": round(max(latencies), 3)},
+            "peak_kb": round(max(peaks) / 1024, 1),
+            "errors": errors
+        }
+    return {
+        "meta": {
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "opencv": cv2.__version__,
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "images": len(corpus),
+            "repeat": repeat
+        },
+        "detectors": results
+    }
+
+def compare(current, baseline, max_slowdown=0.25, max_accuracy_drop=0.0):
+    """Bandingkan dengan baseline; return list regresi (p95 lebih lambat / akurasi turun)"""
+    regressions = []
+    for name, result in current["detectors"].items():
+        base = baseline.get("detectors", {}).get(name)
+        if not base:
+            continue
+        old_p95, new_p95 = base["latency_ms"]["p95"], result["latency_ms"]["p95"]
+        if old_p95 and new_p95 > old_p95 * (1 + max_slowdown):
+            regressions.append(f"{name}: p95 {old_p95}ms -> {new_p95}ms")
+        if base["accuracy"] is not None and result["accuracy"] is not None and \
+                result["accuracy"] < base["accuracy"] - max_accuracy_drop:
+            regressions.append(f"{name}: accuracy {base['accuracy']} -> {result['accuracy']}")
+    return regressions
+
+def print_table(report):
+    print(f"{'detector':28} {'acc':>6} {'fine':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'peak KB':>9}")
+    for name, r in report["detectors"].items():
+        latency = r["latency_ms"]
+        print(f"{name:28} {str(r['accuracy']):>6} {'-' if r['fine_accuracy'] is None else r['fine_accuracy']:>6} "
+              f"{latency['p50']:>9} {latency['p95']:>9} {latency['p99']:>9} {r['peak_kb']:>9}")
+
+def main():
+    import argparse
+    import sys
+    parser = argparse.ArgumentParser(description="Benchmark screen classifier + button finder di corpus berlabel")
+    parser.add_argument("--corpus", default=None, help="File JSON label (default: corpus/labels.json)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", nargs="*", default=None, help="Filter nama detektor (substring)")
+    parser.add_argument("--output", default="detector_benchmark.json")
+    parser.add_argument("--compare", default=None, help="Baseline JSON; exit 1 kalau ada regresi")
+    parser.add_argument("--max-slowdown", type=float, default=0.25)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    print_step("BENCH", f"Corpus: {len(corpus)} gambar")
+    report = run_benchmark(corpus, load_templates(args.corpus), args.repeat, args.only)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print_table(report)
+    print_step("BENCH", f"Hasil disimpan: {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.max_slowdown)
+        for regression in regressions:
+            print_step("REGRESI", f"❌ {regression}")
+        if regressions:
+            sys.exit(1)
+        print_step("BENCH", "✅ Tidak ada regresi dibanding baseline")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Device Inventory - Model semua instance LDPlayer di memory
+1. Parse `ldconsole list2` + `adb devices` jadi data terstruktur
+2. Refresh incremental (timer) + event dari `adb track-devices`
+3. Lookup dari memory, thread-safe
+4. get_inventory(): satu inventory per path LDPlayer untuk pemanggil sinkron (refresh kalau sudah basi)
+5. Flag ready (hasil provisioning) disimpan ke READY_FILE, dibaca ulang proses lain saat refresh
+"""
+import json
+import os
+import subprocess
+import threading
+import time
+from datetime import datetime
+
+LDPLAYER_PATH = "C:\\LDPlayer\\LDPlayer9"
+READY_FILE = "provisioned_instances.json"
+
+def print_step(step, message):
+    timestamp = datetime.now().strftime("%H:%M:%S")
+    print(f"[{timestamp}] [{step}] {message}")
+
+def adb_serial(index):
+    """LDPlayer index -> serial ADB (index 0 = emulator-5554)"""
+    return f"emulator-{5554 + 2 * int(index)}"
+
+def _to_text(output):
+    if isinstance(output, bytes):
+        return output.decode("utf-8", errors="replace")
+    return output or ""
+
+def _to_int(value, default=0):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+def parse_list2(output):
+    """`ldconsole list2`: index,title,top_hwnd,bind_hwnd,android_started,pid,vbox_pid,width,height,dpi"""
+    instances = {}
+    for line in _to_text(output).splitlines():
+        fields = [f.strip() for f in line.strip().split(",")]
+        if len(fields) < 2 or not fields[0].isdigit():
+            continue
+        fields += [""] * (10 - len(fields))
+        index = int(fields[0])
+        pid = _to_int(fields[5], -1)
+        instances[index] = {
+            "index": index,
+            "name": fields[1],
+            "serial": adb_serial(index),
+            "top_hwnd": _to_int(fields[2]),
+            "bind_hwnd": _to_int(fields[3]),
+            "android_started": fields[4] == "1",
+            "pid": pid,
+            "vbox_pid": _to_int(fields[6], -1),
+            "running": pid > 0,
+            "width": _to_int(fields[7]),
+            "height": _to_int(fields[8]),
+            "dpi": _to_int(fields[9])
+        }
+    return instances
+
+def parse_adb_devices(output):
+    """`adb devices` / payload track-devices -> {serial: state}"""
+    devices = {}
+    for line in _to_text(output).splitlines():
+        line = line.strip()
+        if not line or line.startswith("List of devices") or line.startswith("*"):
+            continue
+        parts = line.split()
+        if len(parts) >= 2:
+            devices[parts[0]] = parts[1]
+    return devices
+
+class DeviceInventory:
+    """Cache instance LDPlayer, refresh di background, lookup dari memory"""
+
+    def __init__(self, ldplayer_path=LDPLAYER_PATH, refresh_interval=5, track_adb=True, ready_file=READY_FILE):
+        self.ldplayer_path = ldplayer_path
+        self.ldconsole = os.path.join(ldplayer_path, "ldconsole.exe")
+        self.adb = os.path.join(ldplayer_path, "adb.exe")
+        self.refresh_interval = refresh_interval
+        self.track_adb = track_adb
+        self.instances = {}  # index -> dict
+        self.adb_states = {}  # serial -> state
+        self.ready_names = set()  # Instance yang sudah di-provision (lihat provisioning.py)
+        self.ready_file = ready_file
+        self.ready_mtime = None
+        self.listeners = []
+        self.lock = threading.RLock()
+        self.refresh_lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.track_process = None
+        self.last_refresh = 0.0
+
+    def run_cmd(self, args, timeout=15):
+        try:
+            result = subprocess.run(args, capture_output=True, timeout=timeout)
+            return _to_text(result.stdout), result.returncode == 0
+        except Exception:
+            return "", False
+
+    def add_listener(self, callback):
+        """callback(event, instance) untuk 'added', 'removed', 'changed'"""
+        self.listeners.append(callback)
+
+    def _notify(self, changes):
+        for event, instance in changes:
+            for callback in self.listeners:
+                try:
+                    callback(event, dict(instance))
+                except Exception as e:
+                    print_step("INVENTORY", f"⚠️ Listener error: {e}")
+
+    def _load_ready(self):
+        """Baca ulang READY_FILE kalau berubah (provisioning bisa jalan di proses lain)"""
+        if not self.ready_file:
+            return
+        try:
+            mtime = os.path.getmtime(self.ready_file)
+            if mtime == self.ready_mtime:
+                return
+            with open(self.ready_file, "r", encoding="utf-8") as f:
+                names = set(json.load(f))
+        except (OSError, ValueError, TypeError):
+            return
+        with self.lock:
+            self.ready_names = names
+            self.ready_mtime = mtime
+
+    def _save_ready(self):
+        if not self.ready_file:
+            return
+        try:
+            with open(self.ready_file, "w", encoding="utf-8") as f:
+                json.dump(sorted(self.ready_names), f, indent=2)
+            self.ready_mtime = os.path.getmtime(self.ready_file)
+        except OSError as e:
+            print_step("INVENTORY", f"⚠️ Gagal simpan {self.ready_file}: {e}")
+
+    def _merge(self, instances):
+        """Update hanya entry yang berubah, return list perubahan"""
+        changes = []
+        with self.lock:
+            for index, instance in instances.items():
+                instance["adb_state"] = self.adb_states.get(instance["serial"], "offline")
+                instance["ready"] = instance["name"] in self.ready_names
+                old = self.instances.get(index)
+                if old is None:
+                    self.instances[index] = instance
+                    changes.append(("added", instance))
+                elif old != instance:
+                    old.update(instance)
+                    changes.append(("changed", old))
+            for index in [i for i in self.instances if i not in instances]:
+                changes.append(("removed", self.instances.pop(index)))
+        return changes
+
+    def _apply_adb_states(self, states):
+        changes = []
+        with self.lock:
+            self.adb_states = dict(states)
+            for instance in self.instances.values():
+                state = states.get(instance["serial"], "offline")
+                if instance.get("adb_state") != state:
+                    instance["adb_state"] = state
+                    changes.append(("changed", instance))
+        return changes
+
+    def refresh(self):
+        """Baca ulang list2 + adb devices, update incremental"""
+        output, success = self.run_cmd([self.ldconsole, "list2"])
+        changes = []
+        if not self.track_process:
+            adb_output, adb_success = self.run_cmd([self.adb, "devices"])
+            if adb_success:
+                changes += self._apply_adb_states(parse_adb_devices(adb_output))
+        if success:
+            self._load_ready()
+            changes += self._merge(parse_list2(output))
+        self.last_refresh = time.time()
+        self._notify(changes)
+        return changes
+
+    def refresh_if_stale(self, max_age=None):
+        """Refresh hanya kalau data lebih tua dari max_age (default refresh_interval); thread lain menunggu"""
+        max_age = self.refresh_interval if max_age is None else max_age
+        with self.refresh_lock:
+            if time.time() - self.last_refresh >= max_age:
+                self.refresh()
+        return self
+
+    def invalidate(self):
+        """Data basi setelah aksi yang mengubah instance (add, copy, rename, launch, quit)"""
+        self.last_refresh = 0.0
+
+    def _refresh_loop(self):
+        while not self.stop_event.is_set():
+            self.refresh()
+            self.stop_event.wait(self.refresh_interval)
+
+    def _track_loop(self):
+        """`adb track-devices`: payload 4 digit hex panjang + daftar device, dikirim tiap ada perubahan"""
+        while not self.stop_event.is_set():
+            try:
+                self.track_process = subprocess.Popen([self.adb, "track-devices"], stdout=subprocess.PIPE,
+                                                      stderr=subprocess.DEVNULL)
+                stream = self.track_process.stdout
+                while not self.stop_event.is_set():
+                    header = stream.read(4)
+                    if len(header) < 4:
+                        break
+                    payload = stream.read(int(header, 16)) if int(header, 16) else b""
+                    self._notify(self._apply_adb_states(parse_adb_devices(payload)))
+            except Exception as e:
+                print_step("INVENTORY", f"⚠️ track-devices error: {e}")
+            finally:
+                if self.track_process:
+                    self.track_process.kill()
+                self.track_process = None
+            self.stop_event.wait(self.refresh_interval)
+
+    def start(self):
+        """Refresh pertama sinkron, lalu background thread"""
+        self.stop_event.clear()
+        self.refresh()
+        threading.Thread(target=self._refresh_loop, daemon=True).start()
+        if self.track_adb:
+            threading.Thread(target=self._track_loop, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.track_process:
+            self.track_process.kill()
+
+    def mark_ready(self, name, ready=True):
+        """Tandai instance siap pakai (clone + app + prewarm selesai), disimpan ke ready_file"""
+        changes = []
+        with self.lock:
+            self._load_ready()
+            if ready:
+                self.ready_names.add(name)
+            else:
+                self.ready_names.discard(name)
+            self._save_ready()
+            for instance in self.instances.values():
+                if instance["name"] == name and instance.get("ready") != ready:
+                    instance["ready"] = ready
+                    changes.append(("changed", instance))
+        self._notify(changes)
+
+    def all(self):
+        with self.lock:
+            return [dict(self.instances[i]) for i in sorted(self.instances)]
+
+    def get(self, index):
+        with self.lock:
+            instance = self.instances.get(int(index))
+            return dict(instance) if instance else None
+
+    def by_name(self, name):
+        with self.lock:
+            return next((dict(i) for i in self.instances.values() if i["name"] == name), None)
+
+    def by_serial(self, serial):
+        with self.lock:
+            return next((dict(i) for i in self.instances.values() if i["serial"] == serial), None)
+
+    def running(self):
+        with self.lock:
+            return [dict(i) for i in self.instances.values() if i["running"]]
+
+    def ready(self):
+        with self.lock:
+            return [dict(i) for i in self.instances.values() if i.get("ready")]
+
+    def online(self):
+        """Instance yang ADB-nya state 'device'"""
+        with self.lock:
+            return [dict(i) for i in self.instances.values() if i.get("adb_state") == "device"]
+
+    def adb_devices(self, state="device"):
+        """Semua serial dari `adb devices` dengan state tertentu (termasuk device non-LDPlayer)"""
+        with self.lock:
+            return [serial for serial, value in self.adb_states.items() if value == state]
+
+_inventories_lock = threading.Lock()
+_inventories = {}
+
+def get_inventory(ldplayer_path=LDPLAYER_PATH, max_age=None):
+    """Satu DeviceInventory per path LDPlayer (tanpa thread background), di-refresh kalau basi"""
+    with _inventories_lock:
+        inventory = _inventories.get(ldplayer_path)
+        if inventory is None:
+            inventory = _inventories[ldplayer_path] = DeviceInventory(ldplayer_path, track_adb=False)
+    return inventory.refresh_if_stale(max_age)
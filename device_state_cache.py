@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Device State Cache - Cache TTL untuk query status device (getprop, dumpsys, ps, pm list)
+1. Tiap key punya TTL sendiri (boot_completed lama, foreground activity pendek)
+2. Request bersamaan untuk key yang sama digabung: satu perintah adb in-flight, thread lain menunggu hasilnya
+3. Invalidasi eksplisit per key atau lewat event (tap, launch, install, reboot)
+Hasil gagal (adb error / timeout) tidak di-cache.
+"""
+import subprocess
+import threading
+import time
+from datetime import datetime
+
+ADB_PATH = "C:\\LDPlayer\\LDPlayer9\\adb.exe"
+PACKAGE = "com.linecorp.LGRGS"
+# TTL default per key (detik); "running" = instance emulator hidup (ldconsole isrunning).
+# Key lain (shell:..., prop:...) pakai TTL prefix-nya kalau ada, selain itu DEFAULT_TTL.
+TTLS = {"boot_completed": 30.0, "packages": 300.0, "processes": 3.0, "foreground": 2.0, "running": 5.0}
+DEFAULT_TTL = 10.0
+# Event -> key yang pasti basi setelah event tersebut ("*" = semua)
+INVALIDATE_ON = {
+    "tap": ["foreground"],
+    "launch": ["foreground", "processes"],
+    "stop": ["foreground", "processes"],
+    "install": ["packages"],
+    "reboot": ["*"],
+}
+
+def print_step(step, message):
+    timestamp = datetime.now().strftime("%H:%M:%S")
+    print(f"[{timestamp}] [{step}] {message}")
+
+class _Flight:
+    """Satu load yang sedang berjalan; thread lain menunggu event"""
+    __slots__ = ("event", "value", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+class DeviceStateCache:
+    """Cache status satu device; runner(args) -> stdout, default adb -s serial <args>"""
+
+    def __init__(self, serial="emulator-5554", adb_path=ADB_PATH, runner=None, ttls=None, timeout=15):
+        self.serial = serial
+        self.adb_path = adb_path
+        self.runner = runner or self._adb
+        self.ttls = dict(TTLS, **(ttls or {}))
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.entries = {}  # key -> (value, expires)
+        self.inflight = {}  # key -> _Flight
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "errors": 0, "invalidations": 0}
+
+    def _adb(self, args):
+        """stdout `adb -s serial <args>`; exit code != 0 -> CalledProcessError (hasil gagal tidak di-cache)"""
+        return subprocess.run([self.adb_path, "-s", self.serial] + list(args), capture_output=True, text=True,
+                              timeout=self.timeout, check=True).stdout
+
+    def get(self, key, loader, ttl=None):
+        """Nilai key dari cache, atau loader() sekali untuk semua thread yang meminta bersamaan"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self.stats["hits"] += 1
+                return entry[0]
+            flight = self.inflight.get(key)
+            owner = flight is None
+            if owner:
+                flight = self.inflight[key] = _Flight()
+                self.stats["misses"] += 1
+            else:
+                self.stats["coalesced"] += 1
+        if not owner:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        try:
+            flight.value = loader()
+        except Exception as e:
+            flight.error = e
+            with self.lock:
+                self.stats["errors"] += 1
+            raise
+        else:
+            ttl = self._ttl(key) if ttl is None else ttl
+            with self.lock:
+                # Invalidasi selama load berjalan menghapus flight: hasilnya jangan disimpan
+                if self.inflight.get(key) is flight:
+                    self.entries[key] = (flight.value, time.monotonic() + ttl)
+            return flight.value
+        finally:
+            with self.lock:
+                if self.inflight.get(key) is flight:
+                    del self.inflight[key]
+            flight.event.set()
+
+    def _ttl(self, key):
+        return self.ttls.get(key, self.ttls.get(key.split(":", 1)[0], DEFAULT_TTL))
+
+    def invalidate(self, *keys):
+        """Hapus key tertentu; tanpa argumen / "*" = semua"""
+        with self.lock:
+            if not keys or "*" in keys:
+                self.entries.clear()
+                self.inflight.clear()
+            else:
+                for key in keys:
+                    # "foreground" ikut menghapus "foreground:..." (query turunan key yang sama)
+                    for table in (self.entries, self.inflight):
+                        for name in [name for name in table if name == key or name.startswith(key + ":")]:
+                            del table[name]
+            self.stats["invalidations"] += 1
+
+    def notify(self, event):
+        """Hook untuk aksi yang mengubah status device (tap, launch, stop, install, reboot)"""
+        self.invalidate(*INVALIDATE_ON.get(event, ["*"]))
+
+    def shell(self, command, key=None, ttl=None):
+        """Output `adb shell command` (string, sudah di-strip), di-cache per key; adb gagal -> "" (tidak di-cache)"""
+        key = key or f"shell:{command}"
+        try:
+            return self.get(key, lambda: _text(self.runner(["shell", command])).strip(), ttl)
+        except (OSError, subprocess.SubprocessError):
+            return ""
+
+    def getprop(self, name, ttl=None):
+        return self.shell(f"getprop {name}", key=f"prop:{name}", ttl=ttl)
+
+    def boot_completed(self):
+        # Belum boot tidak di-cache lama: cek ulang di panggilan berikutnya
+        booted = self.shell("getprop sys.boot_completed", key="boot_completed") == "1"
+        if not booted:
+            self.invalidate("boot_completed")
+        return booted
+
+    def packages(self):
+        """Set nama package terinstal (pm list packages); adb gagal -> set kosong (tidak di-cache)"""
+        def load():
+            output = _text(self.runner(["shell", "pm list packages"]))
+            packages = {line.split(":", 1)[1].strip() for line in output.splitlines() if line.startswith("package:")}
+            if not packages:
+                raise subprocess.SubprocessError("pm list packages kosong")
+            return packages
+        try:
+            return self.get("packages", load)
+        except (OSError, subprocess.SubprocessError):
+            return set()
+
+    def is_installed(self, package=PACKAGE):
+        return package in self.packages()
+
+    def processes(self):
+        return self.shell("ps -A 2>/dev/null || ps", key="processes")
+
+    def is_running(self, package=PACKAGE):
+        """Proses package ada di ps (boleh belum foreground)"""
+        return package.lower() in self.processes().lower()
+
+    def foreground(self):
+        """Baris mResumedActivity (activity yang sedang tampil)"""
+        return self.shell("dumpsys activity activities | grep mResumedActivity", key="foreground")
+
+    def is_foreground(self, package=PACKAGE):
+        return package in self.foreground()
+
+    def get_stats(self):
+        with self.lock:
+            lookups = self.stats["hits"] + self.stats["misses"] + self.stats["coalesced"]
+            return dict(self.stats, keys=len(self.entries), inflight=len(self.inflight),
+                        hit_rate=round((self.stats["hits"] + self.stats["coalesced"]) / max(lookups, 1), 3))
+
+def _text(output):
+    return output.decode("utf-8", errors="replace") if isinstance(output, bytes) else (output or "")
+
+_caches_lock = threading.Lock()
+_caches = {}
+
+def get_cache(serial="emulator-5554", adb_path=ADB_PATH):
+    """Satu DeviceStateCache per serial, dipakai bersama semua pemanggil dalam proses"""
+    with _caches_lock:
+        cache = _caches.get(serial)
+        if cache is None:
+            cache = _caches[serial] = DeviceStateCache(serial, adb_path)
+        return cache
+
+def main():
+    import argparse
+    import json
+    from concurrent.futures import ThreadPoolExecutor
+    parser = argparse.ArgumentParser(description="Query status device lewat cache TTL")
+    parser.add_argument("--device", default="emulator-5554")
+    parser.add_argument("--adb", default=ADB_PATH)
+    parser.add_argument("--threads", type=int, default=8, help="Thread yang bertanya bersamaan")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    cache = DeviceStateCache(args.device, args.adb)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as pool:
+        for _ in range(args.rounds):
+            results = list(pool.map(lambda _: cache.is_foreground(), range(args.threads)))
+    elapsed = (time.perf_counter() - started) * 1000
+    print_step("STATE", f"foreground={results[0]} installed={cache.is_installed()} "
+                        f"booted={cache.boot_completed()} ({elapsed:.0f}ms)")
+    print(json.dumps(cache.get_stats(), indent=2))
+
+if __name__ == "__main__":
+    main()
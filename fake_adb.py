@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+Fake ADB - Simulator device untuk benchmark end-to-end tanpa emulator
+Dipanggil persis seperti adb.exe (lewat shim dari install_shim), mendukung:
+  devices, get-state, shell input tap/swipe/keyevent, shell screencap -p <file>,
+  exec-out screencap [-p], pull, uiautomator dump, getprop, dumpsys activity,
+  monkey / am start / am force-stop
+Layar diputar dari state machine frame rekaman beku di corpus/frames (lobby.png, stage_map.png, ...):
+pindah state setelah N screencap atau saat tap mengenai region. State per serial
+disimpan di file JSON supaya tiap pemanggilan CLI melanjutkan state sebelumnya.
+"""
+import json
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+PACKAGE = "com.linecorp.LGRGS"
+ACTIVITY = "com.linecorp.LGRGS/com.linecorp.common.activity.LineActivity"
+STATE_DIR = os.environ.get("FAKE_ADB_DIR", ".fake_adb")
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Frame beku (bukan screenshot kerja yang ditimpa script lain); path frame scenario relatif ke sini
+FRAMES_DIR = os.path.join(BASE_DIR, "corpus", "frames")
+PROPS = {
+    "sys.boot_completed": "1",
+    "ro.product.model": "FakeRanger",
+    "ro.build.version.sdk": "28",
+    "ro.product.cpu.abi": "x86_64"
+}
+
+# Koordinat region dalam piksel frame (1600x900). "clear": transisi dihitung stage selesai.
+DEFAULT_SCENARIO = {
+    "start": "boot",
+    "states": {
+        "boot": {"frame": "gameplay.png", "after_frames": 1, "next": "loading"},
+        "loading": {"frame": "loading_boot.png", "after_frames": 2, "next": "loading_home"},
+        "loading_home": {"frame": "loading_home.png", "after_frames": 1, "next": "lobby"},
+        "lobby": {"frame": "lobby.png", "regions": [
+            {"name": "main_stage", "rect": [620, 90, 980, 400], "to": "stage_map"}
+        ]},
+        "stage_map": {"frame": "stage_map.png", "back": "lobby", "regions": [
+            {"name": "back", "rect": [0, 0, 110, 100], "to": "lobby"},
+            {"name": "stage_1", "rect": [920, 490, 1060, 615], "to": "stage_prepare"},
+            {"name": "stage_2", "rect": [720, 390, 880, 525], "to": "stage_prepare"},
+            {"name": "stage_3", "rect": [500, 360, 660, 490], "to": "stage_prepare"},
+            {"name": "world_sign", "rect": [1010, 345, 1220, 475], "to": "stage_prepare"}
+        ]},
+        "stage_prepare": {"frame": "stage_prepare.png", "back": "stage_map", "regions": [
+            {"name": "back", "rect": [0, 0, 110, 100], "to": "stage_map"},
+            {"name": "start", "rect": [560, 735, 1040, 860], "to": "battle"}
+        ]},
+        "battle": {"frame": "gameplay.png", "after_frames": 3, "next": "lobby", "clear": True}
+    }
+}
+
+def print_step(step, message):
+    timestamp = datetime.now().strftime("%H:%M:%S")
+    print(f"[{timestamp}] [{step}] {message}")
+
+def load_scenario(path=None):
+    """Scenario dari file JSON (FAKE_ADB_SCENARIO) atau DEFAULT_SCENARIO"""
+    path = path or os.environ.get("FAKE_ADB_SCENARIO")
+    if not path:
+        return DEFAULT_SCENARIO
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def device_serials():
+    return [s for s in os.environ.get("FAKE_ADB_DEVICES", "emulator-5554").split(",") if s]
+
+class FakeDevice:
+    """State machine satu device; disimpan ke <state_dir>/<serial>.json setelah tiap perintah"""
+
+    def __init__(self, serial, scenario=None, state_dir=STATE_DIR):
+        self.serial = serial
+        self.scenario = scenario or DEFAULT_SCENARIO
+        self.path = os.path.join(state_dir, serial.replace(":", "_") + ".json")
+        self.data = self._load()
+
+    def _fresh(self):
+        return {"state": self.scenario["start"], "frames_in_state": 0, "app_running": True, "files": {},
+                "stats": {"commands": {}, "screencaps": 0, "taps": 0, "hits": 0, "misses": 0,
+                          "transitions": 0, "stage_clears": 0, "visits": {self.scenario["start"]: 1}}}
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return self._fresh()
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path) or ".", suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self.data, f)
+        os.replace(tmp, self.path)
+
+    def reset(self):
+        self.data = self._fresh()
+
+    @property
+    def state(self):
+        return self.scenario["states"][self.data["state"]]
+
+    def count(self, command):
+        commands = self.data["stats"]["commands"]
+        commands[command] = commands.get(command, 0) + 1
+
+    def goto(self, name):
+        stats = self.data["stats"]
+        if self.state.get("clear"):
+            stats["stage_clears"] += 1
+        self.data["state"] = name
+        self.data["frames_in_state"] = 0
+        stats["transitions"] += 1
+        stats["visits"][name] = stats["visits"].get(name, 0) + 1
+
+    def frame_path(self):
+        """Frame yang tampil sekarang, lalu maju satu frame (transisi after_frames)"""
+        if not self.data["app_running"]:
+            return None
+        state = self.state
+        path = os.path.join(FRAMES_DIR, state["frame"]) if not os.path.isabs(state["frame"]) else state["frame"]
+        self.data["stats"]["screencaps"] += 1
+        self.data["frames_in_state"] += 1
+        if state.get("after_frames") and self.data["frames_in_state"] >= state["after_frames"]:
+            self.goto(state["next"])
+        return path
+
+    def tap(self, x, y):
+        stats = self.data["stats"]
+        stats["taps"] += 1
+        if self.data["app_running"]:
+            for region in self.state.get("regions", []):
+                x1, y1, x2, y2 = region["rect"]
+                if x1 <= x <= x2 and y1 <= y <= y2:
+                    stats["hits"] += 1
+                    self.goto(region["to"])
+                    return region["name"]
+        stats["misses"] += 1
+        return None
+
+    def back(self):
+        if self.data["app_running"] and self.state.get("back"):
+            self.goto(self.state["back"])
+
+    def hierarchy_xml(self):
+        """Dump UI sederhana: satu node per region state sekarang (bounds = rect region)"""
+        state = self.state if self.data["app_running"] else {}
+        nodes = []
+        for index, region in enumerate(state.get("regions", [])):
+            x1, y1, x2, y2 = region["rect"]
+            nodes.append(f'<node index="{index}" text="{region["name"].replace("_", " ").upper()}" '
+                         f'resource-id="{PACKAGE}:id/{region["name"]}" class="android.widget.Button" '
+                         f'package="{PACKAGE}" clickable="true" enabled="true" bounds="[{x1},{y1}][{x2},{y2}]" />')
+        return ('<?xml version=\'1.0\' encoding=\'UTF-8\' standalone=\'yes\' ?><hierarchy rotation="0">'
+                f'<node index="0" text="" resource-id="" class="android.widget.FrameLayout" package="{PACKAGE}" '
+                f'clickable="false" enabled="true" bounds="[0,0][1600,900]">{"".join(nodes)}</node></hierarchy>')
+
+def _blank_png():
+    import cv2
+    import numpy as np
+    return cv2.imencode(".png", np.zeros((900, 1600, 3), dtype=np.uint8))[1].tobytes()
+
+def _frame_bytes(path, raw=False):
+    """PNG apa adanya, atau raw screencap (header 12 byte + RGBA) untuk exec-out tanpa -p"""
+    if not raw:
+        if path is None:
+            return _blank_png()
+        with open(path, "rb") as f:
+            return f.read()
+    import cv2
+    import numpy as np
+    img = cv2.imread(path) if path else np.zeros((900, 1600, 3), dtype=np.uint8)
+    rgba = cv2.cvtColor(img, cv2.COLOR_BGR2RGBA)
+    return struct.pack("<III", rgba.shape[1], rgba.shape[0], 1) + rgba.tobytes()
+
+def _filter(output, pipes):
+    """Terapkan `| grep X` / `| findstr X` dari command shell ke output"""
+    for pipe in pipes:
+        words = pipe.split()
+        if words and words[0] in ("grep", "findstr", "egrep"):
+            patterns = [w.strip("'\"") for w in words[1:] if not w.startswith("-") and not w.startswith("/")]
+            output = "".join(line + "\n" for line in output.splitlines() if any(p in line for p in patterns))
+    return output
+
+def shell(device, command):
+    """Jalankan satu command `adb shell ...`; return (stdout bytes/str, exit code)"""
+    pipes = [part.strip() for part in command.split("|")]
+    words = pipes[0].split()
+    if not words:
+        return "", 0
+    name = words[0]
+    device.count(name)
+    if name == "input" and len(words) >= 2:
+        if words[1] == "touchscreen":
+            words = words[:1] + words[2:]
+        if words[1] == "tap" and len(words) >= 4:
+            device.tap(int(float(words[2])), int(float(words[3])))
+        elif words[1] == "swipe" and len(words) >= 6:
+            device.tap(int(float(words[4])), int(float(words[5])))
+        elif words[1] == "keyevent" and words[-1] in ("4", "KEYCODE_BACK"):
+            device.back()
+        return "", 0
+    if name == "screencap":
+        path = device.frame_path()
+        target = next((w for w in words[1:] if not w.startswith("-")), None)
+        if target:
+            device.data["files"][target] = {"frame": path}
+            return "", 0
+        return _frame_bytes(path, raw="-p" not in words), 0
+    if name == "uiautomator" and len(words) >= 2 and words[1] == "dump":
+        xml = device.hierarchy_xml()
+        target = next((w for w in words[2:] if not w.startswith("-")), "/sdcard/window_dump.xml")
+        if target == "/dev/tty":
+            return xml + "UI hierchary dumped to: /dev/tty\n", 0
+        device.data["files"][target] = {"xml": xml}
+        return f"UI hierchary dumped to: {target}\n", 0
+    if name == "getprop":
+        if len(words) >= 2:
+            return PROPS.get(words[1], "") + "\n", 0
+        return _filter("\n".join(f"[{k}]: [{v}]" for k, v in PROPS.items()) + "\n", pipes[1:]), 0
+    if name == "dumpsys" and len(words) >= 2 and words[1] in ("activity", "window"):
+        focus = f"u0 {ACTIVITY}" if device.data["app_running"] else "u0 com.android.launcher3/.Launcher"
+        output = (f"ACTIVITY MANAGER ACTIVITIES (dumpsys activity activities)\n"
+                  f"  mResumedActivity: ActivityRecord{{fake {focus} t1}}\n"
+                  f"  mFocusedActivity: ActivityRecord{{fake {focus} t1}}\n"
+                  f"  mCurrentFocus=Window{{fake {focus}}}\n")
+        return _filter(output, pipes[1:]), 0
+    if name == "pm" and len(words) >= 3 and words[1] == "list" and words[2] == "packages":
+        return _filter(f"package:{PACKAGE}\npackage:com.android.settings\n", pipes[1:]), 0
+    if name in ("monkey", "am") and PACKAGE in command:
+        if name == "am" and words[1] == "force-stop":
+            device.data["app_running"] = False
+        elif not device.data["app_running"]:
+            device.reset()
+        return "Events injected: 1\n" if name == "monkey" else "Starting: Intent\n", 0
+    if name in ("echo", "true", "rm", "sleep"):
+        return " ".join(words[1:]) + "\n" if name == "echo" else "", 0
+    return f"/system/bin/sh: {name}: not found\n", 127
+
+def run(argv, out=None):
+    """Entry CLI: argv tanpa nama program. Return exit code."""
+    out = out or sys.stdout.buffer
+    args = list(argv)
+    serial = None
+    while args and args[0] in ("-s", "-P", "-H"):
+        if args[0] == "-s":
+            serial = args[1]
+        args = args[2:]
+    if not args:
+        out.write(b"Android Debug Bridge version 1.0.41 (fake)\n")
+        return 1
+    command = args[0]
+    serials = device_serials()
+    if command == "devices":
+        out.write(("List of devices attached\n" + "".join(f"{s}\tdevice\n" for s in serials) + "\n").encode())
+        return 0
+    if command == "version":
+        out.write(b"Android Debug Bridge version 1.0.41 (fake)\n")
+        return 0
+    if command in ("start-server", "kill-server", "connect", "disconnect", "wait-for-device"):
+        return 0
+    serial = serial or (serials[0] if len(serials) == 1 else None)
+    if serial not in serials:
+        sys.stderr.write(f"error: device '{serial}' not found\n")
+        return 1
+    if command == "shell" and len(args) == 1:
+        # Shell interaktif (stdin persisten, mis. touch_injector): state dibaca ulang tiap baris
+        return interactive_shell(serial, out)
+    device = FakeDevice(serial, load_scenario())
+    try:
+        if command == "get-state":
+            output, code = "device\n", 0
+        elif command in ("shell", "exec-out"):
+            output, code = shell(device, " ".join(args[1:]))
+        elif command == "pull" and len(args) >= 3:
+            entry = device.data["files"].get(args[1])
+            device.count("pull")
+            if entry is None:
+                sys.stderr.write(f"adb: error: failed to stat remote object '{args[1]}': No such file or directory\n")
+                return 1
+            if "xml" in entry:
+                with open(args[2], "w", encoding="utf-8") as f:
+                    f.write(entry["xml"])
+            else:
+                with open(args[2], "wb") as f:
+                    f.write(_frame_bytes(entry["frame"]))
+            output, code = f"{args[1]}: 1 file pulled.\n", 0
+        else:
+            sys.stderr.write(f"adb: unknown command {command}\n")
+            return 1
+    finally:
+        device.save()
+    out.write(output if isinstance(output, bytes) else output.encode())
+    return code
+
+def interactive_shell(serial, out):
+    code = 0
+    for line in sys.stdin:
+        line = line.strip()
+        if line == "exit":
+            break
+        if not line:
+            continue
+        device = FakeDevice(serial, load_scenario())
+        output, code = shell(device, line)
+        device.save()
+        out.write(output if isinstance(output, bytes) else output.encode())
+        out.flush()
+    return code
+
+def install_shim(directory, state_dir=None, scenario_path=None, devices=None):
+    """Tulis wrapper `adb` (sh) dan `adb.bat` yang memanggil fake_adb.py; return path untuk adb_path"""
+    os.makedirs(directory, exist_ok=True)
+    state_dir = os.path.abspath(state_dir or os.path.join(directory, "state"))
+    env = {"FAKE_ADB_DIR": state_dir}
+    if scenario_path:
+        env["FAKE_ADB_SCENARIO"] = os.path.abspath(scenario_path)
+    if devices:
+        env["FAKE_ADB_DEVICES"] = ",".join(devices)
+    script = os.path.abspath(__file__)
+    if os.name == "nt":
+        path = os.path.join(directory, "adb.bat")
+        lines = ["@echo off"] + [f'set "{k}={v}"' for k, v in env.items()]
+        lines.append(f'"{sys.executable}" "{script}" %*')
+    else:
+        path = os.path.join(directory, "adb")
+        lines = ["#!/bin/sh"] + [f"export {k}='{v}'" for k, v in env.items()]
+        lines.append(f'exec "{sys.executable}" "{script}" "$@"')
+    with open(path, "w", newline="\r\n" if os.name == "nt" else "\n") as f:
+        f.write("\n".join(lines) + "\n")
+    os.chmod(path, 0o755)
+    return path
+
+def benchmark(cycles=20, serial="emulator-5554", scenario_path=None, workdir=None):
+    """Jalankan run_ultimate_automation melawan simulator (sleep dinonaktifkan), return statistik"""
+    from unittest import mock
+    from decision_cache import DecisionCache
+    from ultimate_line_ranger_ai import UltimateGameplayAI
+    workdir = workdir or tempfile.mkdtemp(prefix="fake_adb_")
+    shim = install_shim(os.path.join(workdir, "bin"), scenario_path=scenario_path, devices=[serial])
+    state_dir = os.path.join(workdir, "bin", "state")
+    shutil.rmtree(state_dir, ignore_errors=True)
+
+    ai = UltimateGameplayAI(device=serial)
+    ai.adb_path = shim
+    ai.screenshot_path = os.path.join(workdir, "screen.png")
+    ai.html_path = os.path.join(workdir, "ai.html")
+    ai.decision_cache = DecisionCache(os.path.join(workdir, "decision_cache.json"))
+    started = time.time()
+    # log_action menulis ultimate_automation_log.json di cwd: dimatikan seperti detector_benchmark.quiet()
+    with mock.patch("time.sleep"), mock.patch("ultimate_line_ranger_ai.log_action"):
+        ai.run_ultimate_automation(cycles=cycles)
+    wall = time.time() - started
+
+    with open(os.path.join(state_dir, serial.replace(":", "_") + ".json"), encoding="utf-8") as f:
+        device = json.load(f)
+    metrics = ai.get_metrics()
+    return {
+        "cycles": cycles,
+        "wall_seconds": round(wall, 2),
+        "cycles_per_sec": round(cycles / wall, 3) if wall else None,
+        "frames": ai.metrics["frames"],
+        "ai_stage_clears": metrics["stage_clears"],
+        "sim_stage_clears": device["stats"]["stage_clears"],
+        "final_state": device["state"],
+        "device": device["stats"],
+        "decision_cache": ai.decision_cache.get_stats(),
+        "workdir": workdir
+    }
+
+def main():
+    # Mode CLI adb: dipanggil shim dengan argumen adb biasa
+    if len(sys.argv) > 1 and sys.argv[1] != "--benchmark":
+        sys.exit(run(sys.argv[1:]))
+    import argparse
+    parser = argparse.ArgumentParser(description="Fake ADB simulator / benchmark end-to-end")
+    parser.add_argument("--benchmark", action="store_true", required=True)
+    parser.add_argument("--cycles", type=int, default=20)
+    parser.add_argument("--serial", default="emulator-5554")
+    parser.add_argument("--scenario", default=None, help="File JSON scenario (default: DEFAULT_SCENARIO)")
+    parser.add_argument("--output", default=None, help="Simpan hasil JSON ke file")
+    args = parser.parse_args()
+
+    print_step("BENCH", f"Run {args.cycles} cycle melawan fake ADB ({args.serial})")
+    result = benchmark(args.cycles, args.serial, args.scenario)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Fleet Supervisor - Satu proses worker per emulator LDPlayer
+1. Worker terikat ke ADB serial masing-masing (emulator-5554, 5556, ...)
+2. Status + heartbeat dikirim lewat multiprocessing.Queue; heartbeat berasal dari loop flow
+   (setiap should_stop()), jadi flow yang hang ikut terdeteksi
+3. Restart otomatis kalau worker crash / heartbeat hilang
+4. Graceful drain + batas jumlah worker bersamaan
+Vision (OpenCV) jalan paralel di banyak core, tidak antri di satu GIL.
+"""
+import multiprocessing
+import os
+import subprocess
+import time
+from datetime import datetime
+from decision_service import DEFAULT_BACKEND, FLEET_BACKENDS, create_backend, start_service_thread, stop_service_thread
+from device_inventory import adb_serial
+
+PACKAGE = "com.linecorp.LGRGS"
+ADB_PATH = "C:\\LDPlayer\\LDPlayer9\\adb.exe"
+
+def print_step(step, message):
+    timestamp = datetime.now().strftime("%H:%M:%S")
+    print(f"[{timestamp}] [{step}] {message}")
+
+def ultimate_flow(serial, report, should_stop, cycles=15, lobby_attempts=3):
+    """Flow default: buka Line Ranger, tunggu lobby, jalankan ultimate automation"""
+    from ultimate_line_ranger_ai import UltimateGameplayAI
+    from health_monitor import DeviceHealthMonitor
+
+    report("launching")
+    subprocess.run([ADB_PATH, "-s", serial, "shell", "monkey", "-p", PACKAGE,
+                    "-c", "android.intent.category.LAUNCHER", "1"], capture_output=True, timeout=30)
+    ai = UltimateGameplayAI(device=serial)
+    ai.health = DeviceHealthMonitor(serial).start()
+    ai.on_metrics = lambda metrics: report("running", metrics=metrics)
+    try:
+        report("waiting_lobby")
+        for attempt in range(lobby_attempts):
+            if ai.wait_for_lobby(should_stop=should_stop):
+                break
+            if should_stop():
+                return
+            # Timeout: biarkan watchdog memilih recovery (relaunch/reboot) lalu coba lagi
+            health = ai.health.check_and_recover()
+            report("recovering", f"{health['problems']} -> {health.get('action')}")
+            if ai.health.requeue_requested:
+                raise RuntimeError("requeue requested by health monitor")
+        else:
+            raise RuntimeError("lobby not reached")
+        report("running")
+        ai.run_ultimate_automation(cycles=cycles,
+                                   should_stop=lambda: should_stop() or ai.health.requeue_requested)
+        if ai.health.requeue_requested:
+            raise RuntimeError("requeue requested by health monitor")
+    finally:
+        ai.health.stop()
+
+def jobs_flow(serial, report, should_stop, **kwargs):
+    """Ambil job dari antrian SQLite (job_queue) untuk device ini sampai kosong"""
+    from job_queue import job_flow
+    job_flow(serial, report, should_stop, **kwargs)
+
+FLOWS = {
+    "ultimate": ultimate_flow,
+    "jobs": jobs_flow
+}
+
+def resolve_flow(flow_name):
+    """Nama di FLOWS atau "module:function" (di-import di dalam proses worker)"""
+    if flow_name in FLOWS:
+        return FLOWS[flow_name]
+    module_name, _, func_name = flow_name.partition(":")
+    module = __import__(module_name, fromlist=[func_name])
+    return getattr(module, func_name)
+
+def device_worker(serial, name, flow_name, flow_kwargs, status_queue, stop_event, heartbeat_interval):
+    """Entry point proses worker (harus top-level supaya bisa di-spawn di Windows)"""
+    pid = os.getpid()
+    last_beat = [0.0]
+
+    def report(status, detail="", metrics=None):
+        event = {"type": "status", "serial": serial, "name": name, "pid": pid, "status": status,
+                 "detail": detail, "time": time.time()}
+        if metrics is not None:
+            event["metrics"] = metrics
+        last_beat[0] = event["time"]
+        status_queue.put(event)
+
+    def should_stop():
+        # Flow memanggil ini di setiap putaran loop-nya: sekalian heartbeat (dibatasi heartbeat_interval)
+        now = time.time()
+        if now - last_beat[0] >= heartbeat_interval:
+            last_beat[0] = now
+            status_queue.put({"type": "heartbeat", "serial": serial, "name": name, "pid": pid, "time": now})
+        return stop_event.is_set()
+
+    report("started")
+    try:
+        resolve_flow(flow_name)(serial, report, should_stop, **flow_kwargs)
+        report("completed")
+    except Exception as e:
+        report("error", str(e))
+        raise SystemExit(1)
+
+class WorkerHandle:
+    """State satu worker di sisi supervisor"""
+
+    def __init__(self, serial, name, flow, flow_kwargs):
+        self.serial = serial
+        self.name = name
+        self.flow = flow
+        self.flow_kwargs = flow_kwargs
+        self.process = None
+        self.stop_event = None
+        self.status = "queued"
+        self.detail = ""
+        self.last_heartbeat = None
+        self.started = None
+        self.restarts = 0
+        self.next_start = 0.0
+        self.metrics = {}  # metrics terakhir dari flow (fps, cycles_per_min, ...)
+        self.last_error = ""
+
+class FleetSupervisor:
+    """Supervisor pusat: admit, monitor, restart dan drain worker"""
+
+    def __init__(self, max_workers=None, flow="ultimate", flow_kwargs=None, heartbeat_interval=5,
+                 heartbeat_timeout=60, max_restarts=3, restart_backoff=10, on_event=None):
+        self.max_workers = max_workers or max(1, multiprocessing.cpu_count() - 1)
+        self.flow = flow
+        self.flow_kwargs = flow_kwargs or {}
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.max_restarts = max_restarts
+        self.restart_backoff = restart_backoff
+        self.on_event = on_event
+        self.ctx = multiprocessing.get_context("spawn")
+        self.status_queue = self.ctx.Queue()
+        self.workers = {}  # serial -> WorkerHandle
+        self.draining = False
+
+    def add_device(self, serial, name=None, flow=None, flow_kwargs=None):
+        """Masukkan device ke antrian, start kalau slot masih ada"""
+        if serial in self.workers and self.workers[serial].status not in ("completed", "failed", "stopped"):
+            return False
+        self.draining = False
+        self.workers[serial] = WorkerHandle(serial, name or serial, flow or self.flow,
+                                            self.flow_kwargs if flow_kwargs is None else flow_kwargs)
+        self._admit()
+        return True
+
+    def running(self):
+        return [w for w in self.workers.values() if w.process is not None and w.process.is_alive()]
+
+    def _start(self, worker):
+        worker.stop_event = self.ctx.Event()
+        worker.process = self.ctx.Process(
+            target=device_worker,
+            args=(worker.serial, worker.name, worker.flow, worker.flow_kwargs,
+                  self.status_queue, worker.stop_event, self.heartbeat_interval),
+            name=f"worker-{worker.serial}",
+            daemon=True
+        )
+        worker.process.start()
+        worker.started = time.time()
+        worker.last_heartbeat = worker.started
+        worker.status = "starting"
+        print_step("FLEET", f"Worker {worker.serial} start (pid {worker.process.pid})")
+
+    def _admit(self):
+        if self.draining:
+            return
+        now = time.time()
+        slots = self.max_workers - len(self.running())
+        for worker in self.workers.values():
+            if slots <= 0:
+                break
+            if worker.status in ("queued", "restarting") and worker.next_start <= now:
+                self._start(worker)
+                slots -= 1
+
+    def _emit(self, event):
+        if self.on_event:
+            try:
+                self.on_event(event)
+            except Exception as e:
+                print_step("FLEET", f"⚠️ on_event error: {e}")
+
+    def _handle_exit(self, worker):
+        exitcode = worker.process.exitcode
+        worker.process = None
+        if (worker.stop_event is not None and worker.stop_event.is_set()) or self.draining:
+            worker.status = "stopped"
+        elif exitcode == 0:
+            worker.status = "completed"
+        elif worker.restarts < self.max_restarts:
+            worker.restarts += 1
+            worker.status = "restarting"
+            worker.next_start = time.time() + self.restart_backoff * worker.restarts
+            print_step("FLEET", f"Worker {worker.serial} crash (exit {exitcode}), restart #{worker.restarts}")
+        else:
+            worker.status = "failed"
+            print_step("FLEET", f"❌ Worker {worker.serial} gagal setelah {worker.restarts} restart")
+        # Event milik proses yang sudah mati: set() bisa hang menunggu waiter yang tidak ada lagi
+        worker.stop_event = None
+        event = {"type": "status", "serial": worker.serial, "name": worker.name,
+                 "status": worker.status, "detail": f"exit {exitcode}", "time": time.time()}
+        self._emit(event)
+        return event
+
+    def poll(self):
+        """Proses pesan worker, cek crash/heartbeat, admit worker baru. Return list event."""
+        events = []
+        while True:
+            try:
+                event = self.status_queue.get_nowait()
+            except Exception:
+                break
+            worker = self.workers.get(event["serial"])
+            if worker is None:
+                continue
+            if event["type"] == "status" and event["status"] == "error":
+                worker.last_error = event.get("detail", "")
+            # Event dari proses yang sudah keluar (atau proses sebelum restart) tidak boleh menimpa
+            # status milik supervisor (restarting / stopped / failed)
+            if worker.process is None or event.get("pid") != worker.process.pid:
+                continue
+            worker.last_heartbeat = event["time"]
+            if event["type"] == "status":
+                worker.status = event["status"]
+                worker.detail = event.get("detail", "")
+                if "metrics" in event:
+                    worker.metrics = event["metrics"]
+            events.append(event)
+            self._emit(event)
+
+        now = time.time()
+        for worker in self.workers.values():
+            if worker.process is None:
+                continue
+            if not worker.process.is_alive():
+                events.append(self._handle_exit(worker))
+            elif now - worker.last_heartbeat > self.heartbeat_timeout:
+                print_step("FLEET", f"⚠️ Worker {worker.serial} tidak ada heartbeat, terminate")
+                worker.process.terminate()
+                worker.process.join(5)
+                events.append(self._handle_exit(worker))
+
+        self._admit()
+        return events
+
+    def stop_device(self, serial):
+        """Worker yang jalan diminta berhenti setelah cycle-nya; yang masih antri / menunggu restart langsung stopped"""
+        worker = self.workers.get(serial)
+        if worker is None:
+            return False
+        if worker.process is None and worker.status in ("queued", "restarting"):
+            worker.status = "stopped"
+        if worker.process is not None and worker.stop_event is not None:
+            worker.stop_event.set()
+        return True
+
+    def is_stopped(self, serial):
+        """True kalau device tidak punya worker / proses worker-nya sudah keluar"""
+        worker = self.workers.get(serial)
+        return worker is None or worker.process is None and worker.status not in ("queued", "restarting")
+
+    def terminate_device(self, serial):
+        """Paksa berhenti worker yang tidak merespons stop_device"""
+        worker = self.workers.get(serial)
+        if worker is None or worker.process is None:
+            return False
+        if worker.stop_event is not None:
+            worker.stop_event.set()
+        print_step("FLEET", f"Worker {serial} tidak berhenti, terminate")
+        worker.process.terminate()
+        worker.process.join(5)
+        self.poll()
+        return True
+
+    def begin_drain(self):
+        """Tahap pertama drain (tidak blocking): stop admit, minta semua worker berhenti"""
+        self.draining = True
+        for serial in list(self.workers):
+            self.stop_device(serial)
+
+    def terminate_running(self):
+        """Tahap terakhir drain: terminate worker yang belum berhenti"""
+        for worker in self.running():
+            print_step("FLEET", f"Worker {worker.serial} tidak berhenti, terminate")
+            worker.process.terminate()
+            worker.process.join(5)
+        self.poll()
+
+    def drain(self, timeout=120):
+        """Graceful: minta semua worker berhenti setelah cycle berjalan, terminate sisanya"""
+        self.begin_drain()
+        deadline = time.time() + timeout
+        while self.running() and time.time() < deadline:
+            self.poll()
+            time.sleep(0.5)
+        self.terminate_running()
+
+    def get_status(self):
+        now = time.time()
+        return [{
+            "serial": w.serial,
+            "name": w.name,
+            "flow": w.flow,
+            "status": w.status,
+            "detail": w.detail,
+            "pid": w.process.pid if w.process is not None else None,
+            "restarts": w.restarts,
+            "metrics": dict(w.metrics),
+            "last_error": w.last_error or w.metrics.get("last_error", ""),
+            "heartbeat_age": round(now - w.last_heartbeat, 1) if w.last_heartbeat else None
+        } for w in self.workers.values()]
+
+    def run_until_done(self, poll_interval=1.0):
+        """Loop blocking untuk pemakaian tanpa GUI"""
+        try:
+            while any(w.status not in ("completed", "failed", "stopped") for w in self.workers.values()):
+                self.poll()
+                time.sleep(poll_interval)
+        except KeyboardInterrupt:
+            self.drain()
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Run Line Ranger automation on many LDPlayer instances")
+    parser.add_argument("indexes", nargs="+", type=int, help="LDPlayer instance indexes")
+    parser.add_argument("--max-workers", type=int, default=None)
+    parser.add_argument("--cycles", type=int, default=15)
+    parser.add_argument("--decisions", choices=FLEET_BACKENDS, nargs="?", const=DEFAULT_BACKEND, default=None,
+                        help="Jalankan decision service bersama untuk semua worker (backend model)")
+    args = parser.parse_args()
+
+    # Service di proses supervisor; worker (spawn) mewarisi env DECISION_SERVICE
+    service = start_service_thread(create_backend(args.decisions)) if args.decisions else None
+    supervisor = FleetSupervisor(max_workers=args.max_workers, flow_kwargs={"cycles": args.cycles})
+    for index in args.indexes:
+        supervisor.add_device(adb_serial(index), name=f"index-{index}")
+    supervisor.run_until_done()
+    for status in supervisor.get_status():
+        print_step("FLEET", status)
+    if service is not None:
+        print_step("FLEET", f"Decision service: {service.get_stats()}")
+        stop_service_thread(service)
+
+if __name__ == "__main__":
+    main()
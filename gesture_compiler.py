@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Gesture Compiler - Intent tingkat tinggi (drag kartu ke lane, long-press skill) -> stroke multi-touch
+1. Layout battle dalam koordinat relatif (0..1) supaya berlaku di semua resolusi emulator
+2. Profil timing: kecepatan (px/ms), easing, tahan di awal/akhir, interval sampel
+3. Path hasil compile di-cache per (resolusi, intent, profil) -> eksekusi berulang tanpa hitung ulang
+4. Eksekusi lewat input_queue (backend tercepat: minitouch -> sendevent -> input)
+5. Verifikasi: slot kartu / skill masuk cooldown (menggelap) atau kartunya hilang / diganti setelah gesture
+6. Rate adaptif: profil naik ke yang lebih cepat selama game menerima, turun kalau placement ditolak
+"""
+import json
+import math
+import subprocess
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+import cv2
+import numpy as np
+from input_queue import get_queue
+from touch_injector import ADB_PATH
+
+# Perkiraan posisi relatif layar battle (landscape); kalibrasi lewat --layout file JSON dengan kunci yang sama
+LAYOUT = {
+    "cards": [[0.30, 0.88], [0.40, 0.88], [0.50, 0.88], [0.60, 0.88], [0.70, 0.88]],
+    "lanes": [[0.45, 0.42], [0.45, 0.55], [0.45, 0.68]],
+    "skills": [[0.06, 0.88], [0.14, 0.88], [0.90, 0.88]],
+    "card_size": [0.08, 0.14],  # lebar / tinggi region kartu untuk verifikasi
+}
+TimingProfile = namedtuple("TimingProfile", "speed easing hold_start hold_end step_ms min_duration")
+# Urut dari paling cepat; speed dalam piksel per ms
+PROFILES = {
+    "instant": TimingProfile(speed=12.0, easing="linear", hold_start=16, hold_end=0, step_ms=8, min_duration=24),
+    "fast": TimingProfile(speed=6.0, easing="ease_out", hold_start=40, hold_end=16, step_ms=8, min_duration=60),
+    "normal": TimingProfile(speed=3.0, easing="ease_in_out", hold_start=80, hold_end=40, step_ms=10, min_duration=120),
+    "safe": TimingProfile(speed=1.5, easing="ease_in_out", hold_start=150, hold_end=80, step_ms=12, min_duration=250),
+}
+EASINGS = {
+    "linear": lambda t: t,
+    "ease_out": lambda t: 1 - (1 - t) ** 2,
+    "ease_in_out": lambda t: 4 * t ** 3 if t < 0.5 else 1 - (-2 * t + 2) ** 3 / 2,
+}
+
+def print_step(step, message):
+    timestamp = datetime.now().strftime("%H:%M:%S")
+    print(f"[{timestamp}] [{step}] {message}")
+
+class GestureCompiler:
+    """Intent -> stroke [(t_ms, x, y), ...] per contact (format touch_injector.play)"""
+
+    def __init__(self, layout=None, profiles=None):
+        self.layout = dict(LAYOUT, **(layout or {}))
+        self.profiles = profiles or PROFILES
+        self.lock = threading.Lock()
+        self.cache = {}
+        self.stats = {"hits": 0, "misses": 0}
+
+    def point(self, resolution, group, index):
+        fx, fy = self.layout[group][index]
+        return round(fx * resolution[0]), round(fy * resolution[1])
+
+    def region(self, resolution, group, index):
+        """Kotak (x1, y1, x2, y2) di sekitar titik layout, ukuran card_size"""
+        x, y = self.point(resolution, group, index)
+        half_w = round(self.layout["card_size"][0] * resolution[0] / 2)
+        half_h = round(self.layout["card_size"][1] * resolution[1] / 2)
+        return max(x - half_w, 0), max(y - half_h, 0), min(x + half_w, resolution[0]), min(y + half_h, resolution[1])
+
+    def compile(self, resolution, intent, profile="fast"):
+        """intent: ("drag_card", kartu, lane) | ("long_press_skill", skill, ms) | ("tap", group, index)"""
+        key = (tuple(resolution), tuple(intent), profile)
+        with self.lock:
+            strokes = self.cache.get(key)
+            if strokes is not None:
+                self.stats["hits"] += 1
+                return strokes
+            self.stats["misses"] += 1
+        timing = self.profiles[profile]
+        kind = intent[0]
+        if kind == "drag_card":
+            strokes = (self.drag(self.point(resolution, "cards", intent[1]), self.point(resolution, "lanes", intent[2]),
+                                 timing),)
+        elif kind == "long_press_skill":
+            duration = intent[2] if len(intent) > 2 else 600
+            strokes = (self.press(self.point(resolution, "skills", intent[1]), duration),)
+        elif kind == "tap":
+            strokes = (self.press(self.point(resolution, intent[1], intent[2]), timing.hold_start),)
+        else:
+            raise ValueError(f"intent tidak dikenal: {kind}")
+        with self.lock:
+            self.cache[key] = strokes
+        return strokes
+
+    @staticmethod
+    def press(position, duration):
+        x, y = position
+        return ((0, x, y), (int(duration), x, y))
+
+    @staticmethod
+    def drag(start, end, timing):
+        """Tahan di start (kartu terangkat), jalan dengan easing, tahan di end (slot terkunci), lalu lepas"""
+        (x1, y1), (x2, y2) = start, end
+        duration = max(math.hypot(x2 - x1, y2 - y1) / timing.speed, timing.min_duration)
+        steps = max(int(duration // timing.step_ms), 1)
+        ease = EASINGS[timing.easing]
+        points = [(0, x1, y1)]
+        if timing.hold_start:
+            points.append((timing.hold_start, x1, y1))
+        for i in range(1, steps + 1):
+            f = ease(i / steps)
+            points.append((timing.hold_start + round(duration * i / steps), round(x1 + (x2 - x1) * f),
+                           round(y1 + (y2 - y1) * f)))
+        if timing.hold_end:
+            points.append((points[-1][0] + timing.hold_end, x2, y2))
+        return tuple(points)
+
+    def get_stats(self):
+        with self.lock:
+            return dict(self.stats, compiled=len(self.cache))
+
+class GestureExecutor:
+    """Jalankan intent di satu device + verifikasi frame + pilih profil tercepat yang diterima game"""
+
+    def __init__(self, serial="emulator-5554", adb_path=ADB_PATH, compiler=None, profile="fast",
+                 verify_timeout=1.5, change_threshold=12.0, cooldown_drop=15.0, replaced_below=0.5,
+                 demote_after=2, promote_after=5):
+        self.serial = serial
+        self.adb_path = adb_path
+        self.compiler = compiler or GestureCompiler()
+        self.input = get_queue(serial, adb_path)
+        self.order = list(self.compiler.profiles)
+        self.profile = profile
+        self.verify_timeout = verify_timeout
+        self.change_threshold = change_threshold  # rata-rata selisih abu-abu (0..255) yang dianggap berubah
+        self.cooldown_drop = cooldown_drop  # slot kartu/skill lebih gelap sebanyak ini = overlay cooldown
+        self.replaced_below = replaced_below  # korelasi slot sebelum/sesudah di bawah ini = kartu hilang/diganti
+        self.demote_after = demote_after
+        self.promote_after = promote_after
+        self.resolution = None
+        self.streak = 0  # >0 berturut-turut diterima, <0 berturut-turut ditolak
+        self.stats = {"gestures": 0, "verified": 0, "accepted": 0, "rejected": 0, "errors": 0,
+                      "started": time.time(), "per_profile": {name: [0, 0] for name in self.order}}
+
+    def capture(self):
+        """Frame terbaru (grayscale) lewat exec-out screencap -p, tanpa file di sdcard"""
+        output = subprocess.run([self.adb_path, "-s", self.serial, "exec-out", "screencap", "-p"],
+                                capture_output=True, timeout=10).stdout
+        frame = cv2.imdecode(np.frombuffer(output, np.uint8), cv2.IMREAD_GRAYSCALE) if output else None
+        if frame is None:
+            raise OSError(f"screencap gagal di {self.serial}")
+        if self.resolution is None:
+            self.resolution = (frame.shape[1], frame.shape[0])
+        return frame
+
+    def changed(self, before, after, region):
+        x1, y1, x2, y2 = region
+        a, b = before[y1:y2, x1:x2], after[y1:y2, x1:x2]
+        return a.size > 0 and a.shape == b.shape and float(cv2.absdiff(a, b).mean()) >= self.change_threshold
+
+    def placed(self, before, after, region):
+        """Sinyal khusus penempatan di slot kartu/skill: cooldown (slot menggelap) atau kartu hilang/diganti.
+        Animasi unit di lane atau glow kartu tidak dihitung."""
+        x1, y1, x2, y2 = region
+        a, b = before[y1:y2, x1:x2], after[y1:y2, x1:x2]
+        if a.size == 0 or a.shape != b.shape:
+            return False
+        if float(a.mean()) - float(b.mean()) >= self.cooldown_drop:
+            return True
+        if float(a.std()) < 1e-3 or float(b.std()) < 1e-3:
+            return False
+        correlation = float(cv2.matchTemplate(b, a, cv2.TM_CCOEFF_NORMED)[0][0])
+        return correlation < self.replaced_below
+
+    def signals(self, intent):
+        """[(check, region)] yang membuktikan intent diterima game"""
+        kind = intent[0]
+        if kind == "drag_card":
+            return [(self.placed, self.compiler.region(self.resolution, "cards", intent[1]))]
+        if kind == "long_press_skill":
+            return [(self.placed, self.compiler.region(self.resolution, "skills", intent[1]))]
+        return [(self.changed, self.compiler.region(self.resolution, intent[1], intent[2]))]
+
+    def execute(self, intent, verify=True, profile=None):
+        """Kirim satu intent; return True (diterima / tanpa verifikasi), False (frame tidak berubah)"""
+        profile = profile or self.profile
+        before = self.capture() if verify or self.resolution is None else None
+        strokes = self.compiler.compile(self.resolution, intent, profile)
+        action = self.input.play(strokes)
+        self.stats["gestures"] += 1
+        if not action.wait(5):
+            self.stats["errors"] += 1
+            return False
+        if not verify:
+            return True
+        accepted = self.verify(before, intent, max(points[-1][0] for points in strokes) / 1000)
+        self._record(profile, accepted)
+        return accepted
+
+    def verify(self, before, intent, gesture_seconds):
+        """Ambil frame berikutnya sampai sinyal intent muncul (mis. slot kartu cooldown) atau verify_timeout habis"""
+        self.stats["verified"] += 1
+        signals = self.signals(intent)
+        deadline = time.time() + gesture_seconds + self.verify_timeout
+        time.sleep(gesture_seconds)
+        while True:
+            try:
+                after = self.capture()
+            except OSError:
+                return False
+            if any(check(before, after, region) for check, region in signals):
+                return True
+            if time.time() >= deadline:
+                return False
+
+    def _record(self, profile, accepted):
+        """Turun ke profil lebih lambat setelah demote_after penolakan, coba lebih cepat setelah promote_after"""
+        self.stats["accepted" if accepted else "rejected"] += 1
+        self.stats["per_profile"][profile][0 if accepted else 1] += 1
+        self.streak = max(self.streak, 0) + 1 if accepted else min(self.streak, 0) - 1
+        index = self.order.index(self.profile)
+        if self.streak <= -self.demote_after and index < len(self.order) - 1:
+            self.profile, self.streak = self.order[index + 1], 0
+            print_step("GESTURE", f"{self.serial}: placement ditolak, profil -> {self.profile}")
+        elif self.streak >= self.promote_after and index > 0:
+            self.profile, self.streak = self.order[index - 1], 0
+            print_step("GESTURE", f"{self.serial}: placement stabil, profil -> {self.profile}")
+
+    def place(self, placements, verify=True):
+        """Drag banyak kartu [(kartu, lane), ...] berurutan; return jumlah yang diterima"""
+        return sum(self.execute(("drag_card", card, lane), verify) for card, lane in placements)
+
+    def get_stats(self):
+        elapsed = max(time.time() - self.stats["started"], 1e-6)
+        return dict(self.stats, profile=self.profile, resolution=self.resolution,
+                    placements_per_sec=round(self.stats["accepted"] / elapsed, 3),
+                    compiler=self.compiler.get_stats(), input=self.input.get_stats())
+
+def load_layout(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Compile / jalankan gesture penempatan ranger")
+    parser.add_argument("--device", default="emulator-5554")
+    parser.add_argument("--adb", default=ADB_PATH)
+    parser.add_argument("--layout", help="File JSON layout (kunci sama dengan LAYOUT)")
+    parser.add_argument("--profile", choices=list(PROFILES), default="fast")
+    parser.add_argument("--resolution", default="1600x900", help="Untuk --compile tanpa device")
+    parser.add_argument("--compile", nargs=2, type=int, metavar=("KARTU", "LANE"), help="Cetak stroke saja")
+    parser.add_argument("--place", nargs=2, type=int, action="append", metavar=("KARTU", "LANE"))
+    parser.add_argument("--no-verify", action="store_true")
+    args = parser.parse_args()
+
+    compiler = GestureCompiler(load_layout(args.layout) if args.layout else None)
+    if args.compile:
+        resolution = tuple(int(v) for v in args.resolution.split("x"))
+        strokes = compiler.compile(resolution, ("drag_card", *args.compile), args.profile)
+        for points in strokes:
+            print_step("STROKE", f"{len(points)} titik, {points[-1][0]}ms")
+            print(json.dumps(points))
+        return
+    executor = GestureExecutor(args.device, args.adb, compiler, args.profile)
+    accepted = executor.place(args.place or [(0, 1)], verify=not args.no_verify)
+    print_step("GESTURE", f"{accepted}/{len(args.place or [(0, 1)])} placement diterima")
+    print(json.dumps(executor.get_stats(), indent=2, default=str))
+    executor.input.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Health Monitor - Watchdog per device dengan recovery otomatis
+1. Cek ADB hidup, foreground package = com.linecorp.LGRGS
+2. Cek frame masih baru + layar masih berubah (tidak stuck)
+3. Eskalasi recovery: relaunch app -> reboot instance -> re-queue
+4. Rate limit per aksi supaya tidak reboot terus-menerus
+"""
+import os
+import subprocess
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+PACKAGE = "com.linecorp.LGRGS"
+LDPLAYER_PATH = "C:\\LDPlayer\\LDPlayer9"
+RECOVERY_LADDER = ["relaunch_app", "reboot_instance", "requeue"]
+
+def print_step(step, message):
+    timestamp = datetime.now().strftime("%H:%M:%S")
+    print(f"[{timestamp}] [{step}] {message}")
+
+def serial_index(serial):
+    """emulator-5556 -> index 1 (kebalikan adb_serial)"""
+    try:
+        return (int(serial.rsplit("-", 1)[1]) - 5554) // 2
+    except (IndexError, ValueError):
+        return 0
+
+class DeviceHealthMonitor:
+    """Pantau satu device, panggil recovery bertahap kalau tidak sehat"""
+
+    def __init__(self, serial, index=None, ldplayer_path=LDPLAYER_PATH, package=PACKAGE,
+                 frame_timeout=60, stuck_timeout=180, check_interval=15, grace_period=90,
+                 min_action_interval=60, max_actions_per_hour=None, on_requeue=None):
+        self.serial = serial
+        self.index = serial_index(serial) if index is None else index
+        self.ldconsole = os.path.join(ldplayer_path, "ldconsole.exe")
+        self.adb = os.path.join(ldplayer_path, "adb.exe")
+        self.package = package
+        self.frame_timeout = frame_timeout
+        self.stuck_timeout = stuck_timeout
+        self.check_interval = check_interval
+        self.grace_period = grace_period  # Tunggu sebelum naik ke level berikutnya
+        self.min_action_interval = min_action_interval
+        self.max_actions_per_hour = max_actions_per_hour or {"relaunch_app": 6, "reboot_instance": 2, "requeue": 1}
+        self.on_requeue = on_requeue
+        self.lock = threading.Lock()
+        # Thread monitor dan thread flow sama-sama memanggil check_and_recover: satu recovery pada satu waktu
+        self.recover_lock = threading.RLock()
+        self.stop_event = threading.Event()
+        self.started = time.time()
+        self.last_frame = None
+        self.last_progress = None
+        self.last_state = None
+        self.level = 0
+        self.last_action = None
+        self.last_action_time = 0.0
+        self.action_history = {name: deque() for name in RECOVERY_LADDER}
+        self.requeue_requested = False
+        self.last_health = {}
+
+    def run_cmd(self, args, timeout=15):
+        try:
+            result = subprocess.run(args, capture_output=True, text=True, timeout=timeout)
+            return result.stdout.strip(), result.returncode == 0
+        except Exception:
+            return "", False
+
+    def record_frame(self, screen_type, fingerprint=""):
+        """Dipanggil flow setiap screenshot dianalisis"""
+        now = time.time()
+        state = (screen_type, fingerprint)
+        with self.lock:
+            self.last_frame = now
+            if state != self.last_state:
+                self.last_state = state
+                self.last_progress = now
+                # Layar berubah lagi setelah recovery: turunkan level
+                if self.level and screen_type != "unknown":
+                    print_step("HEALTH", f"{self.serial} pulih ({screen_type}), reset eskalasi")
+                    self.level = 0
+                    self.last_action = None
+
+    def adb_alive(self):
+        output, success = self.run_cmd([self.adb, "-s", self.serial, "get-state"], timeout=5)
+        return success and output == "device"
+
+    def foreground_ok(self):
+        output, _ = self.run_cmd([self.adb, "-s", self.serial, "shell",
+                                  "dumpsys activity activities | grep mResumedActivity"])
+        return self.package in output
+
+    def check(self):
+        """Hitung status kesehatan sekarang"""
+        now = time.time()
+        with self.lock:
+            last_frame = self.last_frame or self.started
+            last_progress = self.last_progress or self.started
+            screen_type = self.last_state[0] if self.last_state else None
+        health = {"serial": self.serial, "time": now, "adb": self.adb_alive(), "foreground": False,
+                  "frame_age": round(now - last_frame, 1), "progress_age": round(now - last_progress, 1),
+                  "screen_type": screen_type, "level": self.level, "problems": []}
+        if not health["adb"]:
+            health["problems"].append("adb_down")
+        else:
+            health["foreground"] = self.foreground_ok()
+            if not health["foreground"]:
+                health["problems"].append("app_not_foreground")
+        if health["frame_age"] > self.frame_timeout:
+            health["problems"].append("stale_frames")
+        if health["progress_age"] > self.stuck_timeout:
+            health["problems"].append("stuck_" + (screen_type or "unknown"))
+        health["healthy"] = not health["problems"]
+        self.last_health = health
+        return health
+
+    def _allowed(self, action, now):
+        history = self.action_history[action]
+        while history and now - history[0] > 3600:
+            history.popleft()
+        if len(history) >= self.max_actions_per_hour.get(action, 1):
+            return False
+        return now - self.last_action_time >= self.min_action_interval
+
+    def _pick_action(self, health, now):
+        """Pilih level recovery; ADB mati langsung mulai dari reboot"""
+        level = self.level
+        if "adb_down" in health["problems"]:
+            level = max(level, RECOVERY_LADDER.index("reboot_instance"))
+        # Aksi sebelumnya belum menolong setelah grace period -> naik satu level
+        if self.last_action and now - self.last_action_time > self.grace_period:
+            level = max(level, RECOVERY_LADDER.index(self.last_action) + 1)
+        for action in RECOVERY_LADDER[min(level, len(RECOVERY_LADDER) - 1):]:
+            if self._allowed(action, now):
+                return action
+        return None
+
+    def recover(self, health):
+        """Jalankan satu aksi recovery (kalau rate limit mengizinkan)"""
+        with self.recover_lock:
+            return self._recover(health)
+
+    def _recover(self, health):
+        now = time.time()
+        if self.last_action and now - self.last_action_time < self.grace_period and self.level:
+            return None  # Masih menunggu hasil aksi sebelumnya
+        action = self._pick_action(health, now)
+        if action is None:
+            print_step("HEALTH", f"⚠️ {self.serial} tidak sehat {health['problems']} tapi aksi recovery kena rate limit")
+            return None
+
+        print_step("HEALTH", f"🔧 {self.serial}: {health['problems']} -> {action}")
+        if action == "relaunch_app":
+            self.run_cmd([self.ldconsole, "killapp", "--index", str(self.index), "--packagename", self.package])
+            self.run_cmd([self.ldconsole, "runapp", "--index", str(self.index), "--packagename", self.package])
+        elif action == "reboot_instance":
+            self.run_cmd([self.ldconsole, "reboot", "--index", str(self.index)])
+        elif action == "requeue":
+            self.requeue_requested = True
+            if self.on_requeue:
+                self.on_requeue(self.serial, health)
+
+        self.action_history[action].append(now)
+        self.last_action = action
+        self.last_action_time = now
+        with self.lock:
+            self.level = RECOVERY_LADDER.index(action) + 1
+            # Beri waktu app/instance bangun sebelum dianggap stuck lagi
+            self.last_frame = self.last_progress = now
+        return action
+
+    def check_and_recover(self):
+        # Cek ulang di dalam lock: pemanggil kedua melihat hasil recovery pertama, bukan mengulanginya
+        with self.recover_lock:
+            health = self.check()
+            if not health["healthy"]:
+                health["action"] = self.recover(health)
+            return health
+
+    def _loop(self):
+        while not self.stop_event.wait(self.check_interval):
+            try:
+                self.check_and_recover()
+            except Exception as e:
+                print_step("HEALTH", f"⚠️ Health check error: {e}")
+
+    def start(self):
+        self.stop_event.clear()
+        threading.Thread(target=self._loop, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Input Queue - Antrian input per device: tap / swipe / keyevent digabung lalu dikirim per burst
+1. Semua pemanggil (safe_click, flow step, rule engine) masuk ke satu antrian per serial
+2. Tap duplikat (posisi berdekatan dalam merge_window) digabung jadi satu
+3. min_spacing per aksi ditunggu di host sebelum aksi itu dikirim, jadi done = aksi benar-benar mulai
+4. Aksi tanpa spacing dalam satu burst = satu write ke kanal touch_injector (satu shell / satu socket minitouch);
+   aksi ber-spacing dan keyevent di backend socket memecah burst jadi beberapa write berurutan
+5. Statistik: latency antrian (p50/p95), jumlah merged / dropped / burst
+"""
+import subprocess
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from device_state_cache import get_cache
+from touch_injector import ADB_PATH, ShellInjector, TouchError, open_injector
+from ui_hierarchy import percentile
+
+def print_step(step, message):
+    timestamp = datetime.now().strftime("%H:%M:%S")
+    print(f"[{timestamp}] [{step}] {message}")
+
+class InputAction:
+    """Satu aksi di antrian; done di-set setelah aksi terkirim ke device (error terisi kalau gagal)"""
+    __slots__ = ("kind", "args", "min_spacing", "merge", "created", "done", "error", "merged")
+
+    def __init__(self, kind, args, min_spacing=0, merge=False):
+        self.kind = kind
+        self.args = args
+        self.min_spacing = min_spacing  # ms minimal sejak aksi sebelumnya (perkiraan) selesai
+        self.merge = merge
+        self.created = time.time()
+        self.done = threading.Event()
+        self.error = None
+        self.merged = 0
+
+    @property
+    def duration(self):
+        """Perkiraan lama aksi di device (ms)"""
+        if self.kind == "tap":
+            return self.args[2]
+        if self.kind == "swipe":
+            return self.args[4] or 300
+        if self.kind == "play":
+            return max(points[-1][0] for points in self.args[0])
+        return 0
+
+    def wait(self, timeout=None):
+        """True kalau aksi terkirim tanpa error"""
+        return self.done.wait(timeout) and self.error is None
+
+    def __repr__(self):
+        return f"InputAction({self.kind}, {self.args})"
+
+class InputQueue:
+    """Worker per device; burst_window = jeda kumpulkan aksi sebelum satu write"""
+
+    def __init__(self, serial="emulator-5554", adb_path=ADB_PATH, injector=None, merge_window=0.3,
+                 merge_radius=12, max_pending=64, burst_window=0.02, max_burst=32):
+        self.serial = serial
+        self.adb_path = adb_path
+        self.injector = injector
+        self.merge_window = merge_window
+        self.merge_radius = merge_radius
+        self.max_pending = max_pending
+        self.burst_window = burst_window
+        self.max_burst = max_burst
+        self.condition = threading.Condition()
+        self.pending = deque()
+        self.inflight = []  # burst yang sudah diambil worker tapi belum selesai dikirim
+        self.last_tap = None  # (x, y, waktu kirim, aksi) untuk merge dengan tap yang baru terkirim
+        self.busy_until = 0.0  # perkiraan kapan burst terakhir selesai dieksekusi di device
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.latency = deque(maxlen=1000)
+        self.stats = {"submitted": 0, "sent": 0, "merged": 0, "dropped": 0, "bursts": 0, "errors": 0,
+                      "spacing_ms": 0}
+
+    # --- API ---
+    def tap(self, x, y, hold=30, min_spacing=0, merge=True):
+        return self.submit(InputAction("tap", (int(x), int(y), hold), min_spacing, merge))
+
+    click = tap
+
+    def swipe(self, x1, y1, x2, y2, delay=0, min_spacing=0):
+        return self.submit(InputAction("swipe", (int(x1), int(y1), int(x2), int(y2), int(delay)), min_spacing))
+
+    def key(self, code, min_spacing=0):
+        return self.submit(InputAction("key", (code,), min_spacing))
+
+    def play(self, strokes, min_spacing=0):
+        return self.submit(InputAction("play", (strokes,), min_spacing))
+
+    def submit(self, action):
+        with self.condition:
+            self.stats["submitted"] += 1
+            duplicate = self._duplicate(action) if action.kind == "tap" and action.merge else None
+            if duplicate is not None:
+                duplicate.merged += 1
+                self.stats["merged"] += 1
+                return duplicate
+            if len(self.pending) >= self.max_pending:
+                self.stats["dropped"] += 1
+                action.error = TouchError(f"antrian input {self.serial} penuh")
+                action.done.set()
+                return action
+            self.pending.append(action)
+            self.condition.notify()
+        self.start()
+        return action
+
+    def _duplicate(self, action):
+        x, y = action.args[:2]
+        for other in self.pending:
+            if other.kind == "tap" and other.merge and action.created - other.created <= self.merge_window \
+                    and abs(other.args[0] - x) <= self.merge_radius and abs(other.args[1] - y) <= self.merge_radius:
+                return other
+        if self.last_tap:
+            last_x, last_y, sent, last_action = self.last_tap
+            if last_action.merge and action.created - sent <= self.merge_window and abs(last_x - x) <= self.merge_radius \
+                    and abs(last_y - y) <= self.merge_radius:
+                return last_action
+        return None
+
+    def flush(self, timeout=10):
+        """Tunggu sampai semua aksi yang sudah masuk terkirim (termasuk burst yang sedang dikirim)"""
+        with self.condition:
+            waiting = self.inflight + list(self.pending)
+        return all(action.wait(timeout) for action in waiting)
+
+    # --- worker ---
+    def start(self):
+        with self.condition:
+            if self.thread and self.thread.is_alive():
+                return self
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._run, name=f"input-{self.serial}", daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        with self.condition:
+            self.condition.notify_all()
+        if self.thread:
+            self.thread.join(timeout=5)
+        if self.injector:
+            self.injector.close()
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            with self.condition:
+                while not self.pending and not self.stop_event.is_set():
+                    self.condition.wait(0.5)
+                if self.stop_event.is_set():
+                    break
+            # Beri kesempatan aksi berikutnya ikut satu burst
+            time.sleep(self.burst_window)
+            with self.condition:
+                burst = [self.pending.popleft() for _ in range(min(len(self.pending), self.max_burst))]
+                self.inflight = burst
+            try:
+                self._send(burst)
+            finally:
+                with self.condition:
+                    self.inflight = []
+
+    def _segments(self, burst):
+        """Pecah burst: aksi ber-min_spacing mulai segmen baru (spacing ditunggu di host), begitu juga keyevent
+        di backend socket (lewat adb terpisah, jadi harus di antara segmen supaya urutan tetap)"""
+        socket_keys = not isinstance(self.injector, ShellInjector)
+        segments, current = [], []
+        for action in burst:
+            separate = socket_keys and action.kind == "key"
+            if current and (action.min_spacing or separate or (socket_keys and current[-1].kind == "key")):
+                segments.append(current)
+                current = []
+            current.append(action)
+        if current:
+            segments.append(current)
+        return segments
+
+    def _send(self, burst):
+        try:
+            if self.injector is None:
+                self.injector = open_injector(self.serial, self.adb_path)
+                print_step("INPUT", f"{self.serial}: backend {self.injector.backend}")
+            for segment in self._segments(burst):
+                self._send_segment(segment)
+        except (TouchError, OSError, subprocess.SubprocessError) as e:
+            self.stats["errors"] += 1
+            if self.injector:
+                self.injector.close()
+                self.injector = None
+            for action in burst:
+                if not action.done.is_set():
+                    action.error = e
+                    action.done.set()
+        finally:
+            # Error tak terduga pun tidak boleh membuat pemanggil menunggu selamanya
+            for action in burst:
+                if not action.done.is_set():
+                    action.error = action.error or TouchError(f"input {self.serial} gagal terkirim")
+                    action.done.set()
+
+    def _send_segment(self, segment):
+        """Tunggu spacing di host, kirim satu write; done di-set saat aksi benar-benar mulai di device"""
+        if segment[0].min_spacing:
+            delay = self.busy_until + segment[0].min_spacing / 1000 - time.time()
+            if delay > 0:
+                self.stats["spacing_ms"] += round(delay * 1000)
+                time.sleep(delay)
+        planned = self._encode(segment)
+        now = time.time()
+        self.busy_until = max(self.busy_until, now) + planned / 1000
+        self.stats["bursts"] += 1
+        self.stats["sent"] += len(segment)
+        taps = [action for action in segment if action.kind == "tap"]
+        if taps:
+            self.last_tap = (taps[-1].args[0], taps[-1].args[1], now, taps[-1])
+        get_cache(self.serial, self.adb_path).notify("tap")
+        for action in segment:
+            self.latency.append((now - action.created) * 1000)
+            action.done.set()
+
+    def _encode(self, segment):
+        """Semua aksi segmen ke buffer injector, satu flush; return durasi rencana di device (ms)"""
+        injector = self.injector
+        if segment[0].kind == "key" and not isinstance(injector, ShellInjector):
+            injector.key(*segment[0].args)  # Backend socket: keyevent lewat adb, segmen sendiri
+            return 0
+        planned = 0
+        with injector.batch():
+            for action in segment:
+                if action.kind == "tap":
+                    injector.click(*action.args)
+                elif action.kind == "swipe":
+                    injector.swipe(*action.args)
+                elif action.kind == "play":
+                    injector.play(*action.args)
+                elif action.kind == "key":
+                    injector.key(*action.args)
+                planned += action.duration
+        return planned
+
+    def get_stats(self):
+        with self.condition:
+            pending = len(self.pending)
+        return dict(self.stats, serial=self.serial, pending=pending,
+                    backend=self.injector.backend if self.injector else None,
+                    latency_p50_ms=percentile(self.latency, 0.50), latency_p95_ms=percentile(self.latency, 0.95))
+
+_queues_lock = threading.Lock()
+_queues = {}
+
+def get_queue(serial="emulator-5554", adb_path=ADB_PATH):
+    """Satu InputQueue per serial, dipakai bersama semua pemanggil dalam proses"""
+    with _queues_lock:
+        input_queue = _queues.get(serial)
+        if input_queue is None:
+            input_queue = _queues[serial] = InputQueue(serial, adb_path)
+        return input_queue
+
+def main():
+    import argparse
+    import json
+    parser = argparse.ArgumentParser(description="Kirim burst tap lewat antrian input")
+    parser.add_argument("--device", default="emulator-5554")
+    parser.add_argument("--adb", default=ADB_PATH)
+    parser.add_argument("--tap", nargs=2, type=int, action="append", metavar=("X", "Y"), required=True)
+    parser.add_argument("--spacing", type=int, default=0, help="Jarak minimal antar tap (ms)")
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    input_queue = InputQueue(args.device, args.adb)
+    actions = [input_queue.tap(x, y, min_spacing=args.spacing, merge=False)
+               for _ in range(args.repeat) for x, y in args.tap]
+    ok = all(action.wait(30) for action in actions)
+    print_step("INPUT", f"{len(actions)} tap {'terkirim' if ok else 'GAGAL'}")
+    print(json.dumps(input_queue.get_stats(), indent=2))
+    input_queue.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+"""
+Job Queue - Antrian job persisten (SQLite) dengan checkpoint per step
+1. Job type: launch, reach_lobby, run_stages (N stage), collect_rewards
+2. Affinity per device (atau bebas), priority, lease dengan expiry
+3. Tiap step yang selesai di-checkpoint; worker crash -> lanjut dari step terakhir
+4. Bisa dijalankan sebagai flow FleetSupervisor ("job_queue:job_flow")
+"""
+import json
+import os
+import socket
+import sqlite3
+import subprocess
+import threading
+import time
+from datetime import datetime
+from ui_hierarchy import create_hierarchy_service, HierarchyError
+
+DB_PATH = "jobs.db"
+ADB_PATH = "C:\\LDPlayer\\LDPlayer9\\adb.exe"
+LDPLAYER_PATH = "C:\\LDPlayer\\LDPlayer9"
+PACKAGE = "com.linecorp.LGRGS"
+
+JOB_TYPES = ("launch", "reach_lobby", "run_stages", "collect_rewards")
+REWARD_KEYWORDS = ("claim", "collect", "receive", "get all", "receive all")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    type TEXT NOT NULL,
+    device TEXT,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'queued',
+    params TEXT NOT NULL DEFAULT '{}',
+    checkpoint TEXT NOT NULL DEFAULT '{}',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    lease_owner TEXT,
+    lease_expires REAL,
+    error TEXT,
+    result TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_pick ON jobs (status, priority DESC, id);
+"""
+
+def print_step(step, message):
+    timestamp = datetime.now().strftime("%H:%M:%S")
+    print(f"[{timestamp}] [{step}] {message}")
+
+def job_steps(job_type, params):
+    """Urutan step untuk satu job type (run_stages: satu step per stage)"""
+    if job_type == "launch":
+        return ["boot_instance", "launch_app"]
+    if job_type == "reach_lobby":
+        return ["boot_instance", "launch_app", "wait_lobby"]
+    if job_type == "run_stages":
+        return ["wait_lobby"] + [f"stage:{i + 1}" for i in range(int(params.get("stages", 1)))]
+    if job_type == "collect_rewards":
+        return ["wait_lobby", "claim_rewards"]
+    raise ValueError(f"Unknown job type: {job_type}")
+
+class LeaseLost(Exception):
+    """Lease job sudah expired dan diambil worker lain"""
+
+class Job:
+    """Snapshot satu baris jobs"""
+
+    def __init__(self, row):
+        self.id = row["id"]
+        self.type = row["type"]
+        self.device = row["device"]
+        self.priority = row["priority"]
+        self.status = row["status"]
+        self.params = json.loads(row["params"])
+        self.checkpoint = json.loads(row["checkpoint"])
+        self.attempts = row["attempts"]
+        self.max_attempts = row["max_attempts"]
+        self.lease_owner = row["lease_owner"]
+        self.lease_expires = row["lease_expires"]
+        self.error = row["error"]
+        self.result = json.loads(row["result"]) if row["result"] else None
+        self.created = row["created"]
+        self.updated = row["updated"]
+
+    @property
+    def completed_steps(self):
+        return self.checkpoint.get("completed", [])
+
+    @property
+    def steps(self):
+        return job_steps(self.type, self.params)
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in ("id", "type", "device", "priority", "status", "params",
+                                                   "checkpoint", "attempts", "max_attempts", "lease_owner",
+                                                   "lease_expires", "error", "result", "created", "updated")}
+
+class JobQueue:
+    """Antrian SQLite, aman dipakai banyak proses (satu koneksi per proses)"""
+
+    def __init__(self, db_path=DB_PATH, lease_seconds=120):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def _write(self, sql, args=()):
+        """Satu transaksi write; return cursor"""
+        with self.lock:
+            return self.conn.execute(sql, args)
+
+    def enqueue(self, job_type, params=None, device=None, priority=0, max_attempts=3):
+        """Tambah job; device=None berarti boleh dikerjakan device mana saja"""
+        params = params or {}
+        job_steps(job_type, params)  # Validasi type/params sebelum masuk DB
+        now = time.time()
+        cursor = self._write(
+            "INSERT INTO jobs (type, device, priority, params, max_attempts, created, updated) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job_type, device, priority, json.dumps(params), max_attempts, now, now))
+        return cursor.lastrowid
+
+    def lease(self, worker_id, device=None, types=None):
+        """Ambil job berikutnya untuk device ini secara atomik.
+        Job dengan affinity ke device ini didahulukan, lalu priority, lalu FIFO.
+        Lease yang expired (worker crash) dianggap bisa diambil lagi."""
+        now = time.time()
+        conditions = ["(status = 'queued' OR (status = 'leased' AND lease_expires < ?))",
+                      "(device IS NULL OR device = ?)"]
+        args = [now, device]
+        if types:
+            conditions.append(f"type IN ({','.join('?' * len(types))})")
+            args += list(types)
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                while True:
+                    row = self.conn.execute(
+                        f"SELECT * FROM jobs WHERE {' AND '.join(conditions)} "
+                        "ORDER BY (device IS NULL), priority DESC, id LIMIT 1", args).fetchone()
+                    if row is None or row["attempts"] < row["max_attempts"]:
+                        break
+                    # Worker terakhir mati di tengah jalan dan jatah retry habis
+                    self.conn.execute("UPDATE jobs SET status = 'failed', lease_owner = NULL, updated = ?, "
+                                      "error = COALESCE(error, 'lease expired') WHERE id = ?", (now, row["id"]))
+                if row is not None:
+                    self.conn.execute(
+                        "UPDATE jobs SET status = 'leased', lease_owner = ?, lease_expires = ?, "
+                        "attempts = attempts + 1, updated = ? WHERE id = ?",
+                        (worker_id, now + self.lease_seconds, now, row["id"]))
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return self.get(row["id"]) if row is not None else None
+
+    def _update_owned(self, job_id, worker_id, assignments, args):
+        cursor = self._write(f"UPDATE jobs SET {assignments}, updated = ? WHERE id = ? AND lease_owner = ? "
+                             "AND status = 'leased'", tuple(args) + (time.time(), job_id, worker_id))
+        if cursor.rowcount == 0:
+            raise LeaseLost(f"job {job_id} no longer leased by {worker_id}")
+
+    def heartbeat(self, job_id, worker_id):
+        """Perpanjang lease"""
+        self._update_owned(job_id, worker_id, "lease_expires = ?", [time.time() + self.lease_seconds])
+
+    def checkpoint(self, job_id, worker_id, step, state=None):
+        """Catat step selesai (+ state bebas) dan sekalian perpanjang lease"""
+        job = self.get(job_id)
+        checkpoint = job.checkpoint
+        completed = checkpoint.setdefault("completed", [])
+        if step not in completed:
+            completed.append(step)
+        if state:
+            checkpoint.setdefault("state", {}).update(state)
+        checkpoint["last_step"] = step
+        self._update_owned(job_id, worker_id, "checkpoint = ?, lease_expires = ?",
+                           [json.dumps(checkpoint), time.time() + self.lease_seconds])
+
+    def complete(self, job_id, worker_id, result=None):
+        self._update_owned(job_id, worker_id, "status = 'done', lease_owner = NULL, lease_expires = NULL, result = ?",
+                           [json.dumps(result) if result is not None else None])
+
+    def fail(self, job_id, worker_id, error, retry=True):
+        """Gagal: kembali ke antrian (checkpoint tetap) sampai max_attempts habis"""
+        job = self.get(job_id)
+        status = "queued" if retry and job.attempts < job.max_attempts else "failed"
+        self._update_owned(job_id, worker_id, "status = ?, lease_owner = NULL, lease_expires = NULL, error = ?",
+                           [status, str(error)])
+        return status
+
+    def release(self, job_id, worker_id):
+        """Kembalikan job tanpa dihitung sebagai attempt (mis. worker diminta berhenti)"""
+        self._update_owned(job_id, worker_id, "status = 'queued', lease_owner = NULL, lease_expires = NULL, "
+                           "attempts = MAX(attempts - 1, 0)", [])
+
+    def cancel(self, job_id):
+        cursor = self._write("UPDATE jobs SET status = 'cancelled', lease_owner = NULL, updated = ? "
+                             "WHERE id = ? AND status IN ('queued', 'leased')", (time.time(), job_id))
+        return cursor.rowcount > 0
+
+    def get(self, job_id):
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job(row) if row else None
+
+    def list(self, status=None, device=None, limit=100):
+        conditions, args = [], []
+        if status:
+            conditions.append("status = ?")
+            args.append(status)
+        if device:
+            conditions.append("device = ?")
+            args.append(device)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self.lock:
+            rows = self.conn.execute(f"SELECT * FROM jobs {where} ORDER BY id DESC LIMIT ?", args + [limit]).fetchall()
+        return [Job(row) for row in rows]
+
+    def get_stats(self):
+        with self.lock:
+            rows = self.conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def close(self):
+        self.conn.close()
+
+class LineRangerSteps:
+    """Implementasi step untuk satu device (dipakai JobRunner)"""
+
+    def __init__(self, serial, ldplayer_path=LDPLAYER_PATH, adb_path=ADB_PATH, package=PACKAGE):
+        from health_monitor import serial_index
+        self.serial = serial
+        self.index = serial_index(serial)
+        self.ldplayer_path = ldplayer_path
+        self.adb_path = adb_path
+        self.package = package
+        self.hierarchy = create_hierarchy_service(serial, adb_path)
+        self._ai = None
+        self.should_stop = lambda: False  # di-set run(); step panjang memanggilnya (heartbeat worker)
+
+    @property
+    def ai(self):
+        if self._ai is None:
+            from ultimate_line_ranger_ai import UltimateGameplayAI
+            self._ai = UltimateGameplayAI(device=self.serial)
+            self._ai.adb_path = self.adb_path
+        return self._ai
+
+    def adb(self, *args, timeout=30):
+        try:
+            result = subprocess.run([self.adb_path, "-s", self.serial] + list(args), capture_output=True,
+                                    text=True, timeout=timeout)
+            return result.stdout.strip()
+        except Exception:
+            return ""
+
+    def run(self, step, job, state, should_stop):
+        """Jalankan satu step; return dict state baru (disimpan di checkpoint)"""
+        self.should_stop = should_stop
+        if step.startswith("stage:"):
+            return self.run_stage(int(step[6:]), job.params, state, should_stop)
+        return getattr(self, step)(job.params, state)
+
+    def boot_instance(self, params, state):
+        from boot_scheduler import BootScheduler
+        record = BootScheduler(self.ldplayer_path).run([self.index], should_stop=self.should_stop)[0]
+        if self.should_stop():
+            raise InterruptedError("stop requested")
+        if record["status"] != "ready":
+            raise RuntimeError(f"boot {record['status']}")
+        return {"boot_seconds": record["boot_seconds"]}
+
+    def launch_app(self, params, state):
+        if self.package not in self.adb("shell", "dumpsys activity activities | grep mResumedActivity"):
+            self.adb("shell", "monkey", "-p", self.package, "-c", "android.intent.category.LAUNCHER", "1")
+        return {}
+
+    def wait_lobby(self, params, state):
+        if not self.ai.wait_for_lobby(max_wait=params.get("lobby_timeout", 120), should_stop=self.should_stop):
+            if self.should_stop():
+                raise InterruptedError("stop requested")
+            raise RuntimeError("lobby not reached")
+        return {}
+
+    def run_stage(self, number, params, state, should_stop):
+        """Main automation sampai satu stage clear (kembali ke lobby setelah START)"""
+        ai = self.ai
+        before = ai.metrics["stage_clears"]
+        for _ in range(params.get("cycles_per_stage", 30)):
+            if should_stop():
+                raise InterruptedError("stop requested")
+            ai.run_ultimate_automation(cycles=1)
+            if ai.metrics["stage_clears"] > before:
+                return {"stages_cleared": state.get("stages_cleared", 0) + 1}
+        raise RuntimeError(f"stage {number} not cleared")
+
+    def claim_rewards(self, params, state):
+        """Tap semua node dengan teks klaim hadiah di UI hierarchy, beberapa putaran"""
+        claimed = 0
+        for _ in range(params.get("reward_rounds", 5)):
+            try:
+                nodes = self.hierarchy.dump(fresh=True).nodes
+            except (HierarchyError, OSError, subprocess.SubprocessError):
+                break
+            targets = [node.center for node in nodes if node.text.strip().lower() in REWARD_KEYWORDS]
+            if not targets:
+                break
+            for x, y in targets:
+                self.adb("shell", "input", "tap", str(x), str(y))
+                claimed += 1
+                time.sleep(1)
+        return {"rewards_claimed": state.get("rewards_claimed", 0) + claimed}
+
+class JobRunner:
+    """Worker: lease job untuk device ini, jalankan step yang belum selesai, checkpoint tiap step"""
+
+    def __init__(self, queue, serial, steps=None, worker_id=None, types=None):
+        self.queue = queue
+        self.serial = serial
+        self.steps = steps or LineRangerSteps(serial)
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{serial}"
+        self.types = types
+
+    def _keep_lease(self, job_id, done):
+        interval = max(1.0, self.queue.lease_seconds / 3)
+        while not done.wait(interval):
+            try:
+                self.queue.heartbeat(job_id, self.worker_id)
+            except LeaseLost:
+                return
+            except sqlite3.Error as e:
+                print_step("JOBS", f"⚠️ Heartbeat error: {e}")
+
+    def run_job(self, job, should_stop=lambda: False, report=None):
+        state = dict(job.checkpoint.get("state", {}))
+        remaining = [s for s in job.steps if s not in job.completed_steps]
+        if job.completed_steps:
+            print_step("JOBS", f"▶️ Job {job.id} ({job.type}) lanjut dari checkpoint {job.completed_steps[-1]}")
+        done = threading.Event()
+        threading.Thread(target=self._keep_lease, args=(job.id, done), daemon=True).start()
+        try:
+            for step in remaining:
+                if should_stop():
+                    self.queue.release(job.id, self.worker_id)
+                    return "released"
+                if report:
+                    report("running", f"job {job.id} {job.type}: {step}")
+                started = time.time()
+                state.update(self.steps.run(step, job, state, should_stop) or {})
+                state.setdefault("step_seconds", {})[step] = round(time.time() - started, 1)
+                self.queue.checkpoint(job.id, self.worker_id, step, state)
+                print_step("JOBS", f"✅ Job {job.id} step {step} ({state['step_seconds'][step]}s)")
+            self.queue.complete(job.id, self.worker_id, state)
+            return "done"
+        except LeaseLost as e:
+            print_step("JOBS", f"⚠️ {e}")
+            return "lost"
+        except InterruptedError:
+            self.queue.release(job.id, self.worker_id)
+            return "released"
+        except Exception as e:
+            status = self.queue.fail(job.id, self.worker_id, e)
+            print_step("JOBS", f"❌ Job {job.id} step gagal: {e} -> {status}")
+            return status
+        finally:
+            done.set()
+
+    def run(self, should_stop=lambda: False, report=None, idle_exit=False, poll_interval=5):
+        """Loop: lease -> run; idle_exit=True berhenti kalau antrian kosong"""
+        while not should_stop():
+            job = self.queue.lease(self.worker_id, self.serial, self.types)
+            if job is None:
+                if idle_exit:
+                    return
+                time.sleep(poll_interval)
+                continue
+            self.run_job(job, should_stop, report)
+
+def job_flow(serial, report, should_stop, db_path=DB_PATH, idle_exit=True, types=None):
+    """Flow untuk FleetSupervisor: flow="job_queue:job_flow" """
+    queue = JobQueue(db_path)
+    try:
+        JobRunner(queue, serial, types=types).run(should_stop, report, idle_exit=idle_exit)
+    finally:
+        queue.close()
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Line Ranger job queue")
+    parser.add_argument("--db", default=DB_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("add")
+    add.add_argument("type", choices=JOB_TYPES)
+    add.add_argument("--device", default=None, help="Serial affinity (default: device mana saja)")
+    add.add_argument("--priority", type=int, default=0)
+    add.add_argument("--stages", type=int, default=1)
+    commands.add_parser("list")
+    work = commands.add_parser("work")
+    work.add_argument("serial")
+    work.add_argument("--forever", action="store_true")
+    args = parser.parse_args()
+
+    queue = JobQueue(args.db)
+    if args.command == "add":
+        params = {"stages": args.stages} if args.type == "run_stages" else {}
+        job_id = queue.enqueue(args.type, params, device=args.device, priority=args.priority)
+        print_step("JOBS", f"Job {job_id} ({args.type}) masuk antrian")
+    elif args.command == "list":
+        for job in queue.list():
+            print_step("JOBS", f"#{job.id} {job.type} device={job.device} prio={job.priority} {job.status} "
+                               f"steps={job.completed_steps}/{job.steps} attempts={job.attempts} {job.error or ''}")
+        print_step("JOBS", f"Statistik: {queue.get_stats()}")
+    else:
+        JobRunner(queue, args.serial).run(idle_exit=not args.forever)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Keyword Scanner - Multi-pattern matcher (Aho-Corasick) untuk UI dump dan baris logcat
+Automaton dibangun sekali dari set keyword (opsional dikelompokkan per label, case folding
+Unicode), lalu satu kali jalan di teks mengembalikan semua match beserta posisinya.
+Mode atribut hanya memindai nilai text / content-desc, bukan seluruh XML mentah.
+"""
+import re
+from collections import deque, namedtuple
+from datetime import datetime
+
+Match = namedtuple("Match", "keyword label start end")
+ATTRIBUTES = ("text", "content-desc")
+
+def print_step(step, message):
+    timestamp = datetime.now().strftime("%H:%M:%S")
+    print(f"[{timestamp}] [{step}] {message}")
+
+class KeywordScanner:
+    """Aho-Corasick; keywords = list keyword atau dict label -> list keyword"""
+
+    def __init__(self, keywords, ignore_case=True):
+        self.ignore_case = ignore_case
+        groups = keywords if isinstance(keywords, dict) else {keyword: [keyword] for keyword in keywords}
+        self.labels = list(groups)
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]  # state -> [(keyword, label, panjang folded)]
+        for label, words in groups.items():
+            for word in words:
+                self._add(word, label)
+        self._build()
+        self.max_length = max((length for out in self.output for _, _, length in out), default=0)
+
+    def _fold(self, text):
+        return text.casefold() if self.ignore_case else text
+
+    def _add(self, keyword, label):
+        folded = self._fold(keyword)
+        if not folded:
+            return
+        state = 0
+        for char in folded:
+            if char not in self.goto[state]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+                self.goto[state][char] = len(self.goto) - 1
+            state = self.goto[state][char]
+        self.output[state].append((keyword, label, len(folded)))
+
+    def _build(self):
+        """Failure link BFS; output state digabung dengan output failure-nya"""
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, target in self.goto[state].items():
+                queue.append(target)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[target] = self.goto[fallback].get(char, 0)
+                self.output[target] = self.output[target] + self.output[self.fail[target]]
+
+    def scan(self, text, offset=0):
+        """Semua match (overlap juga) dalam satu kali jalan; start/end = indeks di teks asli"""
+        matches = []
+        if not text or not self.max_length:
+            return matches
+        goto, fail, output = self.goto, self.fail, self.output
+        origins = deque(maxlen=self.max_length)  # indeks asli untuk tiap karakter folded terakhir
+        state = 0
+        for index, char in enumerate(text):
+            for folded in (char.casefold() if self.ignore_case else char):
+                origins.append(index)
+                while state and folded not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(folded, 0)
+                for keyword, label, length in output[state]:
+                    matches.append(Match(keyword, label, offset + origins[-length], offset + index + 1))
+        return matches
+
+    def scan_attributes(self, xml, attributes=ATTRIBUTES):
+        """Hanya nilai atribut (default text + content-desc) dari dump XML mentah; posisi relatif ke XML"""
+        pattern = _attribute_pattern(attributes)
+        matches = []
+        for attribute in pattern.finditer(xml or ""):
+            if attribute.group(2):
+                matches.extend(self.scan(attribute.group(2), offset=attribute.start(2)))
+        return matches
+
+    def scan_nodes(self, nodes):
+        """[(UINode, Match)] untuk node hasil ui_hierarchy (text + content-desc)"""
+        result = []
+        for node in nodes:
+            for value in (node.text, node.content_desc):
+                result.extend((node, match) for match in self.scan(value))
+        return result
+
+    def scan_lines(self, lines):
+        """Generator (nomor baris, baris, Match) untuk stream log; state di-reset per baris"""
+        for number, line in enumerate(lines, 1):
+            for match in self.scan(line):
+                yield number, line, match
+
+    def found(self, text, attributes_only=False):
+        """Set label yang muncul minimal sekali"""
+        matches = self.scan_attributes(text) if attributes_only else self.scan(text)
+        return {match.label for match in matches}
+
+    def found_in_order(self, text, attributes_only=False):
+        """Label yang muncul, urut sesuai urutan definisi (untuk prioritas aksi)"""
+        found = self.found(text, attributes_only)
+        return [label for label in self.labels if label in found]
+
+_attribute_patterns = {}
+
+def _attribute_pattern(attributes):
+    pattern = _attribute_patterns.get(attributes)
+    if pattern is None:
+        names = "|".join(re.escape(name) for name in attributes)
+        pattern = re.compile(rf'\s({names})="([^"]*)"')
+        _attribute_patterns[attributes] = pattern
+    return pattern
+
+def main():
+    import argparse
+    import sys
+    import time
+    parser = argparse.ArgumentParser(description="Scan file (UI dump / log) dengan banyak keyword sekaligus")
+    parser.add_argument("file", help="File input, '-' untuk stdin")
+    parser.add_argument("keywords", nargs="+")
+    parser.add_argument("--case-sensitive", action="store_true")
+    parser.add_argument("--attributes", action="store_true", help="Hanya nilai text / content-desc")
+    args = parser.parse_args()
+
+    scanner = KeywordScanner(args.keywords, ignore_case=not args.case_sensitive)
+    content = sys.stdin.read() if args.file == "-" else open(args.file, encoding="utf-8", errors="replace").read()
+    started = time.perf_counter()
+    matches = scanner.scan_attributes(content) if args.attributes else scanner.scan(content)
+    elapsed = (time.perf_counter() - started) * 1000
+    for match in matches:
+        print(f"{match.start}-{match.end}\t{match.label}\t{content[match.start:match.end]!r}")
+    print_step("SCAN", f"{len(matches)} match di {len(content)} karakter dalam {elapsed:.2f}ms")
+
+if __name__ == "__main__":
+    main()
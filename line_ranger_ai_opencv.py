@@ -9,8 +9,10 @@ import subprocess
 import time
 import os
 import json
-import base64
 from datetime import datetime
+from decision_cache import DecisionCache, hamming_distance, screen_fingerprint
+from ai_context_builder import AIContextBuilder
+from rule_engine import RuleEngine, Facts, FALLBACK_RULES
 
 class LineRangerAI:
     def __init__(self):
@@ -19,6 +21,10 @@ class LineRangerAI:
         self.screenshot_path = "current_screen.png"
         self.ai_decisions_log = "ai_decisions.json"
         self.context_limit = 4500  # Keep under 5000 tokens
+        self.decision_cache = DecisionCache("ai_decision_cache.json")
+        self.last_cached_tap = None  # (screen_type, fingerprint, signature) keputusan cache yang terakhir di-tap
+        self.context_builder = AIContextBuilder()
+        self.rule_engine = RuleEngine(FALLBACK_RULES)
         
     def run_adb(self, cmd):
         """Execute ADB command"""
@@ -99,36 +105,10 @@ class LineRangerAI:
         
         return analysis
     
-    def create_ai_web_interface(self, analysis, screenshot_base64):
+    def create_ai_web_interface(self, analysis, img):
         """Create HTML interface for AI analysis"""
-        html_content = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <title>Line Ranger AI Analysis</title>
-    <script src="https://js.puter.com/v2/"></script>
-</head>
-<body>
-    <h2>🎮 Line Ranger AI Analysis</h2>
-    
-    <div id="screenshot">
-        <h3>📸 Current Screenshot:</h3>
-        <img src="data:image/png;base64,{screenshot_base64}" style="max-width: 400px; border: 1px solid #ccc;">
-    </div>
-    
-    <div id="analysis">
-        <h3>🔍 OpenCV Analysis:</h3>
-        <pre>{json.dumps(analysis, indent=2)}</pre>
-    </div>
-    
-    <div id="ai-response">
-        <h3>🤖 AI Decision:</h3>
-        <div id="ai-output">Analyzing...</div>
-    </div>
-    
-    <script>
-        // Prepare context for AI (keep under 5000 tokens)
-        const context = `
+        # Prepare context for AI (keep under 5000 tokens)
+        context = f"""
 Line Ranger Game Analysis:
 - Resolution: {analysis.get('resolution', 'unknown')}
 - Buttons detected: {analysis.get('total_buttons', 0)}
@@ -144,92 +124,64 @@ Rules:
 5. Provide specific coordinates if possible
 
 Elements found: {json.dumps(analysis.get('elements', [])[:3])}
-        `.trim();
+        """.strip()
         
-        // Call AI for decision
-        puter.ai.chat(context, {{
-            model: "gpt-5-nano",
-            max_tokens: 150,
-            temperature: 0.3
-        }}).then(response => {{
-            document.getElementById('ai-output').innerHTML = 
-                '<div style="background: #f0f8ff; padding: 10px; border-radius: 5px;">' + 
-                response.replace(/\\n/g, '<br>') + 
-                '</div>';
-            
-            // Save decision to parent process
-            window.aiDecision = response;
-            
-            // Try to extract coordinates from AI response
-            const coordMatch = response.match(/\\((\\d+),\\s*(\\d+)\\)/);
-            if (coordMatch) {{
-                const x = parseInt(coordMatch[1]);
-                const y = parseInt(coordMatch[2]);
-                document.getElementById('ai-output').innerHTML += 
-                    '<br><strong>🎯 Suggested click: (' + x + ', ' + y + ')</strong>';
-                window.suggestedClick = {{x: x, y: y}};
-            }}
-        }}).catch(error => {{
-            document.getElementById('ai-output').innerHTML = 
-                '<div style="color: red;">Error: ' + error + '</div>';
-        }});
-    </script>
-</body>
-</html>
-        """
-        
-        return html_content
+        # Thumbnail + ROI crops + element list instead of the full PNG
+        return self.context_builder.render(
+            img, analysis, "screen", context,
+            title="Line Ranger AI Analysis", max_tokens=150, temperature=0.3, target_var="suggestedClick"
+        )
     
-    def get_ai_decision(self, analysis):
+    def get_ai_decision(self, analysis, img=None):
         """Get AI decision using web interface"""
         print("🤖 Getting AI decision...")
         
-        # Convert screenshot to base64
-        with open(self.screenshot_path, "rb") as f:
-            screenshot_base64 = base64.b64encode(f.read()).decode()
+        # Screen unchanged after a cached tap: that decision was wrong, don't repeat it
+        self._evict_unchanged(img)
         
-        # Create HTML file
-        html_content = self.create_ai_web_interface(analysis, screenshot_base64)
+        # Known screens resolve from cache, only novel screens hit the AI page
+        cached, cache_key = self.decision_cache.lookup("screen", img, analysis)
+        if cached and cached.get("action") == "click":
+            print(f"⚡ Cached decision: {cached['action']} - {cached['reason']}")
+            self.last_cached_tap = ("screen",) + cache_key
+            return cached
         
-        with open("ai_analysis.html", "w", encoding="utf-8") as f:
-            f.write(html_content)
+        if img is None:
+            img = cv2.imread(self.screenshot_path)
         
-        print("✅ AI analysis interface created: ai_analysis.html")
+        # Create HTML file
+        if img is not None:
+            html_content = self.create_ai_web_interface(analysis, img)
+            
+            with open("ai_analysis.html", "w", encoding="utf-8") as f:
+                f.write(html_content)
+            
+            stats = self.context_builder.get_stats()
+            print(f"✅ AI analysis interface created: ai_analysis.html ({stats['last_bytes'] // 1024} KB, {stats['last_ms']}ms)")
         print("🌐 Open ai_analysis.html in browser to see AI decision")
         
         # Simulate AI decision for automation (fallback)
         fallback_decision = self.create_fallback_decision(analysis)
+        # Only detected clicks are cached; waits and last-resort guesses are decided again next time
+        if fallback_decision["action"] == "click" and not fallback_decision.get("fallback") and cache_key[0]:
+            self.decision_cache.put("screen", cache_key[0], cache_key[1], fallback_decision)
+            self.last_cached_tap = ("screen",) + cache_key
         return fallback_decision
     
+    def _evict_unchanged(self, img):
+        """Compare the current screen with the screen at the last cached tap"""
+        last, self.last_cached_tap = self.last_cached_tap, None
+        if last is None or img is None:
+            return
+        if hamming_distance(last[1], screen_fingerprint(img)) <= self.decision_cache.max_distance:
+            removed = self.decision_cache.evict(*last)
+            print(f"🗑️ Screen unchanged after tap, {removed} cached decision(s) evicted")
+    
     def create_fallback_decision(self, analysis):
         """Create fallback decision based on OpenCV analysis"""
-        decision = {
-            "action": "wait",
-            "reason": "No clear action detected",
-            "confidence": 0.5,
-            "coordinates": None
-        }
-        
-        # Simple rule-based decisions
-        if analysis["total_buttons"] > 0:
-            # Click on largest button
-            largest_button = max(analysis["elements"], key=lambda x: x["area"])
-            decision = {
-                "action": "click",
-                "reason": f"Click largest button (area: {largest_button['area']})",
-                "confidence": 0.8,
-                "coordinates": largest_button["position"]
-            }
-        
-        elif any(color["color"] == "green" for color in analysis["colors"]):
-            # Green usually means "go" or "start"
-            decision = {
-                "action": "click",
-                "reason": "Green color detected - likely start/go button",
-                "confidence": 0.7,
-                "coordinates": [640, 360]  # Center screen
-            }
-        
+        decision = self.rule_engine.decide(Facts.from_analysis("screen", analysis))
+        if "area" in decision:
+            decision["reason"] = f"{decision['reason']} (area: {decision['area']})"
         return decision
     
     def execute_decision(self, decision):
@@ -293,7 +245,7 @@ Elements found: {json.dumps(analysis.get('elements', [])[:3])}
             print(f"📊 Found {analysis['total_buttons']} buttons, {len(analysis['colors'])} colors")
             
             # Get AI decision
-            decision = self.get_ai_decision(analysis)
+            decision = self.get_ai_decision(analysis, img)
             
             # Execute decision
             self.execute_decision(decision)
@@ -301,6 +253,8 @@ Elements found: {json.dumps(analysis.get('elements', [])[:3])}
             # Wait before next cycle
             time.sleep(5)
         
+        self.decision_cache.save()
+        print(f"📦 Decision cache: {self.decision_cache.get_stats()}")
         print("\n✅ AI automation cycle completed!")
         print("📁 Check 'ai_analysis.html' for AI interface")
         print("📁 Check 'ai_decisions.json' for decision log")
@@ -7,6 +7,15 @@ import time
 import json
 import os
 from datetime import datetime
+from ui_hierarchy import create_hierarchy_service
+from keyword_scanner import KeywordScanner
+from input_queue import get_queue
+
+# Dibangun sekali; dipindai di XML mentah dump (sama seperti pengecekan substring sebelumnya)
+POPUP_SCANNER = KeywordScanner({"ok": ["OK", "확인"], "close": ["CLOSE", "닫기"], "skip": ["SKIP", "건너뛰기"]},
+                               ignore_case=False)
+ERROR_SCANNER = KeywordScanner({"error": ["error", "오류"]})
+SETTINGS_SCANNER = KeywordScanner({"settings": ["setting", "설정"]})
 
 class LineRangerAutomation:
     def __init__(self):
@@ -16,6 +25,8 @@ class LineRangerAutomation:
         self.session_active = False
         self.user_profile = {}
         self.log_file = "automation_log.txt"
+        self.hierarchy = create_hierarchy_service(self.device, self.adb_path)
+        self.input = get_queue(self.device, self.adb_path)
         
     def log(self, message, level="INFO"):
         """Log activities to monitoring system"""
@@ -126,12 +137,8 @@ class LineRangerAutomation:
             return False
         
         # Check for LIAPP ALERT
-        self.run_adb("shell uiautomator dump /sdcard/session_check.xml")
-        subprocess.run([self.adb_path, "-s", self.device, "pull", "/sdcard/session_check.xml", "session_check.xml"], capture_output=True)
-        
         try:
-            with open("session_check.xml", "r", encoding="utf-8") as f:
-                ui_content = f.read()
+            ui_content = self.hierarchy.dump(fresh=True).xml
             
             if "LIAPP ALERT" in ui_content:
                 self.log("Session invalid - LIAPP ALERT detected!", "ERROR")
@@ -157,25 +164,22 @@ class LineRangerAutomation:
             self.log(f"Checking for popups... ({i+1}/5)")
             
             # Capture current UI
-            self.run_adb("shell uiautomator dump /sdcard/dashboard.xml")
-            subprocess.run([self.adb_path, "-s", self.device, "pull", "/sdcard/dashboard.xml", "dashboard.xml"], capture_output=True)
-            
             try:
-                with open("dashboard.xml", "r", encoding="utf-8") as f:
-                    ui_content = f.read()
+                ui_content = self.hierarchy.dump(fresh=True).xml
                 
                 # Look for common buttons to dismiss popups
-                if "OK" in ui_content or "확인" in ui_content:
+                popups = POPUP_SCANNER.found(ui_content)
+                if "ok" in popups:
                     self.log("Found OK button, clicking...")
-                    self.run_adb("shell input tap 800 600")  # Generic OK position
+                    self.input.tap(800, 600).wait(5)  # Generic OK position
                     time.sleep(3)
-                elif "CLOSE" in ui_content or "닫기" in ui_content:
+                elif "close" in popups:
                     self.log("Found Close button, clicking...")
-                    self.run_adb("shell input tap 1000 300")  # Generic close position
+                    self.input.tap(1000, 300).wait(5)  # Generic close position
                     time.sleep(3)
-                elif "SKIP" in ui_content or "건너뛰기" in ui_content:
+                elif "skip" in popups:
                     self.log("Found Skip button, clicking...")
-                    self.run_adb("shell input tap 1100 100")  # Generic skip position
+                    self.input.tap(1100, 100).wait(5)  # Generic skip position
                     time.sleep(3)
                 else:
                     self.log("No popups detected, proceeding...")
@@ -198,19 +202,15 @@ class LineRangerAutomation:
         self.log("Accessing profile section...")
         
         # Try to find profile/menu button
-        self.run_adb("shell uiautomator dump /sdcard/profile.xml")
-        subprocess.run([self.adb_path, "-s", self.device, "pull", "/sdcard/profile.xml", "profile.xml"], capture_output=True)
-        
         try:
-            with open("profile.xml", "r", encoding="utf-8") as f:
-                ui_content = f.read()
+            hierarchy = self.hierarchy.dump(fresh=True)
             
             # Extract basic profile info (this would need to be customized based on actual UI)
             self.user_profile = {
                 "timestamp": datetime.now().isoformat(),
                 "app_active": True,
                 "session_valid": self.session_active,
-                "ui_elements_detected": len(ui_content.split("node")) - 1
+                "ui_elements_detected": len(hierarchy)
             }
             
             self.log(f"User profile extracted: {self.user_profile}")
@@ -229,25 +229,32 @@ class LineRangerAutomation:
         
         # Try to access main game features
         test_actions = [
-            ("Check inventory", "shell input tap 100 500"),
-            ("Check stages", "shell input tap 200 500"),
-            ("Check shop", "shell input tap 300 500")
+            ("Check inventory", (100, 500)),
+            ("Check stages", (200, 500)),
+            ("Check shop", (300, 500))
         ]
         
-        for action_name, action_cmd in test_actions:
+        # Layar awal jadi pembanding; setelah tap cukup periksa node yang berubah
+        try:
+            self.hierarchy.changes()
+        except Exception:
+            pass
+        start_screen = self.hierarchy.baseline
+        
+        for action_name, (x, y) in test_actions:
             self.log(f"Testing: {action_name}")
-            self.run_adb(action_cmd)
+            # Jeda 2 detik setelah tombol back dijaga antrian input, bukan sleep di sini
+            self.input.tap(x, y, min_spacing=2000, merge=False).wait(10)
             time.sleep(3)
             
             # Check for error messages
-            self.run_adb("shell uiautomator dump /sdcard/status_check.xml")
-            subprocess.run([self.adb_path, "-s", self.device, "pull", "/sdcard/status_check.xml", "status_check.xml"], capture_output=True)
-            
             try:
-                with open("status_check.xml", "r", encoding="utf-8") as f:
-                    ui_content = f.read()
+                diff = self.hierarchy.changes()
+                if not diff:
+                    self.log(f"No UI change after {action_name}")
+                    continue
                 
-                if "error" in ui_content.lower() or "오류" in ui_content:
+                if ERROR_SCANNER.scan_nodes(diff.touched()):
                     self.log(f"Error detected in {action_name}", "WARNING")
                     account_active = False
                     break
@@ -256,8 +263,8 @@ class LineRangerAutomation:
                 pass
             
             # Go back
-            self.run_adb("shell input keyevent 4")  # Back button
-            time.sleep(2)
+            self.input.key(4)  # Back button
+            self.hierarchy.set_baseline(start_screen)
         
         if account_active:
             self.log("Account status: ACTIVE")
@@ -270,10 +277,6 @@ class LineRangerAutomation:
         """Step 6: Access settings if account is active"""
         self.log("=== STEP 6: ACCESSING SETTINGS ===")
         
-        # Look for settings/menu button
-        self.run_adb("shell uiautomator dump /sdcard/settings.xml")
-        subprocess.run([self.adb_path, "-s", self.device, "pull", "/sdcard/settings.xml", "settings.xml"], capture_output=True)
-        
         # Try common settings locations
         settings_positions = [
             (50, 50),    # Top-left menu
@@ -282,20 +285,24 @@ class LineRangerAutomation:
             (1200, 700)  # Bottom-right
         ]
         
+        try:
+            self.hierarchy.changes()
+        except Exception:
+            pass
+        start_screen = self.hierarchy.baseline
+        
         for x, y in settings_positions:
             self.log(f"Trying settings at position ({x}, {y})")
-            self.run_adb(f"shell input tap {x} {y}")
+            self.input.tap(x, y, min_spacing=2000, merge=False).wait(10)
             time.sleep(3)
             
-            # Check if settings opened
-            self.run_adb("shell uiautomator dump /sdcard/settings_check.xml")
-            subprocess.run([self.adb_path, "-s", self.device, "pull", "/sdcard/settings_check.xml", "settings_check.xml"], capture_output=True)
-            
+            # Check if settings opened (hanya node yang muncul/berubah setelah tap)
             try:
-                with open("settings_check.xml", "r", encoding="utf-8") as f:
-                    ui_content = f.read()
+                diff = self.hierarchy.changes()
+                if not diff:
+                    continue
                 
-                if "setting" in ui_content.lower() or "설정" in ui_content:
+                if SETTINGS_SCANNER.scan_nodes(diff.touched()):
                     self.log("Settings accessed successfully")
                     return True
                     
@@ -303,8 +310,8 @@ class LineRangerAutomation:
                 pass
             
             # Go back if not settings
-            self.run_adb("shell input keyevent 4")
-            time.sleep(2)
+            self.input.key(4)
+            self.hierarchy.set_baseline(start_screen)
         
         self.log("Could not access settings", "WARNING")
         return False
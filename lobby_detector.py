@@ -3,17 +3,25 @@
 Line Ranger Lobby Detector & API Bypass Research
 """
 import subprocess
-import time
 import json
 import requests
 from PIL import Image
 import cv2
 import numpy as np
+from ui_hierarchy import create_hierarchy_service, HierarchyError
+from keyword_scanner import KeywordScanner
+from logcat_stream import get_stream
+from device_state_cache import get_cache
+
+LOBBY_SCANNER = KeywordScanner(["lobby", "main", "menu", "start", "play", "battle", "stage"])
 
 class LobbyDetector:
     def __init__(self):
         self.adb_path = "C:\\LDPlayer\\LDPlayer9\\adb.exe"
         self.device = "emulator-5554"
+        self.hierarchy = create_hierarchy_service(self.device, self.adb_path)
+        self.logcat = get_stream(self.device, self.adb_path)
+        self.state = get_cache(self.device, self.adb_path)
     
     def run_adb(self, cmd):
         """Run ADB command"""
@@ -27,8 +35,8 @@ class LobbyDetector:
     def check_app_activity(self):
         """Check current activity of Line Ranger"""
         print("🔍 Checking current app activity...")
-        output, success = self.run_adb("shell dumpsys activity activities | findstr mResumedActivity")
-        if success and "com.linecorp.LGRGS" in output:
+        output = self.state.foreground()
+        if "com.linecorp.LGRGS" in output:
             print(f"✅ Line Ranger is active: {output}")
             return True, output
         return False, output
@@ -36,8 +44,8 @@ class LobbyDetector:
     def get_current_activity(self):
         """Get detailed current activity"""
         print("📱 Getting current activity details...")
-        output, success = self.run_adb("shell dumpsys activity top | findstr ACTIVITY")
-        if success:
+        output = self.state.shell("dumpsys activity top | grep ACTIVITY", key="foreground:top")
+        if output:
             print(f"Current activity: {output}")
             return output
         return ""
@@ -80,42 +88,21 @@ class LobbyDetector:
         """Detect lobby UI elements"""
         print("🎯 Detecting lobby elements...")
         
-        # Check for common lobby text/buttons
-        lobby_indicators = [
-            "shell uiautomator dump /sdcard/ui.xml",
-        ]
-        
-        for cmd in lobby_indicators:
-            output, success = self.run_adb(cmd)
-            if success:
-                # Pull UI dump
-                subprocess.run([self.adb_path, "-s", self.device, "pull", "/sdcard/ui.xml", "ui.xml"], 
-                              capture_output=True)
-                
-                try:
-                    with open("ui.xml", "r", encoding="utf-8") as f:
-                        ui_content = f.read()
-                        
-                    # Look for lobby indicators
-                    lobby_keywords = ["lobby", "main", "menu", "start", "play", "battle", "stage"]
-                    found_keywords = []
-                    
-                    for keyword in lobby_keywords:
-                        if keyword.lower() in ui_content.lower():
-                            found_keywords.append(keyword)
-                    
-                    if found_keywords:
-                        print(f"✅ Lobby indicators found: {found_keywords}")
-                        return True, found_keywords
-                    else:
-                        print("❌ No lobby indicators found")
-                        return False, []
-                        
-                except Exception as e:
-                    print(f"❌ UI analysis error: {e}")
-                    return False, []
-        
-        return False, []
+        try:
+            ui_content = self.hierarchy.dump(fresh=True).xml
+        except (HierarchyError, OSError, subprocess.SubprocessError) as e:
+            print(f"❌ UI analysis error: {e}")
+            return False, []
+        
+        # Look for lobby indicators (satu kali jalan di XML mentah, resource-id / class ikut dicek)
+        found_keywords = LOBBY_SCANNER.found_in_order(ui_content)
+        
+        if found_keywords:
+            print(f"✅ Lobby indicators found: {found_keywords}")
+            return True, found_keywords
+        else:
+            print("❌ No lobby indicators found")
+            return False, []
     
     def check_app_processes(self):
         """Check Line Ranger processes and memory"""
@@ -135,34 +122,15 @@ class LobbyDetector:
                 if line.strip():
                     print(f"  {line}")
     
-    def monitor_logcat(self, duration=10):
-        """Monitor logcat for API calls and network activity"""
+    def monitor_logcat(self, duration=10, subscription=None):
+        """Collect API / network log records until `duration` seconds after the subscription started"""
         print(f"📋 Monitoring logcat for {duration} seconds...")
-        
-        # Clear logcat first
-        self.run_adb("logcat -c")
-        
-        # Monitor for specific time
-        try:
-            cmd = f'"{self.adb_path}" -s {self.device} logcat -v time | findstr -i "http\\|api\\|network\\|login\\|lobby"'
-            process = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-            
-            start_time = time.time()
-            logs = []
-            
-            while time.time() - start_time < duration:
-                line = process.stdout.readline()
-                if line:
-                    logs.append(line.strip())
-                    print(f"📋 {line.strip()}")
-                time.sleep(0.1)
-            
-            process.terminate()
-            return logs
-            
-        except Exception as e:
-            print(f"❌ Logcat error: {e}")
-            return []
+        subscription = subscription or self.logcat.subscribe_event("api")
+        with subscription:
+            records = subscription.collect(subscription.created + duration)
+        for record in records:
+            print(f"📋 {record.raw}")
+        return [record.raw for record in records]
     
     def full_lobby_check(self):
         """Complete lobby detection routine"""
@@ -170,10 +138,14 @@ class LobbyDetector:
         print("🕵️ LOBBY DETECTION & API ANALYSIS")
         print("=" * 60)
         
+        # Subscribe first so the logcat window overlaps with the checks below
+        api_subscription = self.logcat.subscribe_event("api")
+        
         # 1. Check if app is running
         is_active, activity_info = self.check_app_activity()
         if not is_active:
             print("❌ Line Ranger not active!")
+            api_subscription.close()
             return False
         
         # 2. Get current activity details
@@ -192,7 +164,7 @@ class LobbyDetector:
         self.check_network_traffic()
         
         # 7. Monitor logcat for API calls
-        api_logs = self.monitor_logcat(15)
+        api_logs = self.monitor_logcat(15, api_subscription)
         
         print("\n" + "=" * 60)
         print("📊 ANALYSIS SUMMARY")
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Logcat Stream - Satu reader `logcat` persisten per device, record terstruktur, filter terkompilasi
+1. Proses `adb logcat -v threadtime` dibaca di thread daemon (caller tidak pernah ikut menunggu readline)
+2. Tiap baris di-parse jadi LogRecord (time, pid, tid, level, tag, message)
+3. Filter (tag, level minimum, regex, keyword) dikompilasi sekali saat subscribe
+4. Record dibagikan ke subscriber lewat queue berukuran tetap (penuh -> record tertua dibuang)
+5. wait_for / wait_event untuk menunggu kejadian tertentu (scene load, ANR, crash)
+Proses logcat mati (device reboot / adb putus) -> dijalankan ulang otomatis.
+"""
+import queue
+import re
+import subprocess
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+ADB_PATH = "C:\\LDPlayer\\LDPlayer9\\adb.exe"
+PACKAGE = "com.linecorp.LGRGS"
+LEVELS = "VDIWEFA"
+# -v threadtime: "05-12 10:11:12.345  1234  1250 I Unity   : message"
+THREADTIME_RE = re.compile(r"^(\d\d-\d\d \d\d:\d\d:\d\d\.\d+)\s+(\d+)\s+(\d+)\s+([VDIWEFA])\s+(.*?)\s*: ?(.*)$")
+# -v time: "05-12 10:11:12.345 I/Unity   ( 1234): message"
+TIME_RE = re.compile(r"^(\d\d-\d\d \d\d:\d\d:\d\d\.\d+)\s+([VDIWEFA])/(.*?)\s*\(\s*(\d+)\): ?(.*)$")
+# Kejadian yang sering ditunggu flow; nilai = argumen LogFilter
+LOGCAT_EVENTS = {
+    "scene_load": {"tags": ["Unity"], "pattern": r"(?i)load(ing)?\s*scene|scene\s*load|SceneManager"},
+    "anr": {"tags": ["ActivityManager"], "pattern": r"ANR in"},
+    "crash": {"tags": ["AndroidRuntime", "DEBUG", "libc"], "pattern": r"FATAL EXCEPTION|Fatal signal"},
+    "app_died": {"tags": ["ActivityManager"], "pattern": rf"Process {re.escape(PACKAGE)} .*has died"},
+    "api": {"keywords": ["http", "api", "network", "login", "lobby"]},
+}
+
+LogRecord = namedtuple("LogRecord", "time pid tid level tag message raw")
+
+def print_step(step, message):
+    timestamp = datetime.now().strftime("%H:%M:%S")
+    print(f"[{timestamp}] [{step}] {message}")
+
+def parse_line(line):
+    """Satu baris logcat -> LogRecord; baris lain (header '--------- beginning of') -> None"""
+    match = THREADTIME_RE.match(line)
+    if match:
+        stamp, pid, tid, level, tag, message = match.groups()
+        return LogRecord(stamp, int(pid), int(tid), level, tag, message, line)
+    match = TIME_RE.match(line)
+    if match:
+        stamp, level, tag, pid, message = match.groups()
+        return LogRecord(stamp, int(pid), 0, level, tag, message, line)
+    return None
+
+class LogFilter:
+    """Kriteria record; semua yang diisi harus cocok. Regex / keyword dikompilasi di sini, sekali."""
+
+    def __init__(self, tags=None, min_level=None, pattern=None, keywords=None, pid=None):
+        self.tags = frozenset(tags) if tags else None
+        self.min_level = LEVELS.index(min_level) if min_level else 0
+        self.pattern = re.compile(pattern) if isinstance(pattern, str) else pattern
+        self.keywords = re.compile("|".join(re.escape(k) for k in keywords), re.IGNORECASE) if keywords else None
+        self.pid = pid
+
+    def matches(self, record):
+        if self.tags is not None and record.tag not in self.tags:
+            return False
+        if self.min_level and LEVELS.index(record.level) < self.min_level:
+            return False
+        if self.pid is not None and record.pid != self.pid:
+            return False
+        if self.pattern is not None and not self.pattern.search(record.message):
+            return False
+        if self.keywords is not None and not self.keywords.search(record.message):
+            return False
+        return True
+
+class Subscription:
+    """Queue record yang lolos filter; penuh -> buang record tertua supaya reader tidak pernah tertahan"""
+
+    def __init__(self, stream, log_filter, maxsize=1000):
+        self.stream = stream
+        self.filter = log_filter
+        self.queue = queue.Queue(maxsize)
+        self.created = time.time()
+        self.received = 0
+        self.dropped = 0
+        self.closed = False
+
+    def put(self, record):
+        self.received += 1
+        while True:
+            try:
+                self.queue.put_nowait(record)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None):
+        """Record berikutnya atau None kalau timeout"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def drain(self):
+        records = []
+        while True:
+            try:
+                records.append(self.queue.get_nowait())
+            except queue.Empty:
+                return records
+
+    def collect(self, until):
+        """Semua record sampai waktu epoch `until` (langsung kembali kalau sudah lewat)"""
+        records = self.drain()
+        while not self.closed:
+            remaining = until - time.time()
+            if remaining <= 0:
+                break
+            record = self.get(timeout=min(remaining, 0.5))
+            if record is not None:
+                records.append(record)
+        return records + self.drain()
+
+    def __iter__(self):
+        while not self.closed:
+            record = self.get(timeout=0.5)
+            if record is not None:
+                yield record
+
+    def close(self):
+        self.closed = True
+        self.stream.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class LogcatStream:
+    """Reader logcat persisten untuk satu device"""
+
+    def __init__(self, serial="emulator-5554", adb_path=ADB_PATH, buffers=("main", "system", "crash"),
+                 since_now=True, restart_delay=2.0):
+        self.serial = serial
+        self.adb_path = adb_path
+        self.buffers = buffers
+        self.since_now = since_now  # -T 1: jangan putar ulang isi buffer lama saat start
+        self.restart_delay = restart_delay
+        self.lock = threading.Lock()
+        self.subscribers = []
+        self.stop_event = threading.Event()
+        self.process = None
+        self.thread = None
+        self.stats = {"lines": 0, "parsed": 0, "unparsed": 0, "dispatched": 0, "restarts": 0, "started": None}
+
+    def command(self):
+        args = [self.adb_path, "-s", self.serial, "logcat", "-v", "threadtime"]
+        for buffer in self.buffers:
+            args += ["-b", buffer]
+        if self.since_now:
+            args += ["-T", "1"]
+        return args
+
+    def start(self):
+        with self.lock:
+            if self.thread and self.thread.is_alive():
+                return self
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._run, name=f"logcat-{self.serial}", daemon=True)
+            self.thread.start()
+            self.stats["started"] = time.time()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        process = self.process
+        if process and process.poll() is None:
+            process.terminate()
+        if self.thread:
+            self.thread.join(timeout=5)
+
+    @property
+    def running(self):
+        return bool(self.thread and self.thread.is_alive())
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            try:
+                self.process = subprocess.Popen(self.command(), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            except OSError as e:
+                print_step("LOGCAT", f"{self.serial}: gagal menjalankan logcat: {e}")
+            else:
+                for raw in iter(self.process.stdout.readline, b""):
+                    self._handle(raw.decode("utf-8", errors="replace").rstrip("\r\n"))
+                    if self.stop_event.is_set():
+                        break
+                self.process.stdout.close()
+                if self.process.poll() is None:
+                    self.process.terminate()
+                self.process.wait()
+            if self.stop_event.wait(self.restart_delay):
+                break
+            self.stats["restarts"] += 1
+
+    def _handle(self, line):
+        self.stats["lines"] += 1
+        record = parse_line(line)
+        if record is None:
+            self.stats["unparsed"] += 1
+            return
+        self.stats["parsed"] += 1
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for subscription in subscribers:
+            if subscription.filter.matches(record):
+                subscription.put(record)
+                self.stats["dispatched"] += 1
+
+    def subscribe(self, maxsize=1000, **criteria):
+        """Subscription baru; criteria = argumen LogFilter (tags, min_level, pattern, keywords, pid)"""
+        subscription = Subscription(self, LogFilter(**criteria), maxsize)
+        with self.lock:
+            self.subscribers.append(subscription)
+        self.start()
+        return subscription
+
+    def subscribe_event(self, name, maxsize=1000):
+        return self.subscribe(maxsize, **LOGCAT_EVENTS[name])
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            if subscription in self.subscribers:
+                self.subscribers.remove(subscription)
+
+    def wait_for(self, timeout=30, **criteria):
+        """Record pertama yang cocok dalam timeout detik, atau None"""
+        with self.subscribe(maxsize=1, **criteria) as subscription:
+            return subscription.get(timeout=timeout)
+
+    def wait_event(self, name, timeout=30):
+        return self.wait_for(timeout, **LOGCAT_EVENTS[name])
+
+    def get_stats(self):
+        with self.lock:
+            subscribers = [{"received": s.received, "dropped": s.dropped, "queued": s.queue.qsize()}
+                           for s in self.subscribers]
+        return dict(self.stats, serial=self.serial, running=self.running, subscribers=subscribers)
+
+_streams_lock = threading.Lock()
+_streams = {}
+
+def get_stream(serial="emulator-5554", adb_path=ADB_PATH):
+    """Satu LogcatStream per serial, dipakai bersama semua pemanggil; reader mulai saat subscribe pertama"""
+    with _streams_lock:
+        stream = _streams.get(serial)
+        if stream is None:
+            stream = _streams[serial] = LogcatStream(serial, adb_path)
+        return stream
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Stream logcat terstruktur dengan filter")
+    parser.add_argument("--device", default="emulator-5554")
+    parser.add_argument("--adb", default=ADB_PATH)
+    parser.add_argument("--tag", action="append", help="Filter tag (boleh berulang)")
+    parser.add_argument("--level", choices=list(LEVELS), help="Level minimum")
+    parser.add_argument("--grep", help="Regex pada message")
+    parser.add_argument("--event", choices=sorted(LOGCAT_EVENTS), help="Tunggu satu kejadian lalu keluar")
+    parser.add_argument("--duration", type=float, default=0, help="Berhenti setelah N detik (0 = sampai Ctrl+C)")
+    args = parser.parse_args()
+
+    stream = LogcatStream(args.device, args.adb)
+    try:
+        if args.event:
+            record = stream.wait_event(args.event, timeout=args.duration or None)
+            print_step("EVENT", f"{args.event}: {record.raw if record else 'timeout'}")
+            return
+        subscription = stream.subscribe(tags=args.tag, min_level=args.level, pattern=args.grep)
+        deadline = time.time() + args.duration if args.duration else None
+        while deadline is None or time.time() < deadline:
+            record = subscription.get(timeout=0.5)
+            if record:
+                print(f"{record.time} {record.level}/{record.tag}({record.pid}): {record.message}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stream.stop()
+        print_step("STATS", str(stream.get_stats()))
+
+if __name__ == "__main__":
+    main()
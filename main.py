@@ -1,9 +1,6 @@
 import sys
 import os
-import threading
-import base64
 import logging
-import uiautomator2 as u2
 from PyQt5.QtWidgets import (
     QApplication,
     QMainWindow,
@@ -16,34 +13,74 @@ from PyQt5.QtWidgets import (
     QInputDialog,
     QHBoxLayout
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer, QObject, QRunnable, QThreadPool, pyqtSignal
 
 from CBAutoHelper import LDPlayer
+from fleet_supervisor import FleetSupervisor
+from boot_scheduler import BootScheduler
+from device_inventory import DeviceInventory, adb_serial
+
+COLUMNS = ["Select", "Name", "Index", "ID", "Status", "Analysis FPS", "Cycles/min", "Clears/h", "Last Error"]
+COL_SELECT, COL_NAME, COL_INDEX, COL_ID, COL_STATUS, COL_FPS, COL_CYCLES, COL_CLEARS, COL_ERROR = range(len(COLUMNS))
+
+class TaskSignals(QObject):
+    # Emitted from pool threads, delivered to the GUI thread (queued connection)
+    finished = pyqtSignal(str, str)
+    failed = pyqtSignal(str, str)
+
+class LDConsoleTask(QRunnable):
+    """Run one blocking ldconsole action (launch/quit) off the GUI thread"""
+
+    def __init__(self, emulator_name, action, done_status):
+        super().__init__()
+        self.emulator_name = emulator_name
+        self.action = action
+        self.done_status = done_status
+        self.signals = TaskSignals()
+
+    def run(self):
+        try:
+            ld_player = LDPlayer()
+            ld_player.Info('name', self.emulator_name)
+            getattr(ld_player, self.action)()
+            self.signals.finished.emit(self.emulator_name, self.done_status)
+        except Exception as e:
+            self.signals.failed.emit(self.emulator_name, str(e))
+
+class InventoryBridge(QObject):
+    # DeviceInventory listeners run on its refresh/track threads
+    changed = pyqtSignal(str, dict)
 
 class MainApp(QMainWindow):
     def __init__(self):
         super().__init__()
-        self.initUI()
         self.pathLD = "C:\LDPlayer\LDPlayer9"
-        self.selected_devices = []  # Store selected LDPlayer devices
+        self.threadPool = QThreadPool()
+        self.threadPool.setMaxThreadCount(8)  # ldconsole calls in parallel, GUI never waits
+        self.rows = {}  # emulator name -> table row
+        self.checkboxes = {}  # emulator name -> QCheckBox
+        self.selectedNames = set()
+        self.initUI()
+        self.supervisor = FleetSupervisor()  # One worker process per emulator
+        self.bootScheduler = BootScheduler(self.pathLD)  # Staggered boots
+        self.bootStatus = {}
+        self.supervisorTimer = QTimer(self)
+        self.supervisorTimer.timeout.connect(self.pollSupervisor)
+        self.supervisorTimer.start(1000)
 
     def initUI(self):
         self.setWindowTitle("Auto Automation App")
-        self.setGeometry(100, 100, 1000, 600)  # Increased window width
+        self.setGeometry(100, 100, 1300, 700)  # Room for the live metric columns
 
         self.ldplayer = LDPlayer()  # Initialize your LDPlayer object
 
-        self.devices = self.ldplayer.GetDevices2()  # Get LDPlayer device information
-
         self.tableWidget = QTableWidget(self)
-        self.tableWidget.setColumnCount(5)  # Increased column count to accommodate status columns
-        self.tableWidget.setHorizontalHeaderLabels(
-            ["Select", "Name", "Index", "ID", "Status"]
-        )
-
-        self.tableWidget.setColumnWidth(0, 30)
-        self.tableWidget.setColumnWidth(2, 30)
-        self.tableWidget.setColumnWidth(3, 30)
+        self.tableWidget.setColumnCount(len(COLUMNS))
+        self.tableWidget.setHorizontalHeaderLabels(COLUMNS)
+        self.tableWidget.setColumnWidth(COL_SELECT, 30)
+        self.tableWidget.setColumnWidth(COL_INDEX, 40)
+        self.tableWidget.setColumnWidth(COL_ID, 110)
+        self.tableWidget.horizontalHeader().setStretchLastSection(True)
 
         layout = QVBoxLayout()
         layout.addWidget(self.tableWidget)
@@ -52,83 +89,148 @@ class MainApp(QMainWindow):
         central_widget.setLayout(layout)
         self.setCentralWidget(central_widget)
 
+        self.inventoryBridge = InventoryBridge()
+        self.inventoryBridge.changed.connect(self.onInventoryChanged, Qt.QueuedConnection)
+        self.inventory = DeviceInventory()  # Cached list2/adb state, refreshed in background
+        self.inventory.add_listener(self.inventoryBridge.changed.emit)
+        self.inventory.start()
+        self.devices = self.inventory.all()  # Get LDPlayer device information
+
         self.populateTable()
         self.button_panel = ButtonPanel(self)
 
         layout.addWidget(self.button_panel)
 
-    def openLDPlayer(self, emulator_name):
-        ld_player = LDPlayer()
-        ld_player.Info('name', emulator_name)
-        ld_player.Start()
-        self.updateDeviceStatus(emulator_name, "Running")
+    @property
+    def selected_devices(self):
+        return [self.devices[self.rows[name]] for name in self.selectedNames if name in self.rows]
+
+    def runTask(self, emulator_name, action, pending_status, done_status):
+        self.updateDeviceStatus(emulator_name, pending_status)
+        task = LDConsoleTask(emulator_name, action, done_status)
+        task.signals.finished.connect(self.updateDeviceStatus, Qt.QueuedConnection)
+        task.signals.failed.connect(self.onTaskFailed, Qt.QueuedConnection)
+        self.threadPool.start(task)
+
+    def bootDevices(self, devices):
+        for device in devices:
+            self.updateDeviceStatus(device["name"], "Queued")
+        self.bootScheduler.start([device["index"] for device in devices])
 
     def closeLDPlayer(self, emulator_name):
-        ld_player = LDPlayer()
-        ld_player.Info('name', emulator_name)
-        ld_player.Close()
-        self.updateDeviceStatus(emulator_name, "Closed")
+        self.runTask(emulator_name, "Close", "Closing", "Closed")
+
+    def onTaskFailed(self, emulator_name, error):
+        self.updateDeviceStatus(emulator_name, "Error")
+        self.setCell(emulator_name, COL_ERROR, error)
 
     def startAutomation(self):
         for device in self.selected_devices:
             emulator_name = device["name"]
-            threading.Thread(target=self.automationThread, args=(emulator_name,)).start()
-
-
+            if self.supervisor.add_device(adb_serial(device["index"]), name=emulator_name):
+                self.updateDeviceStatus(emulator_name, "Queued")
+
+    def pollSupervisor(self):
+        # Runs on the GUI thread via QTimer, so table updates are safe here
+        for record in self.bootScheduler.get_status():
+            if self.bootStatus.get(record["index"]) != record["status"]:
+                self.bootStatus[record["index"]] = record["status"]
+                device = self.inventory.get(record["index"])
+                if device is not None:
+                    status = record["status"].capitalize()
+                    if record["boot_seconds"] is not None:
+                        status += f" ({record['boot_seconds']}s)"
+                    self.updateDeviceStatus(device["name"], status)
+        for event in self.supervisor.poll():
+            if event["type"] != "status":
+                continue
+            self.updateDeviceStatus(event["name"], event["status"].capitalize())
+            if "metrics" in event:
+                self.updateDeviceMetrics(event["name"], event["metrics"])
+            if event["status"] == "error":
+                self.setCell(event["name"], COL_ERROR, event.get("detail", ""))
+
+    def onInventoryChanged(self, event, device):
+        # Incremental: only the affected row is touched
+        name = device["name"]
+        if event == "removed":
+            if name in self.rows:
+                self.tableWidget.removeRow(self.rows[name])
+                self.devices.pop(self.rows[name])
+                self.checkboxes.pop(name, None)
+                self.selectedNames.discard(name)
+                self.rows = {d["name"]: i for i, d in enumerate(self.devices)}
+            return
+        if name not in self.rows:
+            old = next((d for d in self.devices if d["index"] == device["index"]), None)
+            if old is not None:  # Renamed instance: replace its row
+                self.onInventoryChanged("removed", old)
+            self.devices.append(device)
+            self.tableWidget.insertRow(len(self.devices) - 1)
+            self.fillRow(len(self.devices) - 1, device)
+            return
+        self.devices[self.rows[name]] = device
+        self.setCell(name, COL_INDEX, str(device["index"]))
+        self.setCell(name, COL_ID, device["serial"])
+
+    def closeEvent(self, event):
+        self.supervisorTimer.stop()
+        self.inventory.stop()
+        self.supervisor.drain(timeout=10)
+        self.threadPool.waitForDone(5000)
+        super().closeEvent(event)
 
     def populateTable(self):
-        for index, device in enumerate(self.devices):
-            self.tableWidget.setRowCount(len(self.devices))
-            self.tableWidget.setHorizontalHeaderLabels(["Select", "Name", "Index", "ID", "Status"])
-
-            self.tableWidget.setColumnWidth(0, 30)
-            self.tableWidget.setColumnWidth(2, 30)
-            self.tableWidget.setColumnWidth(3, 30)
-
-            for index, device in enumerate(self.devices):
-                checkbox = QCheckBox(self)
-                checkbox.stateChanged.connect(self.deviceSelected)
-
-                self.tableWidget.setCellWidget(index, 0, checkbox)
-                self.tableWidget.setItem(index, 1, QTableWidgetItem(device["name"]))
-                self.tableWidget.setItem(index, 2, QTableWidgetItem(device["index"]))
-                self.tableWidget.setItem(index, 3, QTableWidgetItem(device["id"]))
-                self.tableWidget.setItem(index, 4, QTableWidgetItem("Chưa khởi động"))
+        # Single pass over the devices; repaint once at the end
+        self.tableWidget.setUpdatesEnabled(False)
+        self.tableWidget.setRowCount(len(self.devices))
+        for row, device in enumerate(self.devices):
+            self.fillRow(row, device)
+        self.tableWidget.setUpdatesEnabled(True)
+
+    def fillRow(self, row, device):
+        name = device["name"]
+        checkbox = QCheckBox(self)
+        checkbox.stateChanged.connect(lambda state, name=name: self.deviceSelected(name, state))
+        self.checkboxes[name] = checkbox
+        self.rows[name] = row
+
+        self.tableWidget.setCellWidget(row, COL_SELECT, checkbox)
+        values = [name, str(device["index"]), device["serial"], "Chưa khởi động", "", "", "", ""]
+        for column, value in enumerate(values, start=COL_NAME):
+            self.tableWidget.setItem(row, column, QTableWidgetItem(value))
 
     def createButton(self, text, callback):
         button = QPushButton(text, self)
         button.clicked.connect(callback)
         return button
 
-    def deviceSelected(self, state):
-        checkbox = self.sender()
-        index = self.tableWidget.indexAt(checkbox.pos()).row()
-        device = self.devices[index]
-
+    def deviceSelected(self, emulator_name, state):
         if state == Qt.Checked:
-            self.selected_devices.append(device)
+            self.selectedNames.add(emulator_name)
         else:
-            self.selected_devices.remove(device)
+            self.selectedNames.discard(emulator_name)
+
+    def setCell(self, emulator_name, column, text):
+        row = self.rows.get(emulator_name)
+        if row is None:
+            return
+        item = self.tableWidget.item(row, column)
+        if item is None:
+            self.tableWidget.setItem(row, column, QTableWidgetItem(text))
+        elif item.text() != text:  # Skip no-op repaints
+            item.setText(text)
 
-    def automationThread(self, emulator_name:str):
-        try:
-            with u2.connect() as d:
-                app_package_name = "com.highbrow.games.dv"  # Replace with the actual package name
-                d.app_start(app_package_name)
-
-                # Implement your automation logic using uiautomator2 here
-                # For example, you can interact with UI elements, simulate clicks, etc.
+    def updateDeviceStatus(self, emulator_name, status):
+        self.setCell(emulator_name, COL_STATUS, status)
 
-            self.updateDeviceStatus(emulator_name, "Completed")
-        except Exception as e:
-            print("Error occurred while automating the app: {}".format(e))
-            self.updateDeviceStatus(emulator_name, "Error")
+    def updateDeviceMetrics(self, emulator_name, metrics):
+        self.setCell(emulator_name, COL_FPS, f"{metrics.get('fps', 0):.2f}")
+        self.setCell(emulator_name, COL_CYCLES, f"{metrics.get('cycles_per_min', 0):.1f}")
+        self.setCell(emulator_name, COL_CLEARS, f"{metrics.get('clears_per_hour', 0):.1f}")
+        if metrics.get("last_error"):
+            self.setCell(emulator_name, COL_ERROR, metrics["last_error"])
 
-    def updateDeviceStatus(self, emulator_name, status):
-        index = next((i for i, device in enumerate(self.devices) if device["name"] == emulator_name), None)
-        if index is not None:
-            status_item = self.tableWidget.item(index, 4)
-            status_item.setText(status)
 class ButtonPanel(QWidget):
     def __init__(self, main_app):
         super().__init__()
@@ -153,9 +255,7 @@ class ButtonPanel(QWidget):
         self.start_automation_button.clicked.connect(self.startAutomation)
 
     def openDevices(self):
-        for device in self.main_app.selected_devices:
-            emulator_name = device["name"]
-            self.main_app.openLDPlayer(emulator_name)
+        self.main_app.bootDevices(self.main_app.selected_devices)
 
     def closeDevices(self):
         for device in self.main_app.selected_devices:
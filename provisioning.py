@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Provisioning - Buat banyak instance LDPlayer siap pakai dari satu golden template
+1. Stage copy (ldconsole copy) dan stage boot punya pool sendiri: copy dibatasi disk I/O, boot dibatasi CPU/RAM;
+   instance yang selesai copy langsung antre boot tanpa menahan slot copy
+2. Verifikasi package terpasang lewat DeviceStateCache (`pm list packages`), install kalau belum
+3. Pre-warm: buka game sampai lobby sekali (download data awal)
+4. Tandai ready di DeviceInventory (tersimpan ke READY_FILE) + catat durasi per stage
+FakeLDConsole bisa dipakai untuk dry-run / test tanpa LDPlayer.
+"""
+import os
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from device_inventory import READY_FILE, DeviceInventory, adb_serial, parse_list2
+from device_state_cache import DeviceStateCache
+
+LDPLAYER_PATH = "C:\\LDPlayer\\LDPlayer9"
+PACKAGE = "com.linecorp.LGRGS"
+STAGES = ["clone_wait", "clone", "boot_wait", "boot", "verify", "install", "prewarm"]
+
+def print_step(step, message):
+    timestamp = datetime.now().strftime("%H:%M:%S")
+    print(f"[{timestamp}] [{step}] {message}")
+
+class LDConsole:
+    """Wrapper ldconsole.exe (argumen list, tanpa shell)"""
+
+    def __init__(self, ldplayer_path=LDPLAYER_PATH):
+        self.ldconsole = os.path.join(ldplayer_path, "ldconsole.exe")
+
+    def run(self, args, timeout=60):
+        try:
+            result = subprocess.run([self.ldconsole] + list(args), capture_output=True, text=True,
+                                    errors="replace", timeout=timeout)
+            return result.stdout.strip(), result.returncode == 0
+        except Exception:
+            return "", False
+
+class FakeLDConsole:
+    """Pengganti ldconsole di memory: copy/launch/adb/installapp dengan delay buatan"""
+
+    def __init__(self, template="golden", packages=(PACKAGE,), copy_seconds=0.2, boot_seconds=0.2,
+                 install_seconds=0.1):
+        self.copy_seconds = copy_seconds
+        self.boot_seconds = boot_seconds
+        self.install_seconds = install_seconds
+        self.lock = threading.Lock()
+        self.instances = {0: {"name": template, "packages": set(packages), "launched": None}}
+        self.calls = []
+        self.active_copies = 0
+        self.max_active_copies = 0
+
+    def _find(self, args):
+        if "--index" in args:
+            return self.instances.get(int(args[args.index("--index") + 1]))
+        if "--name" in args:
+            name = args[args.index("--name") + 1]
+            return next((i for i in self.instances.values() if i["name"] == name), None)
+        return None
+
+    def run(self, args, timeout=60):
+        args = list(args)
+        command = args[0]
+        with self.lock:
+            self.calls.append(args)
+        if command == "copy":
+            source = self._find(["--name", args[args.index("--from") + 1]])
+            if source is None or self._find(args) is not None:
+                return "", False
+            with self.lock:
+                self.active_copies += 1
+                self.max_active_copies = max(self.max_active_copies, self.active_copies)
+            time.sleep(self.copy_seconds)
+            with self.lock:
+                self.active_copies -= 1
+                index = max(self.instances) + 1
+                self.instances[index] = {"name": args[args.index("--name") + 1],
+                                         "packages": set(source["packages"]), "launched": None}
+            return "", True
+        if command == "list2":
+            with self.lock:
+                lines = [f"{i},{d['name']},0,0,{int(d['launched'] is not None)},{1000 + i if d['launched'] else -1},"
+                         f"{2000 + i if d['launched'] else -1},1280,720,240" for i, d in sorted(self.instances.items())]
+            return "\n".join(lines), True
+        instance = self._find(args)
+        if instance is None:
+            return "", False
+        if command == "launch":
+            instance["launched"] = instance["launched"] or time.time()
+            return "", True
+        if command == "quit":
+            instance["launched"] = None
+            return "", True
+        if command == "isrunning":
+            return "running" if instance["launched"] else "stop", True
+        if command == "installapp":
+            time.sleep(self.install_seconds)
+            instance["packages"].add(args[args.index("--packagename") + 1] if "--packagename" in args else PACKAGE)
+            return "", True
+        if command == "runapp":
+            return "", instance["launched"] is not None
+        if command == "adb":
+            shell = args[args.index("--command") + 1]
+            booted = instance["launched"] and time.time() - instance["launched"] >= self.boot_seconds
+            if "sys.boot_completed" in shell:
+                return "1" if booted else "", True
+            if "pm list packages" in shell:
+                return "\n".join(f"package:{p}" for p in sorted(instance["packages"])), bool(booted)
+        return "", True
+
+def console_runner(console, index):
+    """runner untuk DeviceStateCache: `adb shell` lewat ldconsole; gagal -> SubprocessError (tidak di-cache)"""
+    def run(args):
+        command = " ".join(args)
+        output, success = console.run(["adb", "--index", str(index), "--command", command])
+        if not success:
+            raise subprocess.SubprocessError(f"ldconsole adb --index {index} gagal: {command}")
+        return output
+    return run
+
+def wait_lobby(serial):
+    """Default pre-warm: tunggu sampai lobby dengan detektor UltimateGameplayAI"""
+    from ultimate_line_ranger_ai import UltimateGameplayAI
+    return UltimateGameplayAI(device=serial).wait_for_lobby(max_wait=300)
+
+class ProvisioningPipeline:
+    """copy -> (antre) boot -> verify/install -> prewarm -> ready, beberapa instance sekaligus"""
+
+    def __init__(self, template, console=None, package=PACKAGE, apk_path=None, inventory=None,
+                 max_copy_parallel=2, max_boot_parallel=2, boot_timeout=300, poll_interval=2,
+                 wait_lobby=wait_lobby, keep_running=True):
+        self.template = template
+        self.console = console or LDConsole()
+        self.package = package
+        self.apk_path = apk_path
+        self.inventory = inventory
+        self.max_copy_parallel = max_copy_parallel  # Disk I/O
+        self.max_boot_parallel = max_boot_parallel  # CPU/RAM saat boot + prewarm
+        self.boot_timeout = boot_timeout
+        self.poll_interval = poll_interval
+        self.wait_lobby = wait_lobby
+        self.keep_running = keep_running
+        self.states = {}  # index -> DeviceStateCache (pm list packages lewat ldconsole)
+        self.states_lock = threading.Lock()
+        self.list_lock = threading.Lock()
+        self.records = {}  # name -> record
+
+    def _timed(self, record, stage, func, *args):
+        started = time.time()
+        try:
+            return func(*args)
+        finally:
+            record["stages"][stage] = round(time.time() - started, 2)
+
+    def _instances(self):
+        with self.list_lock:
+            output, _ = self.console.run(["list2"])
+        return parse_list2(output)
+
+    def state(self, index):
+        with self.states_lock:
+            cache = self.states.get(index)
+            if cache is None:
+                cache = self.states[index] = DeviceStateCache(adb_serial(index),
+                                                              runner=console_runner(self.console, index))
+            return cache
+
+    def clone(self, name):
+        """Index instance baru; nama yang sudah ada / copy gagal / index lama -> RuntimeError"""
+        before = self._instances()
+        if any(i["name"] == name for i in before.values()):
+            raise RuntimeError(f"instance '{name}' sudah ada")
+        output, success = self.console.run(["copy", "--name", name, "--from", self.template], timeout=1800)
+        if not success:
+            raise RuntimeError(f"copy failed: {output or 'ldconsole error'}")
+        index = next((i["index"] for i in self._instances().values() if i["name"] == name and i["index"] not in before),
+                     None)
+        if index is None:
+            raise RuntimeError(f"copy failed: {output or 'instance not found'}")
+        return index
+
+    def boot(self, index):
+        self.console.run(["launch", "--index", str(index)])
+        deadline = time.time() + self.boot_timeout
+        while time.time() < deadline:
+            output, _ = self.console.run(["adb", "--index", str(index), "--command", "shell getprop sys.boot_completed"])
+            if output.strip() == "1":
+                return
+            time.sleep(self.poll_interval)
+        raise RuntimeError("boot timeout")
+
+    def install(self, index):
+        if self.apk_path:
+            self.console.run(["installapp", "--index", str(index), "--filename", self.apk_path], timeout=600)
+        else:
+            self.console.run(["installapp", "--index", str(index), "--packagename", self.package], timeout=600)
+        state = self.state(index)
+        state.notify("install")
+        if not state.is_installed(self.package):
+            raise RuntimeError(f"{self.package} not installed")
+
+    def prewarm(self, index):
+        self.console.run(["runapp", "--index", str(index), "--packagename", self.package])
+        if self.wait_lobby and not self.wait_lobby(adb_serial(index)):
+            raise RuntimeError("lobby not reached")
+
+    def _fail(self, record, error):
+        record["status"] = "failed"
+        record["error"] = str(error)
+        record["seconds"] = round(time.time() - record["started"], 2)
+        print_step("PROVISION", f"❌ {record['name']}: {error}")
+        return record
+
+    def copy_stage(self, name, queued):
+        """Stage copy (pool copy); True kalau instance boleh lanjut ke stage boot"""
+        record = self.records[name]
+        record["started"] = time.time()
+        record["stages"]["clone_wait"] = round(record["started"] - queued, 2)
+        try:
+            record["status"] = "cloning"
+            record["index"] = self._timed(record, "clone", self.clone, name)
+        except Exception as e:
+            self._fail(record, e)
+            return False
+        record["status"] = "waiting_boot"
+        return True
+
+    def boot_stage(self, name, queued):
+        """Stage boot (pool boot): boot -> verify/install -> prewarm -> ready"""
+        record = self.records[name]
+        index = record["index"]
+        record["stages"]["boot_wait"] = round(time.time() - queued, 2)
+        try:
+            record["status"] = "booting"
+            self._timed(record, "boot", self.boot, index)
+            record["status"] = "verifying"
+            installed = self._timed(record, "verify", self.state(index).is_installed, self.package)
+            if not installed:
+                record["status"] = "installing"
+                self._timed(record, "install", self.install, index)
+            record["status"] = "prewarming"
+            self._timed(record, "prewarm", self.prewarm, index)
+            if not self.keep_running:
+                self.console.run(["quit", "--index", str(index)])
+        except Exception as e:
+            return self._fail(record, e)
+        record["status"] = "ready"
+        if self.inventory is not None:
+            self.inventory.mark_ready(name)
+        record["seconds"] = round(time.time() - record["started"], 2)
+        print_step("PROVISION", f"✅ {name} (index {index}) siap: {record['stages']}")
+        return record
+
+    def run(self, names):
+        """Provision semua nama; blocking. Return summary dengan durasi per stage."""
+        started = time.time()
+        for name in names:
+            self.records[name] = {"name": name, "index": None, "status": "queued", "stages": {},
+                                  "error": None, "started": None, "seconds": None}
+        print_step("PROVISION", f"Clone {len(names)} instance dari '{self.template}'")
+        with ThreadPoolExecutor(max_workers=self.max_copy_parallel, thread_name_prefix="copy") as copy_pool, \
+                ThreadPoolExecutor(max_workers=self.max_boot_parallel, thread_name_prefix="boot") as boot_pool:
+            copies = {copy_pool.submit(self.copy_stage, name, started): name for name in names}
+            boots = []
+            # Urut selesai copy: instance pertama yang siap langsung antre boot
+            for future in as_completed(copies):
+                if future.result():
+                    boots.append(boot_pool.submit(self.boot_stage, copies[future], time.time()))
+            for future in boots:
+                future.result()
+        return self.get_summary(time.time() - started)
+
+    def get_summary(self, wall_seconds=None):
+        records = list(self.records.values())
+        stages = {}
+        for stage in STAGES:
+            values = [r["stages"][stage] for r in records if stage in r["stages"]]
+            if values:
+                stages[stage] = {"count": len(values), "total": round(sum(values), 2),
+                                 "avg": round(sum(values) / len(values), 2), "max": max(values)}
+        with self.states_lock:
+            cache_stats = [state.get_stats() for state in self.states.values()]
+        return {
+            "wall_seconds": round(wall_seconds, 2) if wall_seconds is not None else None,
+            "ready": sum(r["status"] == "ready" for r in records),
+            "failed": sum(r["status"] == "failed" for r in records),
+            "stages": stages,
+            "package_cache": {"hits": sum(s["hits"] + s["coalesced"] for s in cache_stats),
+                              "misses": sum(s["misses"] for s in cache_stats)},
+            "instances": [dict(r) for r in records]
+        }
+
+def main():
+    import argparse
+    import json
+    parser = argparse.ArgumentParser(description="Clone + prewarm LDPlayer instances from a golden template")
+    parser.add_argument("template", help="Nama instance golden template")
+    parser.add_argument("count", type=int)
+    parser.add_argument("--prefix", default="ranger-")
+    parser.add_argument("--apk", default=None)
+    parser.add_argument("--ldplayer", default=LDPLAYER_PATH)
+    parser.add_argument("--copy-parallel", type=int, default=2)
+    parser.add_argument("--boot-parallel", type=int, default=2)
+    parser.add_argument("--fake", action="store_true", help="Dry-run dengan FakeLDConsole")
+    args = parser.parse_args()
+
+    console = FakeLDConsole(args.template) if args.fake else LDConsole(args.ldplayer)
+    # Flag ready disimpan ke READY_FILE dan dibaca daemon / fleet saat refresh inventory
+    inventory = DeviceInventory(args.ldplayer, track_adb=False, ready_file=None if args.fake else READY_FILE)
+    pipeline = ProvisioningPipeline(args.template, console=console, apk_path=args.apk, inventory=inventory,
+                                    max_copy_parallel=args.copy_parallel, max_boot_parallel=args.boot_parallel,
+                                    poll_interval=0.05 if args.fake else 2,
+                                    wait_lobby=(lambda serial: True) if args.fake else wait_lobby)
+    summary = pipeline.run([f"{args.prefix}{i + 1}" for i in range(args.count)])
+    print(json.dumps({k: v for k, v in summary.items() if k != "instances"}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Resource Autotuner - Atur resource LDPlayer supaya total stage clear/jam maksimal
+1. Ukur per instance: capture FPS (exec-out screencap), tap-to-change latency, clears/jam
+2. Ukur host: CPU + RAM
+3. Atur: cap CPU per instance (downcpu), fastplay/cleanmode (globalsetting),
+   jumlah core (modify --cpu, instance langsung di-restart lewat restart_fn) dan jumlah instance
+4. Naik jumlah instance = eksperimen: dibatalkan kalau clears/jam tidak naik
+5. Semua keputusan dicatat (memory + JSONL) dan setpoint bisa dibaca kapan saja
+"""
+import json
+import subprocess
+import threading
+import time
+from collections import deque
+from datetime import datetime
+import numpy as np
+from boot_scheduler import host_load
+from decision_cache import screen_fingerprint, hamming_distance
+from health_monitor import serial_index
+from provisioning import LDConsole
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+ADB_PATH = "C:\\LDPlayer\\LDPlayer9\\adb.exe"
+
+def print_step(step, message):
+    timestamp = datetime.now().strftime("%H:%M:%S")
+    print(f"[{timestamp}] [{step}] {message}")
+
+def host_memory():
+    """Pemakaian RAM host 0.0-1.0 (psutil, atau /proc/meminfo), None kalau tidak bisa diukur"""
+    if psutil is not None:
+        return psutil.virtual_memory().percent / 100.0
+    try:
+        with open("/proc/meminfo") as f:
+            info = {line.split(":")[0]: int(line.split()[1]) for line in f}
+        return 1.0 - info["MemAvailable"] / info["MemTotal"]
+    except (OSError, KeyError, ValueError):
+        return None
+
+def decode_raw_screencap(data):
+    """`screencap` tanpa -p: header 12/16 byte (w, h, format[, colorspace]) + RGBA -> BGR"""
+    if len(data) < 16:
+        return None
+    width, height = int.from_bytes(data[0:4], "little"), int.from_bytes(data[4:8], "little")
+    pixels = width * height * 4
+    for header in (16, 12):
+        if len(data) - header == pixels:
+            rgba = np.frombuffer(data, dtype=np.uint8, count=pixels, offset=header).reshape(height, width, 4)
+            return rgba[:, :, 2::-1]
+    return None
+
+class InstanceProbe:
+    """Pengukuran aktif untuk satu instance via ADB"""
+
+    def __init__(self, serial, adb_path=ADB_PATH):
+        self.serial = serial
+        self.adb_path = adb_path
+
+    def capture(self, timeout=10):
+        try:
+            result = subprocess.run([self.adb_path, "-s", self.serial, "exec-out", "screencap"],
+                                    capture_output=True, timeout=timeout)
+            return decode_raw_screencap(result.stdout)
+        except Exception:
+            return None
+
+    def capture_fps(self, samples=3):
+        started = time.perf_counter()
+        frames = sum(self.capture() is not None for _ in range(samples))
+        elapsed = time.perf_counter() - started
+        return round(frames / elapsed, 2) if frames else 0.0
+
+    def tap_latency(self, point, timeout=5.0, min_distance=6):
+        """Tap di titik aman lalu ukur waktu sampai layar berubah (dHash). None kalau tidak berubah."""
+        before = self.capture()
+        if before is None:
+            return None
+        height, width = before.shape[:2]
+        x, y = int(width * point[0]), int(height * point[1])
+        baseline = screen_fingerprint(before)
+        started = time.perf_counter()
+        subprocess.run([self.adb_path, "-s", self.serial, "shell", "input", "tap", str(x), str(y)],
+                       capture_output=True, timeout=5)
+        while time.perf_counter() - started < timeout:
+            frame = self.capture()
+            if frame is not None and hamming_distance(baseline, screen_fingerprint(frame)) >= min_distance:
+                return round(time.perf_counter() - started, 3)
+        return None
+
+class ResourceAutotuner:
+    """Controller: measure -> decide -> apply, satu langkah per interval"""
+
+    def __init__(self, instances_fn, scale_fn=None, restart_fn=None, console=None, adb_path=ADB_PATH,
+                 min_instances=1, max_instances=8, cpu_high=0.9, cpu_low=0.6, ram_high=0.9, ram_low=0.75,
+                 min_fps=1.0, max_latency=1.5, cap_step=10, min_cap=30, max_cores=4, probe_point=None,
+                 eval_window=900, min_gain=0.05, interval=60, log_path="autotuner_log.jsonl", history=200):
+        self.instances_fn = instances_fn  # () -> [{"serial", "clears_per_hour", ...}] instance yang jalan
+        self.scale_fn = scale_fn  # scale_fn(target_count) untuk menambah/mengurangi instance
+        # restart_fn(serial): restart instance supaya modify berlaku, lalu panggil mark_restarted(serial).
+        # None = `ldconsole reboot` langsung (setting berlaku saat boot berikutnya)
+        self.restart_fn = restart_fn
+        self.console = console or LDConsole()
+        self.adb_path = adb_path
+        self.min_instances = min_instances
+        self.max_instances = max_instances
+        self.cpu_high = cpu_high
+        self.cpu_low = cpu_low
+        self.ram_high = ram_high
+        self.ram_low = ram_low
+        self.min_fps = min_fps
+        self.max_latency = max_latency
+        self.cap_step = cap_step
+        self.min_cap = min_cap
+        self.max_cores = max_cores
+        self.probe_point = probe_point  # (fx, fy) titik tap aman; None = tanpa probe latency
+        self.eval_window = eval_window
+        self.min_gain = min_gain
+        self.interval = interval
+        self.log_path = log_path
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.decisions = deque(maxlen=history)
+        self.last_snapshot = None
+        self.trial = None  # {"from", "to", "baseline", "started"} eksperimen scale-up yang sedang dinilai
+        self.ceiling = max_instances  # Batas atas hasil eksperimen yang gagal
+        self.setpoints = {"instance_count": None, "fastplay": 0, "cleanmode": 0, "instances": {}}
+
+    def _instance_setpoint(self, serial):
+        return self.setpoints["instances"].setdefault(serial, {"cpu_cap": 100, "cpu_cores": None,
+                                                               "pending_restart": False})
+
+    def measure(self):
+        instances = []
+        for instance in self.instances_fn():
+            probe = InstanceProbe(instance["serial"], self.adb_path)
+            sample = dict(instance)
+            sample["capture_fps"] = probe.capture_fps()
+            sample["tap_latency"] = probe.tap_latency(self.probe_point) if self.probe_point else None
+            instances.append(sample)
+        snapshot = {
+            "time": time.time(),
+            "host": {"cpu": host_load(), "ram": host_memory()},
+            "instances": instances,
+            "clears_per_hour": round(sum(i.get("clears_per_hour") or 0 for i in instances), 1)
+        }
+        self.last_snapshot = snapshot
+        return snapshot
+
+    def _slow(self, sample):
+        latency = sample.get("tap_latency")
+        return sample["capture_fps"] < self.min_fps or (latency is not None and latency > self.max_latency)
+
+    def decide(self, snapshot):
+        """Return list aksi [{"action", ...}] dari satu snapshot (tanpa efek samping ke device)"""
+        cpu, ram = snapshot["host"]["cpu"], snapshot["host"]["ram"]
+        instances = snapshot["instances"]
+        count = len(instances)
+        if self.setpoints["instance_count"] is None:
+            self.setpoints["instance_count"] = count
+        target = self.setpoints["instance_count"]
+        overloaded = (cpu is not None and cpu > self.cpu_high) or (ram is not None and ram > self.ram_high)
+        headroom = (cpu is not None and cpu < self.cpu_low) and (ram is None or ram < self.ram_low)
+        actions = []
+
+        # Eksperimen scale-up: nilai setelah eval_window
+        if self.trial and snapshot["time"] - self.trial["started"] >= self.eval_window:
+            gained = snapshot["clears_per_hour"] >= self.trial["baseline"] * (1 + self.min_gain)
+            if not gained and target > self.trial["from"]:
+                self.ceiling = self.trial["from"]
+                actions.append({"action": "scale", "to": self.trial["from"],
+                                "reason": f"clears/h {snapshot['clears_per_hour']} tidak naik dari {self.trial['baseline']}"})
+            self.trial = None
+
+        if overloaded:
+            # Urutan: mode ringan global -> turunkan cap instance tercepat -> kurangi instance
+            if not self.setpoints["fastplay"] or not self.setpoints["cleanmode"]:
+                actions.append({"action": "globalsetting", "fastplay": 1, "cleanmode": 1,
+                                "reason": f"host penuh (cpu={cpu}, ram={ram})"})
+            else:
+                fastest = max(instances, key=lambda s: s["capture_fps"], default=None)
+                cap = self._instance_setpoint(fastest["serial"])["cpu_cap"] if fastest else self.min_cap
+                if fastest and cap - self.cap_step >= self.min_cap:
+                    actions.append({"action": "cpu_cap", "serial": fastest["serial"], "rate": cap - self.cap_step,
+                                    "reason": f"host penuh, {fastest['serial']} paling longgar ({fastest['capture_fps']} fps)"})
+                elif target > self.min_instances:
+                    actions.append({"action": "scale", "to": target - 1, "reason": f"host penuh (cpu={cpu}, ram={ram})"})
+                    self.ceiling = min(self.ceiling, target - 1)
+            return actions
+
+        for sample in instances:
+            if not self._slow(sample):
+                continue
+            setpoint = self._instance_setpoint(sample["serial"])
+            reason = f"{sample['serial']} lambat (fps={sample['capture_fps']}, latency={sample.get('tap_latency')})"
+            if setpoint["cpu_cap"] < 100:
+                actions.append({"action": "cpu_cap", "serial": sample["serial"],
+                                "rate": min(100, setpoint["cpu_cap"] + self.cap_step), "reason": reason})
+            elif headroom and not setpoint["pending_restart"] and (setpoint["cpu_cores"] or 2) < self.max_cores:
+                actions.append({"action": "cpu_cores", "serial": sample["serial"],
+                                "cores": (setpoint["cpu_cores"] or 2) + 1, "reason": reason})
+
+        if headroom and not self.trial and not actions and target < min(self.ceiling, self.max_instances) \
+                and count >= target and not any(self._slow(s) for s in instances):
+            actions.append({"action": "scale", "to": target + 1, "trial": True,
+                            "reason": f"host longgar (cpu={cpu}, ram={ram}), coba tambah instance"})
+        return actions
+
+    def apply(self, action, snapshot):
+        kind = action["action"]
+        if kind == "globalsetting":
+            self.console.run(["globalsetting", "--fastplay", str(action["fastplay"]),
+                              "--cleanmode", str(action["cleanmode"])])
+            self.setpoints["fastplay"], self.setpoints["cleanmode"] = action["fastplay"], action["cleanmode"]
+        elif kind == "cpu_cap":
+            # downcpu --rate: batas pemakaian CPU instance dalam persen
+            self.console.run(["downcpu", "--index", str(serial_index(action["serial"])), "--rate", str(action["rate"])])
+            self._instance_setpoint(action["serial"])["cpu_cap"] = action["rate"]
+        elif kind == "cpu_cores":
+            self.console.run(["modify", "--index", str(serial_index(action["serial"])), "--cpu", str(action["cores"])])
+            setpoint = self._instance_setpoint(action["serial"])
+            setpoint["cpu_cores"] = action["cores"]
+            setpoint["pending_restart"] = True  # modify baru berlaku setelah instance restart
+            self._restart(action["serial"])
+        elif kind == "scale":
+            if action.get("trial"):
+                self.trial = {"from": self.setpoints["instance_count"], "to": action["to"],
+                              "baseline": snapshot["clears_per_hour"], "started": snapshot["time"]}
+            self.setpoints["instance_count"] = action["to"]
+            if self.scale_fn:
+                self.scale_fn(action["to"])
+        self._log(action, snapshot)
+
+    def _restart(self, serial):
+        if self.restart_fn is not None:
+            self.restart_fn(serial)
+            return
+        _, success = self.console.run(["reboot", "--index", str(serial_index(serial))])
+        if success:
+            self._instance_setpoint(serial)["pending_restart"] = False
+
+    def _log(self, action, snapshot):
+        entry = dict(action, time=snapshot["time"], host=snapshot["host"], clears_per_hour=snapshot["clears_per_hour"])
+        self.decisions.append(entry)
+        print_step("TUNER", f"{action['action']} {({k: v for k, v in action.items() if k not in ('action', 'reason')})} - {action['reason']}")
+        if self.log_path:
+            try:
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry) + "\n")
+            except OSError as e:
+                print_step("TUNER", f"⚠️ Log gagal: {e}")
+
+    def step(self):
+        snapshot = self.measure()
+        with self.lock:
+            actions = self.decide(snapshot)
+            for action in actions:
+                self.apply(action, snapshot)
+        return actions
+
+    def _loop(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.step()
+            except Exception as e:
+                print_step("TUNER", f"⚠️ Step error: {e}")
+
+    def start(self):
+        self.stop_event.clear()
+        threading.Thread(target=self._loop, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+
+    def mark_restarted(self, serial):
+        """Dipanggil restart_fn (atau pemilik instance) setelah instance boot ulang: setting modify sudah berlaku"""
+        with self.lock:
+            self._instance_setpoint(serial)["pending_restart"] = False
+
+    def get_setpoints(self):
+        with self.lock:
+            setpoints = json.loads(json.dumps(self.setpoints))
+            setpoints["ceiling"] = self.ceiling
+            setpoints["trial"] = dict(self.trial) if self.trial else None
+            setpoints["last_snapshot"] = self.last_snapshot
+            return setpoints
+
+    def get_decisions(self, limit=50):
+        with self.lock:
+            return list(self.decisions)[-limit:]
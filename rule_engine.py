@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Rule Engine - Policy keputusan yang di-compile
+1. Rule = (screen_type, predicates) -> action, dengan priority
+2. Compile jadi decision table per screen_type (dict lookup)
+3. Predicate tombol dievaluasi vectorized dengan numpy
+4. Catat rule mana yang dipakai + latency
+"""
+import numpy as np
+import time
+
+class ButtonFilter:
+    """Predicate vectorized atas semua tombol: area, posisi (fraksi layar), atau fungsi numpy"""
+
+    def __init__(self, min_area=None, max_area=None, x_frac=None, y_frac=None, where=None, pick="first"):
+        self.min_area = min_area
+        self.max_area = max_area
+        self.x_frac = x_frac
+        self.y_frac = y_frac
+        self.where = where  # where(xs, ys, ws, hs, areas, width, height) -> bool mask
+        self.pick = pick
+
+    def mask(self, arrays, width, height):
+        xs, ys, ws, hs, areas = arrays
+        mask = np.ones(len(xs), dtype=bool)
+        if self.min_area is not None:
+            mask &= areas > self.min_area
+        if self.max_area is not None:
+            mask &= areas < self.max_area
+        if self.x_frac is not None:
+            mask &= (xs > width * self.x_frac[0]) & (xs < width * self.x_frac[1])
+        if self.y_frac is not None:
+            mask &= (ys > height * self.y_frac[0]) & (ys < height * self.y_frac[1])
+        if self.where is not None:
+            mask &= self.where(xs, ys, ws, hs, areas, width, height)
+        return mask
+
+    def select(self, arrays, width, height):
+        """Index tombol yang lolos filter, None kalau tidak ada"""
+        if len(arrays[0]) == 0:
+            return None
+        indices = np.flatnonzero(self.mask(arrays, width, height))
+        if len(indices) == 0:
+            return None
+        if self.pick == "largest":
+            return int(indices[np.argmax(arrays[4][indices])])
+        return int(indices[0])
+
+class Rule:
+    """Satu rule: screen_types + syarat -> action"""
+
+    def __init__(self, name, screen_types, action="click", target=None, priority=0,
+                 buttons=None, colors=None, requires=None, label=None, confidence=0.8, wait=0, fallback=False):
+        self.name = name
+        self.screen_types = (screen_types,) if isinstance(screen_types, str) else tuple(screen_types)
+        self.action = action  # "click" / "wait"
+        self.target = target  # "button", "target:<nama>", "center", (fx, fy) atau (fx, fy, ox, oy)
+        self.priority = priority
+        self.buttons = buttons  # ButtonFilter
+        self.colors = colors or {}  # {"green": min_pixels}
+        self.requires = requires or ()  # nama target yang harus ada
+        self.label = label or name
+        self.confidence = confidence
+        self.wait = wait
+        self.fallback = fallback  # tebakan terakhir (bukan hasil deteksi): jangan di-cache
+
+    @property
+    def terminal(self):
+        """Selalu cocok (tanpa syarat tombol / warna / target): rule di bawahnya tidak pernah dicapai"""
+        unconditional = self.buttons is None and not self.colors and not self.requires
+        return unconditional and (self.action != "click" or self.target == "center" or isinstance(self.target, tuple))
+
+class Facts:
+    """Input untuk engine: tombol sebagai numpy arrays + target lazy (dihitung saat dibutuhkan)"""
+
+    def __init__(self, screen_type, width, height, buttons=None, colors=None, targets=None):
+        self.screen_type = screen_type
+        self.width = width
+        self.height = height
+        self.buttons = buttons or []
+        self.colors = {c["color"]: c["pixels"] for c in (colors or [])}
+        self.targets = dict(targets or {})
+        self.resolved = {}
+        positions = [b.get("pos") or b.get("position") for b in self.buttons]
+        sizes = [b.get("size", [0, 0]) for b in self.buttons]
+        self.arrays = (
+            np.array([p[0] for p in positions], dtype=np.int32),
+            np.array([p[1] for p in positions], dtype=np.int32),
+            np.array([s[0] for s in sizes], dtype=np.int32),
+            np.array([s[1] for s in sizes], dtype=np.int32),
+            np.array([b.get("area", 0) for b in self.buttons], dtype=np.int64)
+        )
+
+    @classmethod
+    def from_analysis(cls, screen_type, analysis, width=None, height=None, targets=None):
+        buttons = analysis.get("buttons") or analysis.get("elements") or analysis.get("top_buttons") or []
+        if width is None or height is None:
+            width, height = [int(v) for v in (analysis.get("resolution") or "1280x720").split("x")]
+        return cls(screen_type, width, height, buttons, analysis.get("colors", []), targets)
+
+    def target(self, name):
+        """Ambil target (posisi atau list posisi), fungsi detektor dipanggil sekali saja"""
+        if name not in self.resolved:
+            value = self.targets.get(name)
+            self.resolved[name] = value() if callable(value) else value
+        return self.resolved[name]
+
+class RuleEngine:
+    """Compile rules jadi decision table: screen_type -> list rule urut priority"""
+
+    def __init__(self, rules):
+        self.rules = list(rules)
+        self.table = {}
+        self.fired = {}
+        self.stats = {"decisions": 0, "total_ms": 0.0, "max_ms": 0.0}
+        self.compile()
+
+    def compile(self):
+        wildcard = [r for r in self.rules if "*" in r.screen_types]
+        screen_types = {t for r in self.rules for t in r.screen_types if t != "*"}
+        table = {}
+        for screen_type in screen_types:
+            rules = [r for r in self.rules if screen_type in r.screen_types]
+            # Screen type dengan fallback terminal sendiri (mis. safe area lobby) tidak ikut rule wildcard
+            if not any(r.terminal for r in rules):
+                rules += wildcard
+            # Stable sort: priority tinggi dulu, urutan deklarasi untuk yang sama
+            table[screen_type] = sorted(rules, key=lambda r: -r.priority)
+        table["*"] = sorted(wildcard, key=lambda r: -r.priority)
+        self.table = table
+        self.fired = {r.name: 0 for r in self.rules}
+
+    def _resolve_point(self, rule, facts, button_index):
+        target = rule.target
+        if target == "button":
+            return [int(facts.arrays[0][button_index]), int(facts.arrays[1][button_index])]
+        if target == "center":
+            return [facts.width // 2, facts.height // 2]
+        if isinstance(target, str) and target.startswith("target:"):
+            value = facts.target(target[7:])
+            if isinstance(value, list):
+                value = value[0] if value else None
+            return [int(value[0]), int(value[1])] if value else None
+        if isinstance(target, tuple):
+            fx, fy = target[0], target[1]
+            ox, oy = (target[2], target[3]) if len(target) == 4 else (0, 0)
+            return [int(facts.width * fx) + ox, int(facts.height * fy) + oy]
+        return None
+
+    def _matches(self, rule, facts):
+        """Return (cocok, index tombol)"""
+        for color, min_pixels in rule.colors.items():
+            if facts.colors.get(color, 0) <= min_pixels:
+                return False, None
+        for name in rule.requires:
+            if not facts.target(name):
+                return False, None
+        button_index = None
+        if rule.buttons is not None:
+            button_index = rule.buttons.select(facts.arrays, facts.width, facts.height)
+            if button_index is None:
+                return False, None
+        return True, button_index
+
+    def decide(self, facts):
+        """Keputusan dari rule pertama yang cocok"""
+        started = time.perf_counter()
+        decision = {"action": "wait", "coordinates": None, "reason": "No rule matched", "confidence": 0.5, "rule": None}
+        for rule in self.table.get(facts.screen_type, self.table["*"]):
+            matched, button_index = self._matches(rule, facts)
+            if not matched:
+                continue
+            coordinates = None
+            if rule.action == "click":
+                coordinates = self._resolve_point(rule, facts, button_index)
+                if coordinates is None:
+                    continue
+            decision = {
+                "action": rule.action,
+                "coordinates": coordinates,
+                "reason": rule.label,
+                "confidence": rule.confidence,
+                "rule": rule.name,
+                "fallback": rule.fallback
+            }
+            if rule.wait:
+                decision["wait"] = rule.wait
+            if button_index is not None:
+                decision["area"] = int(facts.arrays[4][button_index])
+            self.fired[rule.name] += 1
+            break
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        decision["latency_ms"] = round(elapsed_ms, 3)
+        self.stats["decisions"] += 1
+        self.stats["total_ms"] += elapsed_ms
+        self.stats["max_ms"] = max(self.stats["max_ms"], elapsed_ms)
+        return decision
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats["avg_ms"] = round(stats["total_ms"] / stats["decisions"], 4) if stats["decisions"] else 0.0
+        stats["fired"] = dict(self.fired)
+        return stats
+
+def _main_stage_area(xs, ys, ws, hs, areas, width, height):
+    # MAIN STAGE di tengah (sedikit di atas), hindari area shop kanan atas
+    return ((np.abs(xs - width // 2) < 150) & (np.abs(ys - (height // 2 - 50)) < 100)
+            & (xs < width * 0.8) & (ys > height * 0.2))
+
+# Flow lobby/stage: MAIN STAGE -> stage kuning terendah -> START, hindari QUEST/shop
+ULTIMATE_RULES = [
+    Rule("lobby_main_stage_button", "lobby", target="button", priority=100,
+         buttons=ButtonFilter(where=_main_stage_area), label="Klik MAIN STAGE button - area aman"),
+    Rule("lobby_main_stage_detected", "lobby", target="target:main_stage", priority=90,
+         requires=("main_stage",), label="Klik MAIN STAGE (deteksi spesifik)"),
+    Rule("lobby_yellow_stage", "lobby", target="target:yellow_stages", priority=80,
+         requires=("yellow_stages",), label="Klik stage number kuning"),
+    Rule("lobby_safe_area", "lobby", target=(0.5, 0.5, 0, -80), priority=0,
+         label="Klik area MAIN STAGE aman", confidence=0.5, fallback=True),
+    Rule("loading_wait", "loading", action="wait", priority=100,
+         label="Loading screen detected, menunggu...", wait=3),
+    Rule("yellow_stage", "*", target="target:yellow_stages", priority=80,
+         requires=("yellow_stages",), label="Klik stage number kuning"),
+    Rule("start_button", "*", target="target:start_button", priority=70,
+         requires=("start_button",), label="Klik START button"),
+    Rule("green_button", "*", target="button", priority=60, colors={"green": 10000},
+         buttons=ButtonFilter(), label="Klik tombol hijau (START/NEXT)", confidence=0.7),
+    Rule("large_button", "*", target="button", priority=50,
+         buttons=ButtonFilter(min_area=5000), label="Klik tombol besar", confidence=0.6),
+    Rule("center", "*", target="center", priority=0, label="Klik tengah layar", confidence=0.3, fallback=True),
+]
+
+# Pengganti create_fallback_decision (LineRangerAI)
+FALLBACK_RULES = [
+    Rule("largest_button", "*", target="button", priority=100,
+         buttons=ButtonFilter(pick="largest"), label="Click largest button", confidence=0.8),
+    # Koordinat tetap [640, 360] seperti fallback lama (bukan tengah frame pada resolusi lain)
+    Rule("green_center", "*", target=(0, 0, 640, 360), priority=50, colors={"green": 0},
+         label="Green color detected - likely start/go button", confidence=0.7),
+    Rule("no_action", "*", action="wait", priority=0, label="No clear action detected", confidence=0.5),
+]
+
+# Pengganti fallback di step6_ai_decision (CompleteLineRangerBot)
+STEP6_RULES = [
+    Rule("largest_button", "*", target="button", priority=100,
+         buttons=ButtonFilter(pick="largest"), label="Click largest button"),
+    Rule("no_buttons", "*", action="wait", priority=0, label="No clear buttons detected"),
+]
@@ -14,6 +14,11 @@ import os
 import json
 import base64
 from datetime import datetime
+from device_state_cache import get_cache
+from input_queue import get_queue
+
+PACKAGE = "com.linecorp.LGRGS"
+DEVICE_STATE = get_cache("emulator-5554", "C:\\LDPlayer\\LDPlayer9\\adb.exe")
 
 def print_step(step, message):
     timestamp = datetime.now().strftime("%H:%M:%S")
@@ -102,8 +107,7 @@ def check_android_ready():
     """Cek Android sudah siap"""
     print_step("ANDROID", "Mengecek sistem Android...")
     for i in range(18):  # 3 menit max
-        output, success = run_cmd('cd "C:\\LDPlayer\\LDPlayer9" && adb.exe -s emulator-5554 shell getprop sys.boot_completed')
-        if "1" in output:
+        if DEVICE_STATE.boot_completed():
             print_step("ANDROID", f"✅ Android siap! ({(i+1)*10}s)")
             log_action("ANDROID_READY", f"Ready in {(i+1)*10}s")
             return True
@@ -117,10 +121,8 @@ def check_line_ranger_running():
     """Cek apakah Line Ranger sudah jalan"""
     print_step("GAME", "Mengecek apakah Line Ranger sudah jalan...")
     
-    # Cek proses yang berjalan
-    output, success = run_cmd('cd "C:\\LDPlayer\\LDPlayer9" && adb.exe -s emulator-5554 shell "ps | grep line"')
-    
-    if "linecorp" in output.lower() or "lgrgs" in output.lower():
+    # ps di-cache beberapa detik; launch_line_ranger meng-invalidasi
+    if DEVICE_STATE.is_running(PACKAGE):
         print_step("GAME", "✅ Line Ranger sudah jalan!")
         log_action("GAME_STATUS", "Already running")
         return True
@@ -134,6 +136,7 @@ def launch_line_ranger():
     print_step("LAUNCH", "Meluncurkan Line Ranger...")
     output, success = run_cmd('cd "C:\\LDPlayer\\LDPlayer9" && ldconsole.exe runapp --index 0 --packagename com.linecorp.LGRGS')
     
+    DEVICE_STATE.notify("launch")
     if success:
         print_step("LAUNCH", "✅ Line Ranger diluncurkan!")
         log_action("GAME_LAUNCHED", "Line Ranger started")
@@ -248,10 +251,9 @@ class SmartGameplayAI:
     def safe_click(self, x, y):
         """Klik dengan aman"""
         try:
-            subprocess.run([
-                self.adb_path, "-s", self.device,
-                "shell", "input", "tap", str(x), str(y)
-            ], capture_output=True, timeout=5)
+            action = get_queue(self.device, self.adb_path).tap(x, y)
+            if not action.wait(5):
+                raise action.error or TimeoutError("tap belum terkirim")
             log_action("CLICK", f"Klik di ({x}, {y})")
             print_step("CLICK", f"👆 Klik di ({x}, {y})")
             return True
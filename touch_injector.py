@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+"""
+Touch Injector - Kanal injeksi sentuhan persisten per device (tanpa `input tap` per klik)
+`input tap` / `input touchscreen swipe` menjalankan app_process Java baru tiap panggilan (ratusan ms)
+dan tidak bisa multi-touch. Di sini kanal dibuka sekali lalu dipakai terus:
+1. minitouch  - socket ke /data/local/tmp/minitouch (adb forward), timing `w` dijalankan di device
+2. sendevent  - satu `adb shell` persisten, event multi-touch protocol B ditulis ke stdin per batch
+3. input      - fallback: `input tap/swipe` lewat shell persisten yang sama (tanpa multi-touch sejati)
+API primitif: down / move / up (id contact) + commit / wait, lalu flush() = satu write per gesture.
+API lama tetap ada: click(x, y) dan swipe(x1, y1, x2, y2, delay).
+"""
+import re
+import socket
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+ADB_PATH = "C:\\LDPlayer\\LDPlayer9\\adb.exe"
+MINITOUCH_PATH = "/data/local/tmp/minitouch"
+MINITOUCH_SOCKET = "minitouch"
+BACKENDS = ("minitouch", "sendevent", "input")
+# Kode event linux (input-event-codes.h)
+EV_SYN, EV_KEY, EV_ABS = 0, 1, 3
+BTN_TOUCH = 0x14a
+ABS_MT_SLOT, ABS_MT_POSITION_X, ABS_MT_POSITION_Y = 0x2f, 0x35, 0x36
+ABS_MT_TRACKING_ID, ABS_MT_PRESSURE = 0x39, 0x3a
+SIZE_RE = re.compile(r"(\d+)x(\d+)")
+GETEVENT_DEVICE_RE = re.compile(r"add device \d+: (\S+)")
+
+def print_step(step, message):
+    timestamp = datetime.now().strftime("%H:%M:%S")
+    print(f"[{timestamp}] [{step}] {message}")
+
+def encode_stroke(points):
+    """Satu stroke [(t_ms, x, y), ...] -> baris `input tap` / `input touchscreen swipe` (dipakai juga async_device)"""
+    (t1, x1, y1), (t2, x2, y2) = points[0], points[-1]
+    if (int(x1), int(y1)) == (int(x2), int(y2)) and t2 - t1 < 500:
+        return f"input tap {int(x1)} {int(y1)}\n"
+    return f"input touchscreen swipe {int(x1)} {int(y1)} {int(x2)} {int(y2)} {max(int(t2 - t1), 1)}\n"
+
+def encode_key(code):
+    return f"input keyevent {code}\n"
+
+class TouchError(RuntimeError):
+    """Kanal sentuhan tidak bisa dibuka / putus"""
+
+class TouchInjector:
+    """Basis semua backend: event di-encode ke buffer, flush() mengirim buffer dalam satu write"""
+    backend = "base"
+    multi_touch = True
+
+    def __init__(self, serial="emulator-5554", adb_path=ADB_PATH, screen_size=None, timeout=10):
+        self.serial = serial
+        self.adb_path = adb_path
+        self.timeout = timeout
+        self.screen_size = screen_size
+        self.touch_size = None  # (max_x, max_y) koordinat perangkat sentuh
+        self.max_contacts = 10
+        self.max_pressure = 0
+        self.lock = threading.RLock()
+        self.buffer = []
+        self.batching = 0  # >0: flush ditunda sampai batch() selesai
+        self.active = set()
+        self.stats = {"events": 0, "writes": 0, "write_ms": 0.0, "gestures": 0, "opened": None}
+
+    def adb(self, *args):
+        result = subprocess.run([self.adb_path, "-s", self.serial] + list(args), capture_output=True, text=True,
+                                timeout=self.timeout)
+        return result.stdout
+
+    def _screen_size(self):
+        if self.screen_size is None:
+            sizes = SIZE_RE.findall(self.adb("shell", "wm", "size"))
+            if not sizes:
+                raise TouchError(f"wm size gagal di {self.serial}")
+            # Baris terakhir = Override size kalau ada
+            self.screen_size = tuple(int(v) for v in sizes[-1])
+        return self.screen_size
+
+    def scale(self, x, y):
+        """Koordinat layar -> koordinat perangkat sentuh"""
+        if not self.touch_size:
+            return int(x), int(y)
+        width, height = self._screen_size()
+        return int(x * self.touch_size[0] / width), int(y * self.touch_size[1] / height)
+
+    def open(self):
+        self.stats["opened"] = time.time()
+        return self
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- primitif (buffer) ---
+    def down(self, contact, x, y, pressure=50):
+        if contact >= self.max_contacts:
+            raise TouchError(f"contact {contact} melebihi max {self.max_contacts}")
+        self.active.add(contact)
+        self.buffer.append(self._encode_down(contact, *self.scale(x, y), pressure))
+        self.stats["events"] += 1
+
+    def move(self, contact, x, y, pressure=50):
+        self.buffer.append(self._encode_move(contact, *self.scale(x, y), pressure))
+        self.stats["events"] += 1
+
+    def up(self, contact):
+        self.active.discard(contact)
+        self.buffer.append(self._encode_up(contact))
+        self.stats["events"] += 1
+
+    def commit(self):
+        self.buffer.append(self._encode_commit())
+
+    def wait(self, ms):
+        if ms > 0:
+            self.buffer.append(self._encode_wait(ms))
+
+    def key(self, code):
+        """Keyevent Android; backend tanpa shell mengirim buffer dulu lalu pakai `adb shell input keyevent`"""
+        with self.lock:
+            if self.batching:
+                raise TouchError(f"backend {self.backend} tidak bisa keyevent di dalam batch")
+            self.flush()
+            self.adb("shell", "input", "keyevent", str(code))
+            self.stats["events"] += 1
+
+    @contextmanager
+    def batch(self):
+        """Semua gesture di dalam blok dikirim dalam satu write saat blok selesai"""
+        with self.lock:
+            self.batching += 1
+            try:
+                yield self
+            finally:
+                self.batching -= 1
+                if not self.batching:
+                    self.flush()
+
+    def flush(self):
+        """Kirim semua event di buffer dalam satu write"""
+        with self.lock:
+            if self.batching:
+                return
+            payload, self.buffer = "".join(self.buffer), []
+            if not payload:
+                return
+            started = time.perf_counter()
+            try:
+                self._write(payload)
+            except OSError as e:
+                raise TouchError(f"{self.backend} {self.serial}: {e}") from e
+            self.stats["writes"] += 1
+            self.stats["write_ms"] += (time.perf_counter() - started) * 1000
+
+    # --- gesture ---
+    def play(self, strokes):
+        """Multi-touch: strokes = [[(t_ms, x, y), ...] per contact]; semua dikirim dalam satu flush.
+        Titik pertama = down, berikutnya = move, setelah titik terakhir = up."""
+        frames = {}
+        for contact, points in enumerate(strokes):
+            for index, (t, x, y) in enumerate(points):
+                frames.setdefault(t, ([], []))[0].append(("d" if index == 0 else "m", contact, x, y))
+            frames.setdefault(points[-1][0], ([], []))[1].append(contact)
+        with self.lock:
+            now = 0
+            for t in sorted(frames):
+                self.wait(t - now)
+                now = t
+                moves, ups = frames[t]
+                for kind, contact, x, y in moves:
+                    (self.down if kind == "d" else self.move)(contact, x, y)
+                if moves:
+                    self.commit()
+                for contact in ups:
+                    self.up(contact)
+                if ups:
+                    self.commit()
+            self.flush()
+            self.stats["gestures"] += 1
+
+    def click(self, x, y, hold=30):
+        self.play([[(0, x, y), (hold, x, y)]])
+
+    def swipe(self, x1, y1, x2, y2, delay=0, step_ms=8):
+        """Drag lurus; delay = durasi ms (sama dengan `input touchscreen swipe`)"""
+        duration = int(delay) or 300
+        steps = max(duration // step_ms, 1)
+        points = [(round(duration * i / steps), x1 + (x2 - x1) * i / steps, y1 + (y2 - y1) * i / steps)
+                  for i in range(steps + 1)]
+        self.play([points])
+
+    def get_stats(self):
+        writes = max(self.stats["writes"], 1)
+        return dict(self.stats, backend=self.backend, serial=self.serial,
+                    avg_write_ms=round(self.stats["write_ms"] / writes, 3),
+                    avg_event_us=round(self.stats["write_ms"] * 1000 / max(self.stats["events"], 1), 1))
+
+class MinitouchInjector(TouchInjector):
+    """Protokol minitouch (d/m/u/c/w) lewat socket; binary harus sudah di-push ke MINITOUCH_PATH"""
+    backend = "minitouch"
+
+    def __init__(self, serial="emulator-5554", adb_path=ADB_PATH, screen_size=None, timeout=10,
+                 binary=MINITOUCH_PATH, port=None):
+        super().__init__(serial, adb_path, screen_size, timeout)
+        self.binary = binary
+        self.port = port
+        self.process = None
+        self.sock = None
+
+    def open(self):
+        if not self.adb("shell", "ls", self.binary).strip().endswith(self.binary.rsplit("/", 1)[-1]):
+            raise TouchError(f"minitouch tidak ada di {self.serial}:{self.binary}")
+        self.process = subprocess.Popen([self.adb_path, "-s", self.serial, "shell", self.binary],
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if self.port is None:
+            with socket.socket() as probe:
+                probe.bind(("127.0.0.1", 0))
+                self.port = probe.getsockname()[1]
+        self.adb("forward", f"tcp:{self.port}", f"localabstract:{MINITOUCH_SOCKET}")
+        deadline = time.time() + self.timeout
+        while True:
+            try:
+                self.sock = socket.create_connection(("127.0.0.1", self.port), timeout=self.timeout)
+                self._read_header()
+                break
+            except (OSError, TouchError):
+                # minitouch butuh sebentar sampai socket siap
+                if self.sock:
+                    self.sock.close()
+                    self.sock = None
+                if time.time() > deadline:
+                    self.close()
+                    raise TouchError(f"minitouch tidak merespons di {self.serial}")
+                time.sleep(0.1)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return super().open()
+
+    def _read_header(self):
+        """Header: 'v <versi>', '^ <max contacts> <max x> <max y> <max pressure>', '$ <pid>'"""
+        data = b""
+        while b"$" not in data:
+            chunk = self.sock.recv(1024)
+            if not chunk:
+                raise TouchError("header minitouch kosong")
+            data += chunk
+        for line in data.decode("ascii", errors="replace").splitlines():
+            if line.startswith("^"):
+                _, contacts, max_x, max_y, pressure = line.split()[:5]
+                self.max_contacts = int(contacts)
+                self.touch_size = (int(max_x), int(max_y))
+                self.max_pressure = int(pressure)
+
+    def close(self):
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+        if self.port:
+            subprocess.run([self.adb_path, "-s", self.serial, "forward", "--remove", f"tcp:{self.port}"],
+                           capture_output=True, timeout=self.timeout)
+
+    def _pressure(self, pressure):
+        return min(pressure, self.max_pressure) if self.max_pressure else 0
+
+    def _encode_down(self, contact, x, y, pressure):
+        return f"d {contact} {x} {y} {self._pressure(pressure)}\n"
+
+    def _encode_move(self, contact, x, y, pressure):
+        return f"m {contact} {x} {y} {self._pressure(pressure)}\n"
+
+    def _encode_up(self, contact):
+        return f"u {contact}\n"
+
+    def _encode_commit(self):
+        return "c\n"
+
+    def _encode_wait(self, ms):
+        return f"w {int(ms)}\n"
+
+    def _write(self, payload):
+        if not self.sock:
+            raise TouchError("minitouch belum dibuka")
+        self.sock.sendall(payload.encode("ascii"))
+
+class ShellInjector(TouchInjector):
+    """Satu `adb shell` persisten; perintah ditulis ke stdin (tidak ada proses adb baru per aksi)"""
+    backend = "shell"
+
+    def __init__(self, serial="emulator-5554", adb_path=ADB_PATH, screen_size=None, timeout=10):
+        super().__init__(serial, adb_path, screen_size, timeout)
+        self.process = None
+
+    def open(self):
+        self.process = subprocess.Popen([self.adb_path, "-s", self.serial, "shell"], stdin=subprocess.PIPE,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return super().open()
+
+    def close(self):
+        if self.process and self.process.poll() is None:
+            try:
+                self.process.stdin.write(b"exit\n")
+                self.process.stdin.close()
+                self.process.wait(timeout=self.timeout)
+            except (OSError, subprocess.TimeoutExpired):
+                self.process.kill()
+        self.process = None
+
+    def _write(self, payload):
+        if not self.process or self.process.poll() is not None:
+            raise TouchError("shell sudah tertutup")
+        self.process.stdin.write(payload.encode("utf-8"))
+        self.process.stdin.flush()
+
+    def _encode_wait(self, ms):
+        return f"sleep {ms / 1000:.3f}\n"
+
+    def _encode_commit(self):
+        return ""
+
+    def key(self, code):
+        with self.lock:
+            self.buffer.append(encode_key(code))
+            self.stats["events"] += 1
+            self.flush()
+
+class SendeventInjector(ShellInjector):
+    """Multi-touch protocol B lewat `sendevent` ke /dev/input/eventX (butuh shell root, default di LDPlayer)"""
+    backend = "sendevent"
+
+    def __init__(self, serial="emulator-5554", adb_path=ADB_PATH, screen_size=None, timeout=10, device=None):
+        super().__init__(serial, adb_path, screen_size, timeout)
+        self.device = device
+        self.tracking_id = 0
+
+    def open(self):
+        self._discover(self.adb("shell", "getevent", "-p"))
+        self._check_writable()
+        return super().open()
+
+    def _check_writable(self):
+        """sendevent tanpa root gagal diam-diam per baris: cek akses tulis dulu supaya jatuh ke backend input"""
+        output = self.adb("shell", f"id -u; test -w {self.device} && echo writable").split()
+        if "writable" not in output:
+            uid = output[0] if output else "?"
+            raise TouchError(f"{self.device} tidak bisa ditulis (uid {uid}) di {self.serial}")
+
+    def _discover(self, output):
+        """Cari perangkat input yang punya ABS_MT_POSITION_X/Y dari `getevent -p`"""
+        current, axes, found = None, {}, {}
+        for line in output.splitlines() + ["add device 0: end"]:
+            device = GETEVENT_DEVICE_RE.search(line)
+            if device:
+                if current and ABS_MT_POSITION_X in axes and (not self.device or self.device == current):
+                    found = {"device": current, "axes": axes}
+                    break
+                current, axes = device.group(1), {}
+                continue
+            for code, maximum in re.findall(r"\b([0-9a-f]{4})\s*:.*?max (\d+)", line):
+                axes[int(code, 16)] = int(maximum)
+        if not found:
+            raise TouchError(f"perangkat multi-touch tidak ditemukan di {self.serial}")
+        self.device = found["device"]
+        self.touch_size = (found["axes"][ABS_MT_POSITION_X], found["axes"].get(ABS_MT_POSITION_Y, 0))
+        self.max_pressure = found["axes"].get(ABS_MT_PRESSURE, 0)
+        self.max_contacts = found["axes"].get(ABS_MT_SLOT, 9) + 1
+
+    def _event(self, kind, code, value):
+        return f"sendevent {self.device} {kind} {code} {value}\n"
+
+    def _encode_down(self, contact, x, y, pressure):
+        self.tracking_id = (self.tracking_id + 1) % 65535
+        lines = [self._event(EV_ABS, ABS_MT_SLOT, contact), self._event(EV_ABS, ABS_MT_TRACKING_ID, self.tracking_id)]
+        if len(self.active) == 1:
+            lines.append(self._event(EV_KEY, BTN_TOUCH, 1))
+        return "".join(lines) + self._encode_move(contact, x, y, pressure)
+
+    def _encode_move(self, contact, x, y, pressure):
+        lines = [self._event(EV_ABS, ABS_MT_SLOT, contact), self._event(EV_ABS, ABS_MT_POSITION_X, x),
+                 self._event(EV_ABS, ABS_MT_POSITION_Y, y)]
+        if self.max_pressure:
+            lines.append(self._event(EV_ABS, ABS_MT_PRESSURE, min(pressure, self.max_pressure)))
+        return "".join(lines)
+
+    def _encode_up(self, contact):
+        lines = [self._event(EV_ABS, ABS_MT_SLOT, contact), self._event(EV_ABS, ABS_MT_TRACKING_ID, -1)]
+        if not self.active:
+            lines.append(self._event(EV_KEY, BTN_TOUCH, 0))
+        return "".join(lines)
+
+    def _encode_commit(self):
+        return self._event(EV_SYN, 0, 0)
+
+class InputInjector(ShellInjector):
+    """Fallback `input tap/swipe` di shell persisten: hemat proses adb, tapi tetap app_process per aksi"""
+    backend = "input"
+    multi_touch = False
+
+    def play(self, strokes):
+        # Tanpa multi-touch sejati: tiap stroke jadi tap / swipe berurutan dalam satu write
+        with self.lock:
+            for points in strokes:
+                self.buffer.append(encode_stroke(points))
+                self.stats["events"] += 1
+            self.flush()
+            self.stats["gestures"] += 1
+
+    def down(self, contact, x, y, pressure=50):
+        raise TouchError("backend input tidak mendukung down/move/up")
+
+    move = down
+
+    def up(self, contact):
+        raise TouchError("backend input tidak mendukung down/move/up")
+
+INJECTORS = {"minitouch": MinitouchInjector, "sendevent": SendeventInjector, "input": InputInjector}
+
+def open_injector(serial="emulator-5554", adb_path=ADB_PATH, backends=BACKENDS, **kwargs):
+    """Backend tercepat yang bisa dibuka di device (urutan: minitouch -> sendevent -> input)"""
+    errors = []
+    for name in backends:
+        injector = INJECTORS[name](serial, adb_path, **kwargs)
+        try:
+            return injector.open()
+        except (TouchError, OSError, subprocess.SubprocessError) as e:
+            injector.close()
+            errors.append(f"{name}: {e}")
+    raise TouchError(f"tidak ada backend sentuhan untuk {serial} ({'; '.join(errors)})")
+
+def main():
+    import argparse
+    import json
+    parser = argparse.ArgumentParser(description="Injeksi sentuhan persisten (minitouch / sendevent / input)")
+    parser.add_argument("--device", default="emulator-5554")
+    parser.add_argument("--adb", default=ADB_PATH)
+    parser.add_argument("--backend", choices=BACKENDS, action="append", help="Urutan backend yang dicoba")
+    parser.add_argument("--tap", nargs=2, type=int, metavar=("X", "Y"))
+    parser.add_argument("--swipe", nargs=5, type=int, metavar=("X1", "Y1", "X2", "Y2", "MS"))
+    parser.add_argument("--pinch", nargs=2, type=int, metavar=("X", "Y"), help="Dua jari menjauh dari titik")
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    with open_injector(args.device, args.adb, tuple(args.backend or BACKENDS)) as injector:
+        print_step("TOUCH", f"backend {injector.backend} (max contact {injector.max_contacts})")
+        for _ in range(args.repeat):
+            if args.tap:
+                injector.click(*args.tap)
+            if args.swipe:
+                injector.swipe(*args.swipe)
+            if args.pinch:
+                x, y = args.pinch
+                injector.play([[(t, x - t, y) for t in range(0, 201, 10)], [(t, x + t, y) for t in range(0, 201, 10)]])
+        print(json.dumps(injector.get_stats(), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+U2 Hierarchy - Backend hierarchy lewat sesi uiautomator2 (server JSON-RPC di device) yang tetap terbuka
+API sama dengan HierarchyService (dump / select / positions / changes / watch / get_stats), bedanya:
+1. Satu u2.connect per serial dipakai bersama semua service (tidak ada cold `uiautomator dump` 1-3 detik)
+2. Hierarchy diambil lewat dump_hierarchy() di koneksi yang sudah hangat
+3. select(**selector) dijalankan langsung oleh agent di device, hasil dikembalikan sebagai UINode.
+   Tiap match butuh satu RPC info; selector yang cocok lebih dari MAX_INFO_QUERIES node memakai satu dump.
+4. Koneksi putus -> sambung ulang sekali lalu ulangi operasi
+Pilih backend lewat create_hierarchy_service(..., backend="u2") atau env HIERARCHY_BACKEND=u2.
+"""
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from lxml import etree
+import uiautomator2 as u2
+from ui_hierarchy import ADB_PATH, HierarchyError, HierarchyService, UINode, create_hierarchy_service, extract_xml
+
+# Di atas jumlah match ini satu dump_hierarchy lebih murah daripada satu RPC info per node
+MAX_INFO_QUERIES = 5
+_sessions_lock = threading.Lock()
+_sessions = {}
+
+def print_step(step, message):
+    timestamp = datetime.now().strftime("%H:%M:%S")
+    print(f"[{timestamp}] [{step}] {message}")
+
+def connect(serial, reconnect=False):
+    """Device uiautomator2 per serial; dipakai ulang selama proses hidup"""
+    with _sessions_lock:
+        device = None if reconnect else _sessions.get(serial)
+        if device is None:
+            device = u2.connect(serial)
+            _sessions[serial] = device
+        return device
+
+def disconnect(serial):
+    with _sessions_lock:
+        _sessions.pop(serial, None)
+
+def info_to_node(info):
+    """Dict info UiObject uiautomator2 -> UINode (element <node> sintetis, atribut sama dengan dump)"""
+    bounds = info.get("bounds") or {}
+    attrib = {
+        "text": info.get("text") or "",
+        "resource-id": info.get("resourceName") or "",
+        "class": info.get("className") or "",
+        "content-desc": info.get("contentDescription") or "",
+        "package": info.get("packageName") or "",
+        "bounds": f"[{bounds.get('left', 0)},{bounds.get('top', 0)}][{bounds.get('right', 0)},{bounds.get('bottom', 0)}]",
+    }
+    for name in ("clickable", "enabled", "checked", "selected", "focused", "scrollable"):
+        attrib[name] = "true" if info.get(name) else "false"
+    return UINode(etree.Element("node", attrib))
+
+class U2HierarchyService(HierarchyService):
+    """HierarchyService dengan transport agent uiautomator2; adb_path tidak dipakai (koneksi lewat adb server)"""
+    backend = "u2"
+
+    def __init__(self, serial="emulator-5554", adb_path=ADB_PATH, max_age=0.0, timeout=20):
+        super().__init__(serial, adb_path, max_age=max_age, timeout=timeout)
+        self.stats.update({"connects": 0, "reconnects": 0, "broad_queries": 0})
+        self.latency["connect"] = deque(maxlen=500)
+
+    @property
+    def device(self):
+        return self._connect()
+
+    def _connect(self, reconnect=False):
+        started = time.perf_counter()
+        fresh = reconnect or self.serial not in _sessions
+        device = connect(self.serial, reconnect)
+        if fresh:
+            self.stats["connects"] += 1
+            self.latency["connect"].append((time.perf_counter() - started) * 1000)
+        return device
+
+    def _call(self, operation):
+        """Jalankan operation(device); kalau gagal sambung ulang sekali, gagal lagi -> HierarchyError"""
+        try:
+            return operation(self._connect())
+        except Exception as e:
+            print_step("U2", f"{self.serial}: {e} - sambung ulang")
+        self.stats["reconnects"] += 1
+        try:
+            return operation(self._connect(reconnect=True))
+        except Exception as e:
+            disconnect(self.serial)
+            raise HierarchyError(f"uiautomator2 gagal di {self.serial}: {e}") from e
+
+    def fetch_xml(self):
+        xml = extract_xml(self._call(lambda device: device.dump_hierarchy(compressed=False)))
+        if xml is None:
+            raise HierarchyError(f"dump_hierarchy kosong di {self.serial}")
+        return xml
+
+    def select(self, fresh=True, **selector):
+        """Query dijalankan agent di device (tanpa dump penuh); fresh=False -> filter dump terakhir"""
+        started = time.perf_counter()
+        try:
+            if not fresh and self.last is not None:
+                return self.last.select(**selector)
+            try:
+                nodes = self._call(lambda device: self._query(device(**selector)))
+            except HierarchyError:
+                self.stats["failures"] += 1
+                raise
+            if nodes is None:
+                # Selector luas (mis. clickable=True): satu dump lalu filter di memory
+                self.stats["broad_queries"] += 1
+                nodes = self.dump(True).select(**selector)
+            return nodes
+        finally:
+            self._record_query(started)
+
+    @staticmethod
+    def _query(matches):
+        """UINode per match lewat RPC info; None kalau match terlalu banyak (lebih murah satu dump)"""
+        count = matches.count
+        if count > MAX_INFO_QUERIES:
+            return None
+        return [info_to_node(matches[index].info) for index in range(count)]
+
+    def exists(self, fresh=True, **selector):
+        started = time.perf_counter()
+        try:
+            if not fresh and self.last is not None:
+                return bool(self.last.select(**selector))
+            return self._call(lambda device: device(**selector).exists)
+        finally:
+            self._record_query(started)
+
+def compare_backends(serial, adb_path, selector, repeat=10):
+    """Latency dump + select untuk kedua backend pada device yang sama"""
+    report = {}
+    for backend in ("dump", "u2"):
+        service = create_hierarchy_service(serial, adb_path, backend)
+        for _ in range(repeat):
+            service.dump(fresh=True)
+            service.select(**selector)
+        stats = service.get_stats()
+        report[backend] = dict(stats["latency"], nodes=stats["nodes"], failures=stats["failures"])
+    return report
+
+def main():
+    import argparse
+    import json
+    parser = argparse.ArgumentParser(description="Hierarchy lewat sesi uiautomator2 + perbandingan latency backend")
+    parser.add_argument("--device", default="emulator-5554")
+    parser.add_argument("--adb", default=ADB_PATH)
+    parser.add_argument("--text", default=None, help="Selector text")
+    parser.add_argument("--resource-id", default=None, help="Selector resourceId")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--compare", action="store_true", help="Bandingkan backend dump vs u2")
+    args = parser.parse_args()
+
+    selector = {key: value for key, value in (("text", args.text), ("resourceId", args.resource_id)) if value}
+    selector = selector or {"clickable": True}
+    if args.compare:
+        report = compare_backends(args.device, args.adb, selector, args.repeat)
+        for backend, latency in report.items():
+            print_step(backend.upper(), f"dump p50 {latency['dump']['p50_ms']}ms p95 {latency['dump']['p95_ms']}ms | "
+                                        f"select p50 {latency['query']['p50_ms']}ms p95 {latency['query']['p95_ms']}ms")
+        print(json.dumps(report, indent=2))
+        return
+    service = U2HierarchyService(args.device, args.adb)
+    for _ in range(args.repeat):
+        nodes = service.select(**selector)
+    for node in nodes[:20]:
+        print(json.dumps(node.to_dict(), ensure_ascii=False))
+    print(json.dumps(service.get_stats(), indent=2, default=str))
+
+if __name__ == "__main__":
+    main()
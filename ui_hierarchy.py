@@ -0,0 +1,509 @@
+#!/usr/bin/env python3
+"""
+UI Hierarchy - Dump uiautomator langsung ke memory + index node + cache XPath terkompilasi
+Menggantikan pola `uiautomator dump /sdcard/x.xml` -> `pull` -> buka file -> parse ulang:
+1. `exec-out uiautomator dump /dev/tty` dibaca dari stdout (fallback: dump ke sdcard + `exec-out cat`)
+2. Parse sekali dengan lxml.etree jadi Hierarchy: list UINode (text, resource-id, class, bounds int)
+   + index per text / resource-id / class
+3. XPath dikompilasi sekali (etree.XPath) dan dipakai ulang untuk semua dump
+4. Diff struktural dengan dump sebelumnya (key: path node + resource-id) -> event added/removed/changed
+5. Selector gaya uiautomator2 (text, resourceId, className, ...) dengan API sama untuk semua backend;
+   backend "u2" (u2_hierarchy.py) menjalankan query lewat sesi agent di device yang tetap terbuka
+"""
+import os
+import re
+import subprocess
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from lxml import etree
+
+ADB_PATH = "C:\\LDPlayer\\LDPlayer9\\adb.exe"
+BOUNDS_RE = re.compile(r"\[(-?\d+),(-?\d+)\]\[(-?\d+),(-?\d+)\]")
+PARSER = etree.XMLParser(recover=True, huge_tree=True, remove_blank_text=True)
+# Atribut yang dibandingkan saat diff (selain struktur)
+DIFF_ATTRIBUTES = ("text", "content-desc", "bounds", "enabled", "checked", "selected", "focused", "clickable")
+# Backend default create_hierarchy_service: "dump" (adb uiautomator dump) atau "u2" (agent uiautomator2)
+# Percobaan dump berurutan; output perintah terakhir tiap percobaan berisi XML.
+# Beberapa image Android menolak /dev/tty: dump ke sdcard lalu baca lewat stdout.
+DUMP_ATTEMPTS = (
+    (("exec-out", "uiautomator", "dump", "/dev/tty"),),
+    (("shell", "uiautomator", "dump", "/sdcard/window_dump.xml"), ("exec-out", "cat", "/sdcard/window_dump.xml")),
+)
+HIERARCHY_BACKEND = os.environ.get("HIERARCHY_BACKEND", "dump")
+# Kunci selector uiautomator2 -> (atribut XML, cara cocok)
+SELECTOR_FIELDS = {
+    "text": ("text", "equals"), "textContains": ("text", "contains"), "textStartsWith": ("text", "startswith"),
+    "textMatches": ("text", "matches"), "description": ("content-desc", "equals"),
+    "descriptionContains": ("content-desc", "contains"), "descriptionStartsWith": ("content-desc", "startswith"),
+    "descriptionMatches": ("content-desc", "matches"), "resourceId": ("resource-id", "equals"),
+    "resourceIdMatches": ("resource-id", "matches"), "className": ("class", "equals"),
+    "classNameMatches": ("class", "matches"), "packageName": ("package", "equals"),
+    "clickable": ("clickable", "flag"), "enabled": ("enabled", "flag"), "checked": ("checked", "flag"),
+    "selected": ("selected", "flag"), "focused": ("focused", "flag"), "scrollable": ("scrollable", "flag"),
+}
+
+def print_step(step, message):
+    timestamp = datetime.now().strftime("%H:%M:%S")
+    print(f"[{timestamp}] [{step}] {message}")
+
+class HierarchyError(RuntimeError):
+    """Dump gagal atau output bukan XML hierarchy"""
+
+_xpath_lock = threading.Lock()
+_xpath_cache = {}
+_xpath_stats = {"hits": 0, "misses": 0}
+
+def compile_xpath(expression):
+    """etree.XPath terkompilasi, di-cache per string ekspresi (dipakai bersama semua service)"""
+    with _xpath_lock:
+        compiled = _xpath_cache.get(expression)
+        if compiled is not None:
+            _xpath_stats["hits"] += 1
+            return compiled
+        _xpath_stats["misses"] += 1
+    compiled = etree.XPath(expression)
+    with _xpath_lock:
+        _xpath_cache[expression] = compiled
+    return compiled
+
+def xpath_stats():
+    with _xpath_lock:
+        return dict(_xpath_stats, compiled=len(_xpath_cache))
+
+def extract_xml(output):
+    """Potong XML hierarchy dari stdout dump (buang teks status uiautomator); None kalau tidak ada"""
+    text = output.decode("utf-8", errors="replace") if isinstance(output, bytes) else (output or "")
+    start = text.find("<?xml")
+    start = start if start >= 0 else text.find("<hierarchy")
+    end = text.rfind("</hierarchy>")
+    if start < 0 or end < 0:
+        return None
+    return text[start:end + len("</hierarchy>")]
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return round(ordered[min(int(fraction * len(ordered)), len(ordered) - 1)], 2)
+
+def selector_predicate(selector):
+    """Fungsi element -> bool untuk selector gaya uiautomator2; kunci tak dikenal -> ValueError"""
+    checks = []
+    for name, expected in selector.items():
+        if name not in SELECTOR_FIELDS:
+            raise ValueError(f"selector tidak didukung: {name}")
+        attribute, mode = SELECTOR_FIELDS[name]
+        if mode == "flag":
+            checks.append((attribute, "equals", "true" if expected else "false"))
+        elif mode == "matches":
+            checks.append((attribute, mode, re.compile(expected)))
+        else:
+            checks.append((attribute, mode, expected))
+
+    def predicate(element):
+        attrib = element.attrib
+        for attribute, mode, expected in checks:
+            value = attrib.get(attribute, "")
+            if mode == "equals" and value != expected:
+                return False
+            if mode == "contains" and expected not in value:
+                return False
+            if mode == "startswith" and not value.startswith(expected):
+                return False
+            if mode == "matches" and not expected.fullmatch(value):
+                return False
+        return True
+    return predicate
+
+def parse_bounds(value):
+    match = BOUNDS_RE.search(value or "")
+    return tuple(int(v) for v in match.groups()) if match else (0, 0, 0, 0)
+
+class UINode:
+    """Satu <node> uiautomator dengan atribut yang sering dipakai sudah di-decode"""
+    __slots__ = ("element", "path", "key", "text", "resource_id", "class_name", "content_desc", "package", "bounds",
+                 "clickable")
+
+    def __init__(self, element, path=""):
+        attrib = element.attrib
+        self.element = element
+        self.path = path
+        self.key = path
+        self.text = attrib.get("text", "")
+        self.resource_id = attrib.get("resource-id", "")
+        self.class_name = attrib.get("class", "")
+        self.content_desc = attrib.get("content-desc", "")
+        self.package = attrib.get("package", "")
+        self.bounds = parse_bounds(attrib.get("bounds"))
+        self.clickable = attrib.get("clickable") == "true"
+
+    def signature(self):
+        attrib = self.element.attrib
+        return tuple(attrib.get(name, "") for name in DIFF_ATTRIBUTES)
+
+    @property
+    def center(self):
+        x1, y1, x2, y2 = self.bounds
+        return (x1 + x2) // 2, (y1 + y2) // 2
+
+    def to_dict(self):
+        return {"text": self.text, "resource_id": self.resource_id, "class": self.class_name,
+                "content_desc": self.content_desc, "bounds": list(self.bounds), "clickable": self.clickable}
+
+    def __repr__(self):
+        return f"UINode({self.class_name!r}, text={self.text!r}, id={self.resource_id!r}, bounds={self.bounds})"
+
+class Hierarchy:
+    """Satu dump yang sudah di-parse; query berulang tidak menyentuh device maupun parser"""
+
+    def __init__(self, xml, timestamp=None):
+        self.xml = xml if isinstance(xml, str) else xml.decode("utf-8", errors="replace")
+        self.timestamp = timestamp or time.time()
+        root = etree.fromstring(self.xml.encode("utf-8"), PARSER)
+        if root is None:
+            raise HierarchyError("dump kosong / bukan XML")
+        self.root = root
+        self.nodes = []
+        self._walk(root, "")
+        self._by_element = {node.element: node for node in self.nodes}
+        self.by_text = {}
+        self.by_id = {}
+        self.by_class = {}
+        for node in self.nodes:
+            if node.text:
+                self.by_text.setdefault(node.text, []).append(node)
+            if node.resource_id:
+                self.by_id.setdefault(node.resource_id, []).append(node)
+            self.by_class.setdefault(node.class_name, []).append(node)
+        self._keyed = None
+
+    def _walk(self, parent, path):
+        for position, element in enumerate(parent.iterchildren("node")):
+            class_name = element.get("class", "").rsplit(".", 1)[-1]
+            node = UINode(element, f"{path}/{class_name}[{element.get('index', position)}]")
+            self.nodes.append(node)
+            self._walk(element, node.path)
+
+    def keyed(self):
+        """key -> UINode untuk diff. Node ber-resource-id dikunci id (+ urutan kemunculan) supaya
+        tetap cocok walau sibling bergeser; sisanya dikunci path."""
+        if self._keyed is None:
+            keyed, seen = {}, {}
+            for node in self.nodes:
+                if node.resource_id:
+                    count = seen.get(node.resource_id, 0)
+                    seen[node.resource_id] = count + 1
+                    node.key = f"#{node.resource_id}[{count}]"
+                keyed[node.key] = node
+            self._keyed = keyed
+        return self._keyed
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def find(self, text=None, resource_id=None, class_name=None):
+        """Match persis lewat index; semua kriteria yang diisi harus cocok"""
+        candidates = None
+        for index, key in ((self.by_text, text), (self.by_id, resource_id), (self.by_class, class_name)):
+            if key is None:
+                continue
+            found = index.get(key, [])
+            candidates = found if candidates is None else [n for n in candidates if n in found]
+        return list(self.nodes if candidates is None else candidates)
+
+    def find_text(self, substring, ignore_case=True):
+        """Node yang text / content-desc mengandung substring"""
+        needle = substring.casefold() if ignore_case else substring
+        result = []
+        for node in self.nodes:
+            haystack = f"{node.text}\n{node.content_desc}"
+            if needle in (haystack.casefold() if ignore_case else haystack):
+                result.append(node)
+        return result
+
+    def xpath(self, expression, **variables):
+        """Hasil XPath terkompilasi; element <node> dikembalikan sebagai UINode"""
+        result = compile_xpath(expression)(self.root, **variables)
+        if not isinstance(result, list):
+            return result
+        return [self._by_element.get(item, item) for item in result]
+
+    def positions(self, expression):
+        """Pojok kiri-atas bounds node hasil XPath (format lama GetPosXml)"""
+        return [node.bounds[:2] for node in self.xpath(expression) if isinstance(node, UINode)]
+
+    def centers(self, expression):
+        return [node.center for node in self.xpath(expression) if isinstance(node, UINode)]
+
+    def select(self, **selector):
+        """Node yang cocok dengan selector uiautomator2, mis. select(text="OK", clickable=True)"""
+        predicate = selector_predicate(selector)
+        return [node for node in self.nodes if predicate(node.element)]
+
+class HierarchyEvent:
+    """Satu perubahan node: kind = added | removed | changed"""
+    __slots__ = ("kind", "key", "node", "old", "changes")
+
+    def __init__(self, kind, key, node, old=None, changes=None):
+        self.kind = kind
+        self.key = key
+        self.node = node  # node baru (added/changed) atau node lama (removed)
+        self.old = old
+        self.changes = changes or {}  # atribut -> (lama, baru)
+
+    def to_dict(self):
+        return {"kind": self.kind, "key": self.key, "node": self.node.to_dict(),
+                "changes": {k: list(v) for k, v in self.changes.items()}}
+
+    def __repr__(self):
+        return f"HierarchyEvent({self.kind}, {self.key}, {self.changes or self.node.text!r})"
+
+class HierarchyDiff:
+    """Hasil diff dua dump; kosong (falsy) kalau tidak ada yang berubah"""
+
+    def __init__(self, events, elapsed_ms=0.0):
+        self.events = events
+        self.elapsed_ms = elapsed_ms
+
+    def __bool__(self):
+        return bool(self.events)
+
+    def __len__(self):
+        return len(self.events)
+
+    def __iter__(self):
+        return iter(self.events)
+
+    def of_kind(self, kind):
+        return [event for event in self.events if event.kind == kind]
+
+    @property
+    def added(self):
+        return self.of_kind("added")
+
+    @property
+    def removed(self):
+        return self.of_kind("removed")
+
+    @property
+    def changed(self):
+        return self.of_kind("changed")
+
+    def touched(self):
+        """Node yang muncul atau berubah (untuk discan ulang, bukan seluruh dump)"""
+        return [event.node for event in self.events if event.kind != "removed"]
+
+    def appeared(self, text=None, resource_id=None, class_suffix=None):
+        """Node baru yang cocok kriteria, mis. appeared(class_suffix="Dialog") / appeared(resource_id="android:id/button1")"""
+        return [event.node for event in self.added
+                if (text is None or event.node.text == text)
+                and (resource_id is None or event.node.resource_id == resource_id)
+                and (class_suffix is None or event.node.class_name.endswith(class_suffix))]
+
+    def text_changed(self, resource_id=None):
+        return [event for event in self.changed if "text" in event.changes
+                and (resource_id is None or event.node.resource_id == resource_id)]
+
+    def summary(self):
+        return {"added": len(self.added), "removed": len(self.removed), "changed": len(self.changed),
+                "ms": round(self.elapsed_ms, 3)}
+
+def diff_hierarchy(old, new):
+    """Diff struktural old -> new; O(jumlah node) dengan lookup dict per key"""
+    started = time.perf_counter()
+    if old is None:
+        events = [HierarchyEvent("added", node.key, node) for node in new.keyed().values()]
+        return HierarchyDiff(events, (time.perf_counter() - started) * 1000)
+    if old is new or old.xml == new.xml:
+        return HierarchyDiff([], (time.perf_counter() - started) * 1000)
+    before, after = old.keyed(), new.keyed()
+    events = []
+    for key, node in after.items():
+        previous = before.get(key)
+        if previous is None:
+            events.append(HierarchyEvent("added", key, node))
+            continue
+        old_signature, new_signature = previous.signature(), node.signature()
+        if old_signature != new_signature:
+            changes = {name: (a, b) for name, a, b in zip(DIFF_ATTRIBUTES, old_signature, new_signature) if a != b}
+            events.append(HierarchyEvent("changed", key, node, previous, changes))
+    events.extend(HierarchyEvent("removed", key, node) for key, node in before.items() if key not in after)
+    return HierarchyDiff(events, (time.perf_counter() - started) * 1000)
+
+class HierarchyService:
+    """Ambil dump uiautomator per device ke memory; dump terakhir bisa dipakai ulang selama max_age detik"""
+    backend = "dump"
+
+    def __init__(self, serial="emulator-5554", adb_path=ADB_PATH, command=None, max_age=0.0, timeout=20):
+        self.serial = serial
+        self.adb_path = adb_path
+        # command(args) -> stdout bytes; default adb -s serial <args>. Bisa diganti (mis. lewat ldconsole).
+        self.command = command or self._adb
+        self.max_age = max_age
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.last = None
+        self.baseline = None  # dump yang terakhir dipakai sebagai pembanding changes()
+        self.listeners = []  # callback(HierarchyEvent) untuk event stream
+        self.stats = {"dumps": 0, "reused": 0, "fallbacks": 0, "failures": 0, "dump_ms": 0.0, "parse_ms": 0.0,
+                      "unchanged": 0, "diffs": 0, "diff_ms": 0.0, "events": 0, "queries": 0}
+        # Latency per operasi (ms) untuk perbandingan backend
+        self.latency = {"dump": deque(maxlen=500), "query": deque(maxlen=500)}
+
+    def _adb(self, args):
+        result = subprocess.run([self.adb_path, "-s", self.serial] + list(args), capture_output=True,
+                                timeout=self.timeout)
+        return result.stdout
+
+    def fetch_xml(self):
+        """XML mentah dari device tanpa file lokal"""
+        for attempt, commands in enumerate(DUMP_ATTEMPTS):
+            if attempt:
+                self.stats["fallbacks"] += 1
+            for args in commands:
+                output = self.command(list(args))
+            xml = extract_xml(output)
+            if xml is not None:
+                return xml
+        raise HierarchyError(f"uiautomator dump gagal di {self.serial}")
+
+    def dump(self, fresh=False):
+        """Hierarchy terbaru; dump baru kalau fresh / cache lebih tua dari max_age"""
+        with self.lock:
+            if not fresh and self.last is not None and time.time() - self.last.timestamp <= self.max_age:
+                self.stats["reused"] += 1
+                return self.last
+            started = time.perf_counter()
+            try:
+                xml = self.fetch_xml()
+            except (HierarchyError, OSError, subprocess.SubprocessError):
+                self.stats["failures"] += 1
+                raise
+            fetched = time.perf_counter()
+            if self.last is not None and xml == self.last.xml:
+                # Layar tidak berubah: tidak perlu parse ulang
+                self.stats["unchanged"] += 1
+                self.last.timestamp = time.time()
+            else:
+                self.last = Hierarchy(xml)
+            self.stats["dumps"] += 1
+            self.stats["dump_ms"] += (fetched - started) * 1000
+            self.latency["dump"].append((fetched - started) * 1000)
+            self.stats["parse_ms"] += (time.perf_counter() - fetched) * 1000
+            return self.last
+
+    def invalidate(self):
+        with self.lock:
+            self.last = None
+            self.baseline = None
+
+    def set_baseline(self, hierarchy):
+        """Pembanding untuk changes() berikutnya (mis. layar sebelum tap, setelah tombol back)"""
+        self.baseline = hierarchy
+
+    def subscribe(self, callback):
+        self.listeners.append(callback)
+
+    def changes(self, fresh=True):
+        """Dump baru lalu diff dengan pembanding sebelumnya; hanya event perubahan yang dikirim ke listener.
+        Pemanggilan pertama hanya menyimpan pembanding (diff kosong)."""
+        current = self.dump(fresh)
+        previous, self.baseline = self.baseline, current
+        if previous is None:
+            return HierarchyDiff([])
+        diff = diff_hierarchy(previous, current)
+        self.stats["diffs"] += 1
+        self.stats["diff_ms"] += diff.elapsed_ms
+        self.stats["events"] += len(diff)
+        for event in diff:
+            for callback in self.listeners:
+                callback(event)
+        return diff
+
+    def watch(self, interval=1.0, should_stop=None):
+        """Generator HierarchyDiff yang tidak kosong saja (change-only stream)"""
+        self.changes()
+        while not (should_stop and should_stop()):
+            time.sleep(interval)
+            try:
+                diff = self.changes()
+            except (HierarchyError, OSError, subprocess.SubprocessError):
+                continue
+            if diff:
+                yield diff
+
+    def positions(self, expression, fresh=True):
+        return self.dump(fresh).positions(expression)
+
+    def _record_query(self, started):
+        self.stats["queries"] += 1
+        self.latency["query"].append((time.perf_counter() - started) * 1000)
+
+    def select(self, fresh=True, **selector):
+        """[UINode] yang cocok dengan selector uiautomator2 (backend dump: dump lalu filter di memory)"""
+        started = time.perf_counter()
+        try:
+            return self.dump(fresh).select(**selector)
+        finally:
+            self._record_query(started)
+
+    def exists(self, fresh=True, **selector):
+        return bool(self.select(fresh, **selector))
+
+    def latency_stats(self):
+        return {name: {"count": len(values), "p50_ms": percentile(values, 0.50), "p95_ms": percentile(values, 0.95)}
+                for name, values in self.latency.items()}
+
+    def get_stats(self):
+        dumps = max(self.stats["dumps"], 1)
+        return dict(self.stats, backend=self.backend, avg_dump_ms=round(self.stats["dump_ms"] / dumps, 2),
+                    avg_diff_ms=round(self.stats["diff_ms"] / max(self.stats["diffs"], 1), 3),
+                    avg_parse_ms=round(self.stats["parse_ms"] / dumps, 2),
+                    nodes=len(self.last) if self.last else 0, xpath=xpath_stats(), latency=self.latency_stats())
+
+def create_hierarchy_service(serial="emulator-5554", adb_path=ADB_PATH, backend=None, **kwargs):
+    """HierarchyService sesuai backend ("dump" / "u2"; default HIERARCHY_BACKEND dari environment)"""
+    backend = backend or HIERARCHY_BACKEND
+    if backend == "dump":
+        return HierarchyService(serial, adb_path, **kwargs)
+    if backend == "u2":
+        from u2_hierarchy import U2HierarchyService
+        return U2HierarchyService(serial, adb_path, **kwargs)
+    raise ValueError(f"backend hierarchy tidak dikenal: {backend}")
+
+def main():
+    import argparse
+    import json
+    parser = argparse.ArgumentParser(description="Dump UI hierarchy ke memory dan query XPath")
+    parser.add_argument("--device", default="emulator-5554")
+    parser.add_argument("--adb", default=ADB_PATH)
+    parser.add_argument("--xpath", default="//node[@clickable='true']")
+    parser.add_argument("--repeat", type=int, default=1000, help="Ulangi query untuk ukur latency")
+    parser.add_argument("--watch", action="store_true", help="Cetak perubahan hierarchy saja (Ctrl+C untuk keluar)")
+    parser.add_argument("--backend", choices=["dump", "u2"], default=HIERARCHY_BACKEND)
+    args = parser.parse_args()
+
+    service = create_hierarchy_service(args.device, args.adb, args.backend)
+    if args.watch:
+        try:
+            for diff in service.watch():
+                print_step("DIFF", str(diff.summary()))
+                for event in diff:
+                    print(json.dumps(event.to_dict(), ensure_ascii=False))
+        except KeyboardInterrupt:
+            pass
+        return
+    hierarchy = service.dump(fresh=True)
+    print_step("DUMP", f"{len(hierarchy)} node, dump {service.get_stats()['avg_dump_ms']}ms")
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        nodes = hierarchy.xpath(args.xpath)
+    per_query = (time.perf_counter() - started) * 1e6 / max(args.repeat, 1)
+    print_step("XPATH", f"{len(nodes)} match, {per_query:.1f}µs per query")
+    for node in nodes[:20]:
+        print(json.dumps(node.to_dict(), ensure_ascii=False) if isinstance(node, UINode) else node)
+
+if __name__ == "__main__":
+    main()
@@ -12,8 +12,18 @@ import subprocess
 import time
 import os
 import json
-import base64
 from datetime import datetime
+from device_state_cache import get_cache
+from input_queue import get_queue
+from decision_cache import DecisionCache, hamming_distance, screen_fingerprint
+from decision_service import DecisionClient, make_context
+from ai_context_builder import AIContextBuilder
+from rule_engine import RuleEngine, Facts, ULTIMATE_RULES
+from boot_scheduler import BootScheduler
+from device_inventory import parse_adb_devices
+
+PACKAGE = "com.linecorp.LGRGS"
+DEVICE_STATE = get_cache("emulator-5554", "C:\\LDPlayer\\LDPlayer9\\adb.exe")
 
 def print_step(step, message):
     timestamp = datetime.now().strftime("%H:%M:%S")
@@ -68,16 +78,13 @@ def check_ldplayer_status():
 def start_ldplayer():
     """Start LDPlayer jika belum jalan"""
     print_step("START", "Memulai LDPlayer...")
-    run_cmd('cd "C:\\LDPlayer\\LDPlayer9" && ldconsole.exe launch --index 0')
+    # Poll sys.boot_completed, bukan isrunning tiap 10 detik
+    record = BootScheduler(max_concurrent=1, boot_timeout=180).run([0])[0]
     
-    for i in range(18):  # 3 menit max
-        time.sleep(10)
-        output, success = run_cmd('cd "C:\\LDPlayer\\LDPlayer9" && ldconsole.exe isrunning --index 0')
-        if "running" in output:
-            print_step("START", f"✅ LDPlayer berhasil dimulai! ({(i+1)*10}s)")
-            log_action("LDPLAYER_STARTED", f"Started in {(i+1)*10}s")
-            return True
-        print_step("START", f"⏳ Menunggu LDPlayer... ({(i+1)*10}s)")
+    if record["status"] == "ready":
+        print_step("START", f"✅ LDPlayer berhasil dimulai! ({record['boot_seconds']}s)")
+        log_action("LDPLAYER_STARTED", f"Started in {record['boot_seconds']}s")
+        return True
     
     print_step("START", "❌ LDPlayer gagal dimulai!")
     return False
@@ -87,7 +94,7 @@ def check_adb_connection():
     print_step("ADB", "Mengecek koneksi ADB...")
     for i in range(18):  # 3 menit max
         output, success = run_cmd('cd "C:\\LDPlayer\\LDPlayer9" && adb.exe devices')
-        if "emulator-5554" in output and "device" in output:
+        if parse_adb_devices(output).get("emulator-5554") == "device":
             print_step("ADB", f"✅ ADB terhubung! ({(i+1)*10}s)")
             log_action("ADB_CONNECTED", f"Connected in {(i+1)*10}s")
             return True
@@ -101,8 +108,7 @@ def check_android_ready():
     """Cek Android sudah siap"""
     print_step("ANDROID", "Mengecek sistem Android...")
     for i in range(18):  # 3 menit max
-        output, success = run_cmd('cd "C:\\LDPlayer\\LDPlayer9" && adb.exe -s emulator-5554 shell getprop sys.boot_completed')
-        if "1" in output:
+        if DEVICE_STATE.boot_completed():
             print_step("ANDROID", f"✅ Android siap! ({(i+1)*10}s)")
             log_action("ANDROID_READY", f"Ready in {(i+1)*10}s")
             return True
@@ -116,9 +122,8 @@ def check_line_ranger_running():
     """Cek apakah Line Ranger sudah jalan"""
     print_step("GAME", "Mengecek apakah Line Ranger sudah jalan...")
     
-    output, success = run_cmd('cd "C:\\LDPlayer\\LDPlayer9" && adb.exe -s emulator-5554 shell "ps | grep line"')
-    
-    if "linecorp" in output.lower() or "lgrgs" in output.lower():
+    # ps di-cache beberapa detik; launch_line_ranger meng-invalidasi
+    if DEVICE_STATE.is_running(PACKAGE):
         print_step("GAME", "✅ Line Ranger sudah jalan!")
         log_action("GAME_STATUS", "Already running")
         return True
@@ -132,6 +137,7 @@ def launch_line_ranger():
     print_step("LAUNCH", "Meluncurkan Line Ranger...")
     output, success = run_cmd('cd "C:\\LDPlayer\\LDPlayer9" && ldconsole.exe runapp --index 0 --packagename com.linecorp.LGRGS')
     
+    DEVICE_STATE.notify("launch")
     if success:
         print_step("LAUNCH", "✅ Line Ranger diluncurkan!")
         log_action("GAME_LAUNCHED", "Line Ranger started")
@@ -145,10 +151,24 @@ def launch_line_ranger():
 class UltimateGameplayAI:
     """Ultimate AI dengan smart detection + Puter AI"""
     
-    def __init__(self):
+    def __init__(self, device="emulator-5554"):
         self.adb_path = "C:\\LDPlayer\\LDPlayer9\\adb.exe"
-        self.device = "emulator-5554"
-        self.screenshot_path = "ultimate_screen.png"
+        self.device = device
+        # File per device supaya beberapa worker tidak saling timpa
+        suffix = "" if device == "emulator-5554" else "_" + device.replace(":", "_").replace(".", "_")
+        self.screenshot_path = f"ultimate_screen{suffix}.png"
+        self.html_path = f"ultimate_ai{suffix}.html"
+        self.decision_cache = DecisionCache("ultimate_decision_cache.json")
+        self.context_builder = AIContextBuilder()
+        self.rule_engine = RuleEngine(ULTIMATE_RULES)
+        # Decision service bersama (env DECISION_SERVICE): layar baru ditanyakan ke sana, bukan halaman AI per device
+        self.decision_client = DecisionClient.from_env()
+        self.last_click = None
+        self.last_cached_tap = None  # (screen_type, fingerprint, signature) keputusan cache yang terakhir diklik
+        self.health = None  # DeviceHealthMonitor opsional (dipasang oleh fleet worker)
+        self.on_metrics = None  # callback(metrics) tiap akhir cycle (dipakai fleet worker / dashboard)
+        self.metrics = {"started": time.time(), "frames": 0, "analysis_s": 0.0, "cycles": 0, "stage_clears": 0, "last_error": ""}
+        self.in_stage = False  # START sudah diklik, belum kembali ke lobby
         
     def safe_screenshot(self):
         """Ambil screenshot dengan aman"""
@@ -170,6 +190,7 @@ class UltimateGameplayAI:
             return None
         except Exception as e:
             print_step("ERROR", f"Screenshot gagal: {e}")
+            self.metrics["last_error"] = f"Screenshot gagal: {e}"
             return None
     
     def detect_screen_type(self, img):
@@ -177,6 +198,7 @@ class UltimateGameplayAI:
         if img is None:
             return "unknown", {}
         
+        started = time.perf_counter()
         hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
         
         # Deteksi progress bar kuning (loading screen)
@@ -239,6 +261,15 @@ class UltimateGameplayAI:
             "circles_detected": circle_count
         }
         
+        if self.health is not None:
+            self.health.record_frame(screen_type, screen_fingerprint(img))
+        self.metrics["frames"] += 1
+        self.metrics["analysis_s"] += time.perf_counter() - started
+        # Kembali ke lobby setelah klik START = satu stage selesai
+        if screen_type == "lobby" and self.in_stage:
+            self.in_stage = False
+            self.metrics["stage_clears"] += 1
+        
         log_action("SCREEN_DETECTED", f"{screen_type} ({confidence})")
         print_step("DETECT", f"Layar: {screen_type} ({confidence}) - Kuning:{yellow_pixels}, Ungu:{purple_pixels}, Coklat:{brown_pixels}")
         
@@ -297,10 +328,12 @@ class UltimateGameplayAI:
         
         return analysis
     
-    def create_puter_ai_interface(self, analysis, screen_type):
+    def create_puter_ai_interface(self, analysis, screen_type, img=None):
         """Create Puter AI interface untuk gameplay decisions"""
-        with open(self.screenshot_path, "rb") as f:
-            screenshot_base64 = base64.b64encode(f.read()).decode()
+        if img is None:
+            img = cv2.imread(self.screenshot_path)
+            if img is None:
+                return
         
         # Create context berdasarkan screen type
         if screen_type == "lobby":
@@ -372,103 +405,30 @@ Suggest ONE specific action with coordinates (x, y) and explain the reasoning.
 Available buttons: {analysis['buttons'][:3]}
             """.strip()
         
-        html_content = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <title>Ultimate Line Ranger AI</title>
-    <script src="https://js.puter.com/v2/"></script>
-    <style>
-        body {{ font-family: Arial, sans-serif; margin: 20px; background: #f0f8ff; }}
-        .container {{ max-width: 900px; margin: 0 auto; background: white; padding: 20px; border-radius: 15px; box-shadow: 0 4px 6px rgba(0,0,0,0.1); }}
-        .screenshot {{ max-width: 100%; border: 3px solid #333; border-radius: 10px; }}
-        .analysis {{ background: #e3f2fd; padding: 20px; border-radius: 10px; margin: 15px 0; }}
-        .ai-response {{ background: #e8f5e8; padding: 20px; border-radius: 10px; border-left: 5px solid #4caf50; }}
-        .button-target {{ background: #fff3cd; padding: 15px; border-radius: 8px; margin: 10px 0; border-left: 5px solid #ffc107; }}
-        .screen-type {{ background: #f8d7da; padding: 10px; border-radius: 5px; color: #721c24; font-weight: bold; }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h2>🎮 Ultimate Line Ranger AI</h2>
-        
-        <div class="screen-type">
-            📱 Screen Type: {screen_type.upper()}
-        </div>
-        
-        <div>
-            <h3>📸 Current Game Screen:</h3>
-            <img src="data:image/png;base64,{screenshot_base64}" class="screenshot">
-        </div>
-        
-        <div class="analysis">
-            <h3>🔍 Screen Analysis:</h3>
-            <strong>Time:</strong> {analysis['timestamp']}<br>
-            <strong>Resolution:</strong> {analysis['resolution']}<br>
-            <strong>Buttons Found:</strong> {len(analysis['buttons'])}<br>
-            <strong>Colors Detected:</strong> {', '.join([c['color'] for c in analysis['colors']])}<br>
-            <strong>Top Button Positions:</strong> {[btn['pos'] for btn in analysis['buttons'][:3]]}
-        </div>
-        
-        <div id="ai-decision">
-            <h3>🤖 Puter AI Decision:</h3>
-            <div id="ai-output">🧠 Analyzing with Puter AI...</div>
-        </div>
-    </div>
-    
-    <script>
-        const context = `{context}`;
-        
-        puter.ai.chat(context, {{
-            model: "gpt-5-nano",
-            max_tokens: 100,
-            temperature: 0.1
-        }}).then(response => {{
-            document.getElementById('ai-output').innerHTML = 
-                '<div class="ai-response">' +
-                '<strong>🎯 AI Decision:</strong><br>' +
-                response.replace(/\\n/g, '<br>') + 
-                '</div>';
-            
-            // Extract coordinates
-            const coordMatch = response.match(/(\\d+),\\s*(\\d+)/);
-            if (coordMatch) {{
-                const x = parseInt(coordMatch[1]);
-                const y = parseInt(coordMatch[2]);
-                document.getElementById('ai-output').innerHTML += 
-                    '<div class="button-target">' +
-                    '<strong>🎯 AI Target: (' + x + ', ' + y + ')</strong><br>' +
-                    '<em>Click coordinates determined by Puter AI</em>' +
-                    '</div>';
-                window.aiTarget = {{x: x, y: y}};
-            }}
-        }}).catch(error => {{
-            document.getElementById('ai-output').innerHTML = 
-                '<div style="color: red;">❌ Puter AI Error: ' + error + '</div>';
-        }});
-    </script>
-</body>
-</html>
-        """
-        
-        with open("ultimate_ai.html", "w", encoding="utf-8") as f:
-            f.write(html_content)
-        
-        print_step("AI", "✅ Puter AI interface created: ultimate_ai.html")
+        # Thumbnail + ROI + daftar elemen, bukan PNG penuh base64
+        stats = self.context_builder.write_page(
+            self.html_path, img, analysis, screen_type, context,
+            source_path=self.screenshot_path, title="Ultimate Line Ranger AI"
+        )
+        print_step("AI", f"Page {stats['last_bytes'] // 1024} KB dalam {stats['last_ms']}ms (hemat {stats.get('reduction', '?')}x)")
+        
+        print_step("AI", f"✅ Puter AI interface created: {self.html_path}")
         log_action("AI_INTERFACE_CREATED", f"Screen type: {screen_type}")
     
     def safe_click(self, x, y):
         """Safe click dengan logging"""
         try:
-            subprocess.run([
-                self.adb_path, "-s", self.device,
-                "shell", "input", "tap", str(x), str(y)
-            ], capture_output=True, timeout=5)
+            # Antrian input per device: tap duplikat digabung, kanal sentuh persisten
+            action = get_queue(self.device, self.adb_path).tap(x, y)
+            if not action.wait(5):
+                raise action.error or TimeoutError("tap belum terkirim")
+            self.last_click = (int(x), int(y))
             log_action("CLICK", f"Klik di ({x}, {y})")
             print_step("CLICK", f"👆 Klik di ({x}, {y})")
             return True
-        except:
+        except Exception as e:
             print_step("ERROR", "Klik gagal")
+            self.metrics["last_error"] = f"Klik gagal: {e}"
             return False
     
     def find_yellow_stage_numbers(self, img):
@@ -562,12 +522,15 @@ Available buttons: {analysis['buttons'][:3]}
         
         return None
     
-    def wait_for_lobby(self, max_wait=120):
-        """Tunggu loading selesai sampai lobby"""
+    def wait_for_lobby(self, max_wait=120, should_stop=None):
+        """Tunggu loading selesai sampai lobby; should_stop() dicek tiap putaran (juga heartbeat worker)"""
         print_step("WAIT", "Menunggu loading selesai...")
         
         start_time = time.time()
         while time.time() - start_time < max_wait:
+            if should_stop and should_stop():
+                print_step("WAIT", "Stop diminta, berhenti menunggu lobby")
+                return False
             img = self.safe_screenshot()
             if img is not None:
                 screen_type, info = self.detect_screen_type(img)
@@ -589,17 +552,21 @@ Available buttons: {analysis['buttons'][:3]}
         print_step("TIMEOUT", "❌ Timeout menunggu lobby!")
         return False
     
-    def run_ultimate_automation(self, cycles=10):
+    def run_ultimate_automation(self, cycles=10, should_stop=None):
         """Run ultimate automation dengan Puter AI"""
         print_step("AUTO", "Memulai Ultimate Automation dengan Puter AI...")
         
         for cycle in range(cycles):
+            if should_stop and should_stop():
+                print_step("AUTO", "Stop diminta, selesai setelah cycle ini")
+                break
             print_step("CYCLE", f"🔄 Automation Cycle {cycle + 1}/{cycles}")
             
             # Take screenshot
             img = self.safe_screenshot()
             if img is None:
                 print_step("ERROR", "Screenshot gagal, skip cycle")
+                self._end_cycle()
                 time.sleep(5)
                 continue
             
@@ -610,121 +577,111 @@ Available buttons: {analysis['buttons'][:3]}
             analysis = self.analyze_gameplay_screen(img)
             print_step("ANALYSIS", f"Found {len(analysis['buttons'])} buttons, colors: {[c['color'] for c in analysis['colors']]}")
             
-            # Create Puter AI interface
-            self.create_puter_ai_interface(analysis, screen_type)
+            # Layar tidak berubah setelah tap dari cache: keputusan itu salah, jangan diulang
+            self._evict_unchanged(screen_type, img)
             
-            # Execute action based on screen type and analysis
-            if screen_type == "lobby":
-                # Smart lobby actions
-                # 1. Look for MAIN STAGE button first (avoid shop/feather area)
-                main_stage_found = False
-                height, width = img.shape[:2]
-                
-                # Define safe MAIN STAGE area (center, avoid top-right shop area)
-                safe_center_x = width // 2
-                safe_center_y = height // 2 - 50  # Slightly above center
-                
-                for button in analysis["buttons"]:
-                    x, y = button["pos"]
-                    # MAIN STAGE should be in center area, NOT in top-right (shop/feather area)
-                    if (abs(x - safe_center_x) < 150 and 
-                        abs(y - safe_center_y) < 100 and 
-                        x < width * 0.8 and  # Avoid right side (shop area)
-                        y > height * 0.2):   # Avoid top area (UI elements)
-                        
-                        print_step("ACTION", f"Klik MAIN STAGE button di ({x}, {y}) - area aman")
-                        self.safe_click(x, y)
-                        main_stage_found = True
-                        break
-                
-                # 2. Use specific MAIN STAGE detection if general detection failed
-                if not main_stage_found:
-                    main_stage_pos = self.find_main_stage_button(img)
-                    if main_stage_pos:
-                        x, y = main_stage_pos
-                        print_step("ACTION", f"Klik MAIN STAGE (deteksi spesifik) di ({x}, {y})")
-                        self.safe_click(x, y)
-                        main_stage_found = True
-                
-                # 3. Look for yellow stage numbers if MAIN STAGE still not found
-                if not main_stage_found:
-                    yellow_stages = self.find_yellow_stage_numbers(img)
-                    if yellow_stages:
-                        # Click first available stage
-                        x, y = yellow_stages[0]
-                        print_step("ACTION", f"Klik stage number kuning di ({x}, {y})")
-                        self.safe_click(x, y)
-                    else:
-                        # Safe fallback - click known MAIN STAGE area, avoid shop
-                        height, width = img.shape[:2]
-                        safe_x = width // 2
-                        safe_y = height // 2 - 80  # Above center, where MAIN STAGE usually is
-                        print_step("ACTION", f"Klik area MAIN STAGE aman di ({safe_x}, {safe_y})")
-                        self.safe_click(safe_x, safe_y)
-                    
-            elif screen_type == "loading":
-                print_step("WAIT", "Loading screen detected, menunggu...")
-                time.sleep(3)
+            # Layar yang sudah pernah dilihat langsung pakai keputusan cache
+            cached, cache_key = self.decision_cache.lookup(screen_type, img, analysis)
+            if cached and cached.get("action") == "click":
+                x, y = cached["coordinates"]
+                print_step("CACHE", f"⚡ Keputusan cache: klik ({x}, {y}) - {cached.get('reason', '')}")
+                if self.safe_click(x, y):
+                    self.last_cached_tap = (screen_type,) + cache_key
+                if cached.get("in_stage"):
+                    self.in_stage = True
+                self._end_cycle()
+                time.sleep(8)
                 continue
-                
-            else:
-                # Smart actions for other screens (stage selection, battle, etc)
-                action_taken = False
-                
-                # 1. Look for yellow stage numbers first
-                yellow_stages = self.find_yellow_stage_numbers(img)
-                if yellow_stages and not action_taken:
-                    x, y = yellow_stages[0]  # Click first stage
-                    print_step("ACTION", f"Klik stage number kuning di ({x}, {y})")
-                    self.safe_click(x, y)
-                    action_taken = True
-                
-                # 2. Look for START button
-                if not action_taken:
-                    start_button = self.find_start_button(img)
-                    if start_button:
-                        x, y = start_button
-                        print_step("ACTION", f"Klik START button di ({x}, {y})")
-                        self.safe_click(x, y)
-                        action_taken = True
-                
-                # 3. Look for green buttons (START/GO/NEXT)
-                if not action_taken:
-                    for color_info in analysis["colors"]:
-                        if color_info["color"] == "green" and color_info["pixels"] > 10000:
-                            # Find green button position
-                            for button in analysis["buttons"][:3]:
-                                x, y = button["pos"]
-                                print_step("ACTION", f"Klik tombol hijau (START/NEXT) di ({x}, {y})")
-                                self.safe_click(x, y)
-                                action_taken = True
-                                break
-                            break
-                
-                # 4. Fallback to largest button (avoid small UI elements)
-                if not action_taken and analysis["buttons"]:
-                    # Filter out small buttons (likely UI elements)
-                    large_buttons = [btn for btn in analysis["buttons"] if btn["area"] > 5000]
-                    if large_buttons:
-                        largest_button = large_buttons[0]
-                        x, y = largest_button["pos"]
-                        print_step("ACTION", f"Klik tombol besar di ({x}, {y})")
-                        self.safe_click(x, y)
-                        action_taken = True
-                
-                # 5. Last resort - click center
-                if not action_taken:
-                    height, width = img.shape[:2]
-                    center_x, center_y = width // 2, height // 2
-                    print_step("ACTION", f"Klik tengah layar di ({center_x}, {center_y})")
-                    self.safe_click(center_x, center_y)
+            
+            # Create Puter AI interface (hanya untuk layar baru, kalau tidak ada decision service)
+            if self.decision_client is None:
+                self.create_puter_ai_interface(analysis, screen_type, img)
+            self.last_click = None
+            
+            # Execute action: decision table (MAIN STAGE -> stage kuning -> START -> fallback)
+            height, width = img.shape[:2]
+            facts = Facts(screen_type, width, height, analysis["buttons"], analysis["colors"], {
+                "main_stage": lambda: self.find_main_stage_button(img),
+                "yellow_stages": lambda: self.find_yellow_stage_numbers(img),
+                "start_button": lambda: self.find_start_button(img)
+            })
+            decision = self.rule_engine.decide(facts)
+            if decision.get("fallback") and self.decision_client is not None:
+                decision = self.ask_decision_service(screen_type, img, analysis) or decision
+            
+            if decision["action"] == "wait":
+                print_step("WAIT", decision["reason"])
+                self._end_cycle()
+                time.sleep(decision.get("wait", 3))
+                continue
+            
+            x, y = decision["coordinates"]
+            print_step("ACTION", f"{decision['reason']} di ({x}, {y}) [rule: {decision['rule']}, {decision['latency_ms']}ms]")
+            self.safe_click(x, y)
+            if decision["rule"] == "start_button":
+                self.in_stage = True
+            
+            # Tebakan terakhir (safe area / tengah layar) tidak di-cache
+            if self.last_click and not decision.get("fallback"):
+                self.decision_cache.put(screen_type, cache_key[0], cache_key[1], {
+                    "action": "click",
+                    "coordinates": list(self.last_click),
+                    "reason": f"Cached {decision['rule']}",
+                    "rule": decision["rule"],
+                    "in_stage": decision["rule"] == "start_button"
+                })
+                self.last_cached_tap = (screen_type,) + cache_key
             
             # Wait before next cycle
+            self._end_cycle()
             time.sleep(8)
         
+        self.decision_cache.save()
+        print_step("CACHE", f"Statistik cache: {self.decision_cache.get_stats()}")
+        print_step("RULES", f"Statistik rule: {self.rule_engine.get_stats()}")
         log_action("AUTOMATION_COMPLETE", f"Ultimate automation selesai ({cycles} cycles)")
         print_step("COMPLETE", "✅ Ultimate automation selesai!")
 
+    def ask_decision_service(self, screen_type, img, analysis):
+        """Keputusan dari decision service (di-batch dengan device lain); None kalau gagal atau cuma tebakan.
+        Hanya dipanggil saat ULTIMATE_RULES lokal jatuh ke fallback, jadi service harus backend "model"."""
+        started = time.perf_counter()
+        try:
+            remote = self.decision_client.decide(make_context(screen_type, img, analysis, self.device))
+        except (OSError, ValueError, KeyError) as e:
+            print_step("SERVICE", f"⚠️ Decision service gagal: {e}")
+            return None
+        if remote.get("action") != "click" or not remote.get("coordinates") or remote.get("fallback"):
+            return None
+        return dict(remote, rule=f"service:{remote.get('backend', '?')}",
+                    latency_ms=round((time.perf_counter() - started) * 1000, 3))
+
+    def _evict_unchanged(self, screen_type, img):
+        """Bandingkan layar sekarang dengan layar saat tap keputusan cache terakhir"""
+        last, self.last_cached_tap = self.last_cached_tap, None
+        if last is None or last[0] != screen_type:
+            return
+        if hamming_distance(last[1], screen_fingerprint(img)) <= self.decision_cache.max_distance:
+            removed = self.decision_cache.evict(*last)
+            print_step("CACHE", f"🗑️ Layar tidak berubah setelah tap, {removed} keputusan cache dibuang")
+
+    def get_metrics(self):
+        """FPS analisis (frame / waktu deteksi saja, tanpa sleep), cycles/menit, stage clear/jam sejak objek dibuat"""
+        elapsed = max(time.time() - self.metrics["started"], 1e-6)
+        return {
+            "fps": round(self.metrics["frames"] / max(self.metrics["analysis_s"], 1e-6), 2),
+            "cycles_per_min": round(self.metrics["cycles"] * 60 / elapsed, 2),
+            "clears_per_hour": round(self.metrics["stage_clears"] * 3600 / elapsed, 1),
+            "cycles": self.metrics["cycles"],
+            "stage_clears": self.metrics["stage_clears"],
+            "last_error": self.metrics["last_error"]
+        }
+
+    def _end_cycle(self):
+        self.metrics["cycles"] += 1
+        if self.on_metrics:
+            self.on_metrics(self.get_metrics())
+
 def main():
     """Main automation workflow yang ultimate"""
     print("🚀 ULTIMATE LINE RANGER AI AUTOMATION")